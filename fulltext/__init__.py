@@ -1,23 +1,47 @@
 from __future__ import absolute_import
 
+import collections
 import errno
 import re
 import logging
 import os
-import mimetypes
 import sys
 
 from os.path import splitext
 
+import six
 from six import string_types
+from six import BytesIO
 from six import PY3
 from fulltext.util import warn
-from fulltext.util import magic
+from fulltext.util import get_magic
+from fulltext.util import memoize
 from fulltext.util import is_file_path
 from fulltext.util import fobj_to_tempfile
 from fulltext.util import is_windows
-
-__all__ = ["get", "register_backend"]
+from fulltext.util import BackendError
+from fulltext.util import imap_ordered
+from fulltext.util import imap_processes
+from fulltext import util
+from fulltext.detect import mime_from_fobj
+from fulltext.detect import mime_from_path
+from fulltext.detect import peekable
+from fulltext.compat import cpu_count
+from fulltext.compat import timer
+from fulltext.limits import LimitExceeded  # NOQA
+from fulltext.limits import Limits  # NOQA
+from fulltext.limits import get_state as get_limits_state
+from fulltext.limits import iter_with_state
+from fulltext.limits import new_state as new_limits_state
+from fulltext.limits import use_state as use_limits_state
+from fulltext.normalize import Normalizer
+from fulltext.normalize import from_kwargs as normalizer_from_kwargs
+from fulltext.stats import record as stats_record
+from fulltext.stats import timed
+
+__all__ = ["get", "aget", "get_iter", "get_many", "iter_members",
+           "register_backend", "invalidate_backend_cache", "Member",
+           "Limits", "LimitExceeded"]
 
 
 # --- overridable defaults
@@ -25,6 +49,12 @@ __all__ = ["get", "register_backend"]
 ENCODING = sys.getfilesystemencoding()
 ENCODING_ERRORS = "strict"
 DEFAULT_MIME = 'application/octet-stream'
+# A fulltext.cache.BaseCache instance, used if no `cache` arg is passed
+# to get().
+CACHE = None
+# A fulltext.limits.Limits instance, used if no `limits` arg is passed
+# to get().
+LIMITS = None
 
 # --- others
 
@@ -36,9 +66,6 @@ MIMETYPE_TO_BACKENDS = {}
 EXTS_TO_MIMETYPES = {}
 MAGIC_BUFFER_SIZE = 1024
 
-mimetypes.init()
-_MIMETYPES_TO_EXT = dict([(v, k) for k, v in mimetypes.types_map.items()])
-
 # A list of extensions which will be treated as pure text.
 # This takes precedence over register_backend().
 # https://www.openoffice.org/dev_docs/source/file_extensions.html
@@ -139,6 +166,14 @@ if is_windows() and hasattr(sys, '_MEIPASS'):
 # =====================================================================
 
 
+@memoize
+def _mimetypes_to_ext():
+    # mimetypes.init() reads system files, so don't do it on import.
+    import mimetypes
+    mimetypes.init()
+    return dict([(v, k) for k, v in mimetypes.types_map.items()])
+
+
 def register_backend(mimetype, module, extensions=None):
     """Register a backend.
     `mimetype`: a mimetype string (e.g. 'text/plain')
@@ -150,7 +185,7 @@ def register_backend(mimetype, module, extensions=None):
     MIMETYPE_TO_BACKENDS[mimetype] = module
     if extensions is None:
         try:
-            ext = _MIMETYPES_TO_EXT[mimetype]
+            ext = _mimetypes_to_ext()[mimetype]
         except KeyError:
             raise KeyError(
                 "mimetypes module has no extension associated "
@@ -326,6 +361,39 @@ for ext in _TEXT_EXTS:
 # =====================================================================
 
 
+def strip_white_iter(chunks):
+    """Given an iterable of text chunks yield the same text as
+    `STRIP_WHITE.sub(' ', text).strip()` would produce, without ever
+    joining the chunks together. Whitespace spanning across chunk
+    boundaries is handled. See `fulltext.normalize` for more options.
+    """
+    return Normalizer().iter(chunks)
+
+
+def _normalizer(inst, kwargs):
+    """Return the Normalizer to use for the text of backend `inst`, None
+    if it must not be normalized.
+    """
+    if getattr(inst, 'normalized', False):
+        return None
+    return normalizer_from_kwargs(kwargs)
+
+
+def truncate_iter(chunks, max_chars):
+    """Yield text chunks until they add up to `max_chars` chars, then
+    stop consuming `chunks` (and hence the backend producing them).
+    """
+    left = max_chars
+    for chunk in chunks:
+        if len(chunk) >= left:
+            chunk = chunk[:left].rstrip(u' \n')
+            if chunk:
+                yield chunk
+            return
+        left -= len(chunk)
+        yield chunk
+
+
 def is_binary(f):
     """Return True if binary mode."""
     # NOTE: order matters here. We don't bail on Python 2 just yet. Both
@@ -341,14 +409,16 @@ def is_binary(f):
         return True
 
     # If the file has a mode, and it contains b, it is binary.
-    try:
-        if 'b' in getattr(f, 'mode', ''):
-            return True
-    except TypeError:
-        import gzip
-        if isinstance(f, gzip.GzipFile):
-            return True  # in gzip mode is an integer
-        raise
+    mode = getattr(f, 'mode', '')
+    if isinstance(mode, int):
+        return True  # gzip.GzipFile (also wrapped, e.g. CountingReader)
+    if 'b' in mode:
+        return True
+
+    # Can we peek?
+    peek = getattr(f, 'peek', None)
+    if callable(peek):
+        return hasattr(peek(1), 'decode')
 
     # Can we sniff?
     try:
@@ -414,15 +484,70 @@ def handle_fobj(backend, f, **kwargs):
         if 'ext' in kwargs:
             ext = '.' + kwargs['ext']
 
-        with fobj_to_tempfile(f, suffix=ext) as fname:
+        with fobj_to_tempfile(
+                f, suffix=ext,
+                label=backend.__class__.__module__) as fname:
             return backend.handle_path(fname, **kwargs)
     else:
         raise AssertionError(
             'Backend %s has no _get functions' % backend.__name__)
 
 
+def iter_backend(backend, path_or_file):
+    """
+    Iterate over the text chunks of a path or file-like object.
+
+    Called by `get_iter()`. Prefers backend's `iter_path()` or
+    `iter_fobj()` (in this order for paths, the opposite for file
+    objects). If the backend provides none of them the whole text is
+    extracted via `handle_path()` or `handle_fobj()` and yielded at
+    once.
+    """
+    iter_path = getattr(backend, 'iter_path', None)
+    iter_fobj = getattr(backend, 'iter_fobj', None)
+    if is_file_path(path_or_file):
+        if callable(iter_path):
+            LOGGER.debug("using iter_path")
+            chunks = iter_path(path_or_file)
+        elif callable(iter_fobj):
+            LOGGER.debug("using iter_fobj")
+            with open(path_or_file, 'rb') as f:
+                for chunk in iter_fobj(f):
+                    yield chunk
+            return
+        else:
+            chunks = [handle_path(backend, path_or_file)]
+    else:
+        if not is_binary(path_or_file):
+            raise AssertionError('File must be opened in binary mode.')
+        if callable(iter_fobj):
+            LOGGER.debug("using iter_fobj")
+            chunks = iter_fobj(path_or_file)
+        elif callable(iter_path):
+            LOGGER.debug("using iter_path")
+            LOGGER.warning(
+                "Using disk, %r backend does not provide `iter_fobj()`",
+                backend)
+            with fobj_to_tempfile(
+                    path_or_file,
+                    label=backend.__class__.__module__) as fname:
+                for chunk in iter_path(fname):
+                    yield chunk
+            return
+        else:
+            chunks = [handle_fobj(backend, path_or_file)]
+
+    try:
+        for chunk in chunks:
+            yield chunk
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
 def import_mod(mod_name):
-    return __import__(mod_name, fromlist=[' '])
+    with timed('import'):
+        return __import__(mod_name, fromlist=[' '])
 
 
 def backend_from_mime(mime):
@@ -451,9 +576,9 @@ def backend_from_fname(name):
 
     except KeyError:
         try:
-            f = open(name, 'rb')
+            mime = _sniff(mime_from_path, name)
 
-        except IOError as e:
+        except (IOError, OSError) as e:
             # The file may not exist, we are being asked to determine it's type
             # from it's name. Other errors are unexpected.
             if e.errno != errno.ENOENT:
@@ -469,8 +594,7 @@ def backend_from_fname(name):
             mod_name = MIMETYPE_TO_BACKENDS[DEFAULT_MIME]
 
         else:
-            with f:
-                return backend_from_fobj(f)
+            return backend_from_mime(mime)
 
     else:
         mod_name = MIMETYPE_TO_BACKENDS[mime]
@@ -479,21 +603,79 @@ def backend_from_fname(name):
     return mod
 
 
-def backend_from_fobj(f):
-    """Determine backend module object from a file object."""
-    if magic is None:
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        # PEP 562: import magic lib on first access of `fulltext.magic`.
+        if name == 'magic':
+            return get_magic()
+        raise AttributeError(
+            "module %r has no attribute %r" % (__name__, name))
+else:
+    magic = get_magic()
+
+
+def _magic():
+    # Only set as a global if mocked or on Python < 3.7.
+    try:
+        return globals()['magic']
+    except KeyError:
+        return get_magic()
+
+
+def _sniff(fun, path_or_file):
+    if _magic() is None:
         warn("magic lib is not installed; assuming mime type %r" % (
             DEFAULT_MIME))
-        return backend_from_mime(DEFAULT_MIME)
-    else:
-        offset = f.tell()
+        return DEFAULT_MIME
+    return fun(path_or_file, MAGIC_BUFFER_SIZE)
+
+
+def backend_from_fobj(f):
+    """Determine backend module object from a file object."""
+    return backend_from_mime(_sniff(mime_from_fobj, f))
+
+
+# {(Backend class, encoding, encoding_errors, kwargs, title): None or
+# the exception raised by check()}
+_CHECKED = {}
+# Forget all outcomes when there are more, in case kwargs differ on
+# every call.
+_CHECKED_MAX = 1024
+
+
+def check_backend(inst, title=False):
+    """Run `inst.check(title)` only the first time a backend class is
+    used with the same encoding and kwargs, then remember the outcome:
+    if it failed the same error is raised again without calling
+    check(). Call invalidate_backend_cache() if the environment changes
+    (e.g. a CLI tool gets installed).
+    """
+    kwargs = tuple(sorted((k, repr(v)) for k, v in inst.kwargs.items()))
+    key = (inst.__class__, inst.encoding, inst.encoding_errors, kwargs,
+           title)
+    try:
+        err = _CHECKED[key]
+    except KeyError:
+        if len(_CHECKED) >= _CHECKED_MAX:
+            _CHECKED.clear()
         try:
-            f.seek(0)
-            chunk = f.read(MAGIC_BUFFER_SIZE)
-            mime = magic.from_buffer(chunk, mime=True)
-            return backend_from_mime(mime)
-        finally:
-            f.seek(offset)
+            with timed('check'):
+                inst.check(title=title)
+        except Exception as exc:
+            err = exc
+        else:
+            err = None
+        _CHECKED[key] = err
+    if err is not None:
+        # Drop the old traceback, else it would grow on every raise.
+        six.reraise(type(err), err, None)
+
+
+def invalidate_backend_cache():
+    """Forget the outcome of backends' check(), so that it's run again
+    next time.
+    """
+    _CHECKED.clear()
 
 
 def backend_inst_from_mod(mod, encoding, encoding_errors, kwargs):
@@ -508,13 +690,13 @@ def backend_inst_from_mod(mod, encoding, encoding_errors, kwargs):
         raise AttributeError("%r mod does not define any backend class" % mod)
     inst = klass(**kw)
     try:
-        inst.check(title=False)
+        check_backend(inst)
     except Exception as err:
         bin_mod = "fulltext.backends.__bin"
         warn("can't use %r due to %r; use %r backend instead" % (
              mod, str(err), bin_mod))
         inst = import_mod(bin_mod).Backend(**kw)
-        inst.check(title=False)
+        check_backend(inst)
     LOGGER.debug("using %r" % inst)
     return inst
 
@@ -524,67 +706,173 @@ def backend_inst_from_mod(mod, encoding, encoding_errors, kwargs):
 # =====================================================================
 
 
-def _get(path_or_file, default, mime, name, backend, encoding,
-         encoding_errors, kwargs, _wtitle):
-    if encoding is None:
-        encoding = ENCODING
-    if encoding_errors is None:
-        encoding_errors = ENCODING_ERRORS
-
-    kwargs = kwargs.copy() if kwargs is not None else {}
-    kwargs.setdefault("mime", mime)
-
-    # Find backend module.
+def _backend_mod(path_or_file, mime, name, backend):
+    """Find backend module."""
     if backend is None:
         if mime:
-            backend_mod = backend_from_mime(mime)
+            return backend_from_mime(mime)
         elif name:
-            backend_mod = backend_from_fname(name)
+            return backend_from_fname(name)
         else:
             if is_file_path(path_or_file):
-                backend_mod = backend_from_fname(path_or_file)
+                return backend_from_fname(path_or_file)
             else:
-                if hasattr(path_or_file, "name"):
-                    backend_mod = backend_from_fname(path_or_file.name)
+                # Files opened via fd have an int name.
+                if isinstance(getattr(path_or_file, "name", None),
+                              string_types):
+                    return backend_from_fname(path_or_file.name)
                 else:
-                    backend_mod = backend_from_fobj(path_or_file)
+                    return backend_from_fobj(path_or_file)
     else:
         if isinstance(backend, string_types):
             try:
                 mime = EXTS_TO_MIMETYPES['.' + backend]
             except KeyError:
                 raise ValueError("invalid backend %r" % backend)
-            backend_mod = backend_from_mime(mime)
+            return backend_from_mime(mime)
         else:
-            backend_mod = backend
+            return backend
+
+
+def _backend_inst(path_or_file, mime, name, backend, encoding,
+                  encoding_errors, kwargs):
+    """Return an instantiated Backend class."""
+    kwargs = kwargs.copy() if kwargs is not None else {}
+    kwargs.setdefault("mime", mime)
+    # Backends may guess the encoding (e.g. from a BOM) unless one was
+    # passed.
+    kwargs.setdefault("sniff_encoding", encoding is None)
 
-    # Get backend class.
-    inst = backend_inst_from_mod(
+    if encoding is None:
+        encoding = ENCODING
+    if encoding_errors is None:
+        encoding_errors = ENCODING_ERRORS
+
+    with timed('detect'):
+        backend_mod = _backend_mod(path_or_file, mime, name, backend)
+    return backend_inst_from_mod(
         backend_mod, encoding, encoding_errors, kwargs)
-    fun = handle_path if is_file_path(path_or_file) else handle_fobj
 
-    # Run handle_ function, handle callbacks.
-    title = None
+
+def _bytes_read(path_or_file, offset):
+    """Best effort guess of how many bytes an extraction read."""
+    try:
+        if is_file_path(path_or_file):
+            return os.path.getsize(path_or_file)
+        return path_or_file.tell() - offset
+    except Exception:
+        return None
+
+
+def _limit_reader(path_or_file, state):
+    """Charge what's read from archive members to the limits budget."""
+    budget, depth = state
+    if budget is None or depth == 0 or is_file_path(path_or_file):
+        return path_or_file
+    return budget.reader(path_or_file)
+
+
+def _get(path_or_file, default, mime, name, backend, encoding,
+         encoding_errors, kwargs, _wtitle, cache=None):
+    if not is_file_path(path_or_file):
+        path_or_file = peekable(path_or_file)
+    label = name or (path_or_file if is_file_path(path_or_file) else
+                     getattr(path_or_file, 'name', None))
+    with stats_record(label) as rec:
+        if rec is not None and not is_file_path(path_or_file):
+            offset = path_or_file.tell()
+        else:
+            offset = 0
+        inst = _backend_inst(path_or_file, mime, name, backend, encoding,
+                             encoding_errors, kwargs)
+        if rec is not None:
+            rec.backend = inst.__class__.__module__
+        fun = handle_path if is_file_path(path_or_file) else handle_fobj
+
+        key = None
+        if cache:
+            from fulltext.cache import make_key
+
+            with timed('cache'):
+                key = make_key(path_or_file, inst.__class__.__module__,
+                               inst.encoding, inst.encoding_errors,
+                               inst.kwargs, _wtitle)
+                ret = cache.get(key) if key is not None else None
+            if ret is not None:
+                LOGGER.debug("cache hit for %r" % (path_or_file, ))
+                if rec is not None:
+                    rec.cached = True
+                return ret
+
+        max_chars = (kwargs or {}).get('max_chars', None)
+        normalizer = _normalizer(inst, kwargs)
+
+        # Run handle_ function, handle callbacks.
+        title = None
+        inst.setup()
+        try:
+            with timed('extract'):
+                if max_chars is not None:
+                    # Extract incrementally and stop as soon as we have
+                    # enough text.
+                    backend_chunks = chunks = iter_backend(
+                        inst, path_or_file)
+                    if normalizer is not None:
+                        chunks = normalizer.iter(chunks)
+                    try:
+                        text = u''.join(truncate_iter(chunks, max_chars))
+                    finally:
+                        # Kill CLI tools now, before handle_title() may
+                        # need to run another one.
+                        chunks.close()
+                        backend_chunks.close()
+                else:
+                    text = fun(inst, path_or_file)
+            if _wtitle:
+                with timed('title'):
+                    try:
+                        title = inst.handle_title(path_or_file)
+                    except Exception:
+                        LOGGER.exception(
+                            "error while getting title (setting to None)")
+        finally:
+            inst.teardown()
+        if rec is not None:
+            rec.bytes = _bytes_read(path_or_file, offset)
+
+        assert text is not None, "backend function returned None"
+        if max_chars is None and normalizer is not None:
+            with timed('normalize'):
+                text = normalizer.normalize(text)
+        if key is not None:
+            cache.set(key, text, title)
+        return (text, title)
+
+
+def _get_iter(path_or_file, mime, name, backend, encoding, encoding_errors,
+              kwargs):
+    if not is_file_path(path_or_file):
+        path_or_file = peekable(path_or_file)
+    inst = _backend_inst(path_or_file, mime, name, backend, encoding,
+                         encoding_errors, kwargs)
+    chunks = iter_backend(inst, path_or_file)
+    normalizer = _normalizer(inst, kwargs)
+    if normalizer is not None:
+        chunks = normalizer.iter(chunks)
+    max_chars = (kwargs or {}).get('max_chars', None)
+    if max_chars is not None:
+        chunks = truncate_iter(chunks, max_chars)
     inst.setup()
     try:
-        text = fun(inst, path_or_file)
-        if _wtitle:
-            try:
-                title = inst.handle_title(path_or_file)
-            except Exception:
-                LOGGER.exception("error while getting title (setting to None)")
+        for chunk in chunks:
+            yield chunk
     finally:
         inst.teardown()
 
-    assert text is not None, "backend function returned None"
-    text = STRIP_WHITE.sub(' ', text)
-    text = text.strip()
-    return (text, title)
-
 
 def get(path_or_file, default=SENTINAL, mime=None, name=None, backend=None,
-        encoding=None, encoding_errors=None, kwargs=None,
-        _wtitle=False):
+        encoding=None, encoding_errors=None, kwargs=None, cache=None,
+        limits=None, _wtitle=False):
     """
     Get document full text.
 
@@ -600,13 +888,32 @@ def get(path_or_file, default=SENTINAL, mime=None, name=None, backend=None,
        They are taken into consideration mostly only by pure-python
        backends which do not rely on CLI tools.
        Default to "utf8" and "strict" respectively.
-     * `kwargs` are passed to the underlying backend.
+     * `kwargs` are passed to the underlying backend. Some options are
+       understood by all backends: `max_chars` limits the length of the
+       returned text; when possible extraction stops as soon as enough
+       text was produced. `max_pages` limits the number of pages which
+       are extracted (paged formats only, e.g. PDF).
+     * `cache` is a `fulltext.cache.BaseCache` instance used to store
+       and retrieve extracted text, defaults to `CACHE` global. Pass
+       False to disable it.
+     * `limits` is a `fulltext.Limits` instance restricting the
+       resources the document (and the archive members it contains)
+       can use, defaults to `LIMITS` global. `LimitExceeded` is raised
+       when one is hit. Ignored when get() is called by a backend for an
+       archive member: the limits of the archive apply.
     """
+    if cache is None:
+        cache = CACHE
+    if limits is None:
+        limits = LIMITS
     try:
-        text, title = _get(
-            path_or_file, default=default, mime=mime, name=name,
-            backend=backend, kwargs=kwargs, encoding=encoding,
-            encoding_errors=encoding_errors, _wtitle=_wtitle)
+        state = new_limits_state(limits)
+        with use_limits_state(state):
+            text, title = _get(
+                _limit_reader(path_or_file, state), default=default,
+                mime=mime, name=name, backend=backend, kwargs=kwargs,
+                encoding=encoding, encoding_errors=encoding_errors,
+                _wtitle=_wtitle, cache=cache)
         if _wtitle:
             return (text, title)
         else:
@@ -618,9 +925,286 @@ def get(path_or_file, default=SENTINAL, mime=None, name=None, backend=None,
         raise
 
 
+def aget(*args, **kwargs):
+    """asyncio version of get(), to be awaited (Python 3 only).
+    See `fulltext.aio.aget()`.
+    """
+    from fulltext.aio import aget
+
+    return aget(*args, **kwargs)
+
+
 def get_with_title(*args, **kwargs):
     """Like get() but also tries to determine document title.
     Returns a (text, title) tuple.
     """
     kwargs['_wtitle'] = True
     return get(*args, **kwargs)
+
+
+def get_iter(path_or_file, default=SENTINAL, mime=None, name=None,
+             backend=None, encoding=None, encoding_errors=None, kwargs=None,
+             limits=None):
+    """
+    Like get() but returns a generator of text chunks instead of
+    a single string. Whitespace is stripped the same way, so
+    `u''.join(get_iter(f))` is equal to `get(f)`.
+
+    Backends implementing `iter_path()` or `iter_fobj()` extract text
+    incrementally, so memory usage does not depend on document size.
+    Other backends extract the whole text and yield it at once.
+    If `default` is provided errors are logged and stop the iteration;
+    `default` is yielded if no text was produced yet.
+    """
+    if limits is None:
+        limits = LIMITS
+    produced = False
+    try:
+        state = new_limits_state(limits)
+        chunks = _get_iter(
+            _limit_reader(path_or_file, state), mime=mime, name=name,
+            backend=backend, encoding=encoding,
+            encoding_errors=encoding_errors, kwargs=kwargs)
+        for chunk in iter_with_state(state, chunks):
+            produced = True
+            yield chunk
+    except Exception as e:
+        if default is SENTINAL:
+            raise
+        LOGGER.exception(e)
+        if not produced:
+            yield default
+
+
+# --- batch extraction
+
+
+def _get_many_job(path, data, name, backend, mod_name, kw):
+    """Run get() in a worker process. Return text (or a (text, title)
+    tuple) or, in case of failure, the exception instance.
+    """
+    if mod_name is not None:
+        backend = import_mod(mod_name)
+    if path is None:
+        path = BytesIO(data)
+    try:
+        return get(path, name=name, backend=backend, **kw)
+    except Exception as err:
+        import pickle
+
+        try:
+            pickle.dumps(err)
+        except Exception:
+            # An exception which can't be pickled would break the pool,
+            # so we send back something which can.
+            err = BackendError("%s: %s" % (err.__class__.__name__, err))
+        return err
+
+
+def get_many(paths_or_files, workers=None, default=SENTINAL, mime=None,
+             name=None, backend=None, encoding=None, encoding_errors=None,
+             kwargs=None, cache=None, limits=None, _wtitle=False):
+    """
+    Get full text of many documents by using a pool of processes.
+
+    This is a generator yielding a `(path_or_file, text)` tuple for each
+    input, in the order extraction completes. In case of failure `text`
+    is the exception instance, unless `default` is provided.
+     * `workers` is the number of worker processes (defaults to the
+       number of CPUs). If 1 documents are processed serially in the
+       current process.
+     * file objects are read in memory and sent to the worker
+       processes, so passing paths is preferable.
+     * with worker processes only caches which can be shared between
+       processes (e.g. `SQLiteCache`) are used; others (e.g.
+       `MemoryCache`) are ignored.
+     * if a worker process dies (e.g. killed by the OOM killer) `text`
+       is a `BrokenProcessPool` exception for the documents it may
+       have been handling; a new pool is started for the others.
+     * all other args have the same meaning as in `get()` and apply to
+       all documents.
+    """
+    # Note: `default` is handled here as SENTINAL can't be pickled.
+    if cache is None:
+        cache = CACHE
+    kw = dict(mime=mime, encoding=encoding, encoding_errors=encoding_errors,
+              kwargs=kwargs, cache=cache, limits=limits, _wtitle=_wtitle)
+    # Modules can't be pickled; pass their import name instead.
+    mod_name = None
+    if backend is not None and not isinstance(backend, string_types):
+        mod_name = backend.__name__
+
+    def result(path_or_file, text):
+        if isinstance(text, Exception) and default is not SENTINAL:
+            LOGGER.error("error while extracting %r: %r" % (
+                path_or_file, text))
+            text = default
+        return (path_or_file, text)
+
+    if workers != 1 and cache and not getattr(cache, 'shared', False):
+        # Workers would only fill (and pickle) their own copy of it.
+        LOGGER.warning("%r can't be shared with worker processes; "
+                       "not using it" % cache)
+        kw['cache'] = False
+
+    if workers == 1:
+        for path_or_file in paths_or_files:
+            try:
+                text = get(path_or_file, name=name, backend=backend, **kw)
+            except Exception as err:
+                text = err
+            yield result(path_or_file, text)
+        return
+
+    def jobs():
+        for path_or_file in paths_or_files:
+            path, data, fname = None, None, name
+            if is_file_path(path_or_file):
+                path = path_or_file
+            else:
+                data = path_or_file.read()
+                if fname is None and mime is None:
+                    # Mimic get(), which looks at the "name" attr.
+                    fname = getattr(path_or_file, "name", None)
+            yield path_or_file, (path, data, fname,
+                                 None if mod_name else backend, mod_name, kw)
+
+    # Documents are read lazily, at most `workers * 2` at a time, so
+    # that arbitrarily long iterables don't end up being loaded in
+    # memory. If a worker dies (e.g. killed by the OOM killer) the
+    # documents it was handling get a BrokenProcessPool error.
+    workers = workers or cpu_count() or 1
+    for path_or_file, text in imap_processes(_get_many_job, jobs(), workers):
+        yield result(path_or_file, text)
+
+
+# --- container members
+
+
+# A member of a container document (archive, mailbox, e-mail) yielded
+# by iter_members(). `size` is the uncompressed size (None if unknown),
+# `error` the exception raised while extracting it (`text` is None
+# then) and `elapsed` the seconds it took.
+Member = collections.namedtuple(
+    'Member', ['name', 'mime', 'size', 'text', 'error', 'elapsed'])
+
+
+def _member_mime(name, mime):
+    """The MIME type to use for a member: the one stated by the
+    container if we have a backend for it, else the one of the file
+    extension, else None.
+    """
+    if mime not in MIMETYPE_TO_BACKENDS:
+        mime = EXTS_TO_MIMETYPES.get(splitext(name)[1])
+    if mime is not None and mime.startswith('[custom-fulltext-mime]'):
+        mime = 'text/plain'
+    return mime
+
+
+def _extract_member(name, mime, size, f, skip_errors, kw):
+    mime = _member_mime(name, mime)
+    text = error = None
+    started = timer()
+    try:
+        if mime is None:
+            f = peekable(f)
+            mime = _sniff(mime_from_fobj, f)
+        text = get(f, mime=mime, name=name, **kw)
+    except Exception as err:
+        # A limit applies to the whole document, not to the member.
+        if not skip_errors or isinstance(err, LimitExceeded):
+            raise
+        LOGGER.warning("can't extract member %r: %r" % (name, err))
+        error = err
+    if size is None and error is None:
+        try:
+            size = f.tell()
+        except Exception:
+            pass
+    return Member(name, mime, size, text, error, timer() - started)
+
+
+def extract_members(members, workers=1, skip_errors=True, **kw):
+    """Extract `members`, an iterable of (name, mime, size, fobj) tuples
+    as produced by backends' iter_members(), and yield Member tuples in
+    the same order. `kw` are passed to get().
+
+    With `workers` != 1 (0 = one per CPU) members are extracted in a
+    thread pool. Each member is read by the calling thread (archive
+    objects are not thread safe) into a buffer which spills on disk
+    past `util.MAX_INFLIGHT_BYTES / (workers * 2)`, so that no more
+    than `util.MAX_INFLIGHT_BYTES` are held in memory.
+    """
+    if workers == 1:
+        for name, mime, size, f in members:
+            yield _extract_member(name, mime, size, f, skip_errors, kw)
+        return
+
+    import shutil
+    import tempfile
+
+    workers = workers or cpu_count() or 1
+    max_size = util.MAX_INFLIGHT_BYTES // (workers * 2)
+    # Worker threads extract members of the same document.
+    state = get_limits_state()
+    budget = state[0] if state is not None else None
+
+    def buffered():
+        for name, mime, size, f in members:
+            buf = tempfile.SpooledTemporaryFile(
+                max_size=max_size, dir=util.TEMPDIR)
+            if budget is not None:
+                # Bytes are charged when the worker reads the buffer,
+                # but don't buffer more than allowed.
+                f = budget.reader(f, charge=False)
+            shutil.copyfileobj(f, buf)
+            if size is None:
+                size = buf.tell()
+            buf.seek(0)
+            yield name, mime, size, buf
+
+    def job(item):
+        name, mime, size, buf = item
+        with buf:
+            with use_limits_state(state):
+                return _extract_member(
+                    name, mime, size, buf, skip_errors, kw)
+
+    for member in imap_ordered(job, buffered(), workers):
+        yield member
+
+
+def iter_members(path_or_file, mime=None, name=None, backend=None,
+                 encoding=None, encoding_errors=None, kwargs=None,
+                 workers=1, skip_errors=True, limits=None):
+    """Extract the members of a container document (zip, rar, gz, mbox
+    or eml) one by one and yield a `Member` named tuple for each, in
+    the order they appear in the container (sorted by name for zip).
+    Args have the same meaning as in `get()` and are used both for the
+    container and its members. If `skip_errors` is True a member which
+    can't be extracted is yielded with its `error` set, else the error
+    is raised. `workers` threads extract members in parallel (0 = one
+    per CPU). `limits` apply to the container as a whole, see `get()`.
+    """
+    if limits is None:
+        limits = LIMITS
+    state = new_limits_state(limits)
+    path_or_file = _limit_reader(path_or_file, state)
+    if not is_file_path(path_or_file):
+        path_or_file = peekable(path_or_file)
+    with use_limits_state(state):
+        inst = _backend_inst(path_or_file, mime, name, backend, encoding,
+                             encoding_errors, kwargs)
+    if not callable(getattr(inst, 'iter_members', None)):
+        raise ValueError("%r backend has no members" % (
+            inst.__class__.__module__))
+    kw = dict(encoding=encoding, encoding_errors=encoding_errors,
+              kwargs=kwargs)
+    inst.setup()
+    try:
+        members = extract_members(inst.iter_members(path_or_file), workers,
+                                  skip_errors, **kw)
+        for member in iter_with_state(state, members):
+            yield member
+    finally:
+        inst.teardown()
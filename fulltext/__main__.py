@@ -4,6 +4,7 @@ Fulltext CLI interface.
 
 from __future__ import absolute_import, print_function
 
+import json
 import os
 import sys
 import logging
@@ -12,6 +13,7 @@ from docopt import docopt
 
 import fulltext
 import fulltext.backends
+from fulltext import stats
 from fulltext.util import hilite
 
 
@@ -59,6 +61,41 @@ def check_backends(title):
         sys.exit(1)
 
 
+def bench(opt):
+    from fulltext import bench
+
+    kinds = bench.KINDS
+    if opt['--kinds'] != 'all':
+        kinds = opt['--kinds'].split(',')
+    results = bench.main(
+        corpus_dir=opt['--corpus'], kinds=kinds,
+        size=bench.parse_size(opt['--size']), count=int(opt['--count']),
+        repeat=int(opt['--repeat']))
+    if opt['--output']:
+        with open(opt['--output'], 'w') as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+    else:
+        print(json.dumps(results, indent=4, sort_keys=True))
+
+
+def crawl(opt):
+    from fulltext.crawl import crawl, State
+
+    state = State(opt['--state']) if opt['--state'] else None
+    out = open(opt['--output'], 'w') if opt['--output'] else sys.stdout
+    try:
+        for rec in crawl(opt['<dir>'], state=state,
+                         workers=int(opt['--jobs']), title=opt['--title']):
+            out.write(json.dumps(rec, sort_keys=True))
+            out.write('\n')
+    finally:
+        # Also save progress if interrupted.
+        if state is not None:
+            state.save()
+        if out is not sys.stdout:
+            out.close()
+
+
 def config_logging(verbose):
     handler = logging.StreamHandler(sys.stdout)
     handler.setFormatter(logging.Formatter(
@@ -74,17 +111,32 @@ def main(args=sys.argv[1:]):
     Commands:
         extract - extract text from path
         check   - make sure all deps are installed
+        bench   - benchmark backends and print results as JSON
+        crawl   - extract all files in dirs and print JSON lines
 
     Usage:
-        fulltext extract [-v] [-f] <path>...
+        fulltext extract [-v] [-f] [-s] <path>...
         fulltext check [-t]
+        fulltext bench [options] [-v]
+        fulltext crawl [options] [-v] [-t] <dir>...
 
     Options:
         -f, --file           Open file first.
-        -t, --title          Check deps for title.
+        -s, --stats          Print time spent by each backend to stderr.
+        -t, --title          Check deps for title (check) or extract titles
+                             (crawl).
         -v, --verbose        More verbose output.
+        -o, --output=<file>  Write JSON results to file instead of stdout.
+        -j, --jobs=<n>       Number of worker processes [default: 0].
+        --state=<file>       Only extract files changed since the previous
+                             crawl using this state file.
+        --corpus=<dir>       Benchmark files in dir instead of generating them.
+        --kinds=<kinds>      Comma separated list of extensions [default: all].
+        --size=<size>        Size of generated docs, e.g. 64K [default: 256K].
+        --count=<n>          Number of generated docs per kind [default: 20].
+        --repeat=<n>         Extract each doc n times [default: 1].
     """
-    opt = docopt(main.__doc__.strip(), args, options_first=True)
+    opt = docopt(main.__doc__.strip(), args)
 
     config_logging(opt['--verbose'])
 
@@ -96,8 +148,19 @@ def main(args=sys.argv[1:]):
         if opt['--file']:
             handler = _handle_open
 
+        if opt['--stats']:
+            agg = stats.Aggregator()
+            stats.register_hook(agg)
+
         for path in opt['<path>']:
             print(handler(path))
+
+        if opt['--stats']:
+            print(agg.format(), file=sys.stderr)
+    elif opt['bench']:
+        bench(opt)
+    elif opt['crawl']:
+        crawl(opt)
     else:
         # we should never get here
         raise ValueError("don't know how to handle cmd")
@@ -0,0 +1,324 @@
+"""
+asyncio API (Python 3 only).
+
+    >>> import fulltext
+    >>> text = await fulltext.aget('foo.pdf')
+
+Backends based on CLI tools (pdf, doc, rtf, ps, hwp) run their
+subprocess via `asyncio.create_subprocess_exec()`, so no thread is tied
+up while waiting for it and thousands of extractions can share one
+event loop. All other backends are offloaded to a bounded thread pool
+(see `set_executor()`). The number of concurrent subprocesses is capped
+by `fulltext.util.MAX_CHILDREN`, same as for the sync API, and so are
+their timeout and resource limits.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import logging
+import subprocess
+import weakref
+
+import fulltext
+from fulltext.backends import __doc as doc_backend
+from fulltext.backends import __hwp as hwp_backend
+from fulltext.backends import __pdf as pdf_backend
+from fulltext.backends import __ps as ps_backend
+from fulltext.backends import __rtf as rtf_backend
+from fulltext.compat import POSIX
+from fulltext.compat import cpu_count
+from fulltext.detect import peekable
+from fulltext.util import MissingCommandException
+from fulltext.util import ShellError
+from fulltext.util import ShellTimeoutError
+from fulltext.util import check_output
+from fulltext.util import is_file_path
+from fulltext import limits as limits_mod
+from fulltext import util
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(logging.NullHandler())
+BUFFER_MAX = 64 * 1024
+
+_executor = None
+# One semaphore per event loop.
+_sems = weakref.WeakKeyDictionary()
+# {backend module name: (ahandle_path, ahandle_fobj)}
+ASYNC_BACKENDS = {}
+# The limits state (see `fulltext.limits`) of the aget() call running
+# in the current task. Coroutines of different documents share the
+# event loop thread, so the thread local state of the sync API can't
+# be used across awaits.
+_limits_state = contextvars.ContextVar('fulltext_limits', default=None)
+
+
+def get_executor():
+    """Return the executor used for backends with no async support.
+    Defaults to a thread pool with one thread per CPU.
+    """
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=cpu_count() or 1)
+    return _executor
+
+
+def set_executor(executor):
+    global _executor
+    _executor = executor
+
+
+def _semaphore():
+    loop = asyncio.get_event_loop()
+    try:
+        return _sems[loop]
+    except KeyError:
+        sem = _sems[loop] = asyncio.Semaphore(util.MAX_CHILDREN)
+        return sem
+
+
+async def _feed(pipe, f):
+    """Copy file object `f` into subprocess stdin."""
+    try:
+        while True:
+            chunk = f.read(BUFFER_MAX)
+            if not chunk:
+                break
+            pipe.write(chunk)
+            await pipe.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        # The process exited without reading all of its input.
+        pass
+    finally:
+        pipe.close()
+
+
+def _use_limits_state():
+    """Make the limits state of the running aget() call visible to the
+    sync code of the with block, which must not await anything.
+    """
+    return limits_mod.use_state(_limits_state.get())
+
+
+async def arun(*cmd, stdin=None, timeout=None, max_memory=None,
+               max_cpu=None):
+    """Async version of `fulltext.util.run()`. `stdin` may be any
+    binary file object. `timeout` is capped as in `run()` (by
+    `fulltext.util.TIMEOUT` and by the time left to the document),
+    `max_memory` and `max_cpu` default to `fulltext.util.MAX_MEMORY`
+    and `fulltext.util.MAX_CPU`.
+    """
+    with _use_limits_state():
+        timeout = util.get_timeout(timeout)
+    if max_memory is None:
+        max_memory = util.MAX_MEMORY
+    if max_cpu is None:
+        max_cpu = util.MAX_CPU
+    popen_kw = util._popen_kwargs(timeout is not None, max_memory, max_cpu)
+    group = bool(popen_kw)
+    async with _semaphore():
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=None if stdin is None else subprocess.PIPE,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                **popen_kw)
+        except FileNotFoundError:
+            raise MissingCommandException(cmd[0])
+
+        try:
+            if stdin is None:
+                coro = proc.communicate()
+            else:
+                coro = asyncio.gather(_feed(proc.stdin, stdin),
+                                      proc.communicate())
+            try:
+                ret = await asyncio.wait_for(coro, timeout)
+            except asyncio.TimeoutError:
+                util._kill(proc, group)
+                await proc.wait()
+                # If it's the document which ran out of time say so.
+                with _use_limits_state():
+                    limits_mod.check_time()
+                raise ShellTimeoutError(' '.join(cmd), proc.returncode,
+                                        b'', b'', timeout=timeout)
+            stdout, stderr = ret if stdin is None else ret[1]
+        except BaseException:
+            # Cancelled or failed: don't leave the process around.
+            if proc.returncode is None:
+                util._kill(proc, group)
+                await proc.wait()
+            raise
+        return check_output(cmd, proc.returncode, stdout, stderr)
+
+
+def register_async_backend(mod_name, ahandle_path=None, ahandle_fobj=None):
+    """Register coroutine functions extracting text with a backend
+    instance. Both are called as `fun(backend_inst, path_or_file)`
+    and must return unicode text. If one is missing `aget()` falls back
+    on running the sync backend in the executor.
+    """
+    ASYNC_BACKENDS[mod_name] = (ahandle_path, ahandle_fobj)
+
+
+# =====================================================================
+# --- CLI based backends
+# =====================================================================
+
+
+async def _pdf_path(inst, path):
+    return inst.decode(await arun(*pdf_backend.unix_cmd(path, **inst.kwargs)))
+
+
+async def _pdf_fobj(inst, f):
+    return inst.decode(await arun(
+        *pdf_backend.unix_cmd('-', **inst.kwargs), stdin=f))
+
+
+async def _doc(inst, path_or_file):
+    if is_file_path(path_or_file):
+        src, stdin = path_or_file, None
+    else:
+        src, stdin = '-', path_or_file
+        offset = stdin.tell()
+    try:
+        return inst.decode(await arun('antiword', src, stdin=stdin))
+    except ShellError as e:
+        if b'not a Word Document' not in e.stderr:
+            raise
+        LOGGER.warning('.doc file unsupported format, trying abiword')
+    except MissingCommandException:
+        LOGGER.warning('CLI tool "antiword" missing, using "abiword"')
+
+    # Try abiword, slower, but supports more formats.
+    if stdin is None:
+        return inst.decode(await arun(
+            'abiword', '--to=txt', '--to-name=fd://1', src))
+    stdin.seek(offset)
+    return inst.decode(await arun(
+        'abiword', '--to=txt', '--to-name=fd://1', 'fd://0', stdin=stdin))
+
+
+async def _rtf(inst, path_or_file):
+    if is_file_path(path_or_file):
+        out = await arun('unrtf', '--text', '--nopict', path_or_file)
+    else:
+        out = await arun('unrtf', '--text', '--nopict', stdin=path_or_file)
+    return inst.strip(out)
+
+
+async def _ps(inst, path_or_file):
+    if is_file_path(path_or_file):
+        out = await arun('pstotext', path_or_file)
+    else:
+        out = await arun('pstotext', '-', stdin=path_or_file)
+    return inst.decode(out)
+
+
+async def _hwp_path(inst, path):
+    out = inst.decode(await arun(*hwp_backend.cmd(path)))
+    return hwp_backend.to_text_with_backend(out)
+
+
+if POSIX:
+    # On Windows these backends go through temporary files and
+    # different code paths; let them run in the executor.
+    register_async_backend(pdf_backend.__name__, _pdf_path, _pdf_fobj)
+    register_async_backend(rtf_backend.__name__, _rtf, _rtf)
+register_async_backend(doc_backend.__name__, _doc, _doc)
+register_async_backend(ps_backend.__name__, _ps, _ps)
+register_async_backend(hwp_backend.__name__, _hwp_path, None)
+
+
+# =====================================================================
+# --- public API
+# =====================================================================
+
+
+async def _aget(path_or_file, mime, name, backend, encoding,
+                encoding_errors, kwargs, cache, limits, executor):
+    loop = asyncio.get_event_loop()
+    executor = executor or get_executor()
+    if cache is None:
+        cache = fulltext.CACHE
+    if limits is None:
+        limits = fulltext.LIMITS
+    if not is_file_path(path_or_file):
+        path_or_file = peekable(path_or_file)
+
+    inst = fulltext._backend_inst(path_or_file, mime, name, backend,
+                                  encoding, encoding_errors, kwargs)
+    mod_name = inst.__class__.__module__
+    funs = ASYNC_BACKENDS.get(mod_name, (None, None))
+    fun = funs[0] if is_file_path(path_or_file) else funs[1]
+    if fun is None:
+        # Run the sync API in a thread. Pass the module we already
+        # picked so that the file is not sniffed again.
+        return await loop.run_in_executor(executor, functools.partial(
+            fulltext.get, path_or_file, mime=mime, name=name,
+            backend=fulltext.import_mod(mod_name), encoding=encoding,
+            encoding_errors=encoding_errors, kwargs=kwargs, cache=cache,
+            limits=limits))
+
+    token = _limits_state.set(limits_mod.new_state(limits))
+    try:
+        return await _aget_async(loop, executor, inst, fun, path_or_file,
+                                 cache)
+    finally:
+        _limits_state.reset(token)
+
+
+async def _aget_async(loop, executor, inst, fun, path_or_file, cache):
+    """Extract text with `fun`, one of the ASYNC_BACKENDS coroutines."""
+    mod_name = inst.__class__.__module__
+    key = None
+    if cache:
+        from fulltext.cache import make_key
+
+        def lookup():
+            key = make_key(path_or_file, mod_name, inst.encoding,
+                           inst.encoding_errors, inst.kwargs, False)
+            return (key, cache.get(key) if key is not None else None)
+
+        key, ret = await loop.run_in_executor(executor, lookup)
+        if ret is not None:
+            return ret[0]
+
+    inst.setup()
+    try:
+        text = await fun(inst, path_or_file)
+    finally:
+        inst.teardown()
+
+    assert text is not None, "backend function returned None"
+    max_chars = inst.kwargs.get('max_chars', None)
+    normalizer = fulltext._normalizer(inst, inst.kwargs)
+    if normalizer is not None:
+        text = normalizer.normalize(text)
+    if max_chars is not None:
+        text = u''.join(fulltext.truncate_iter([text], max_chars))
+    if key is not None:
+        await loop.run_in_executor(executor, cache.set, key, text, None)
+    return text
+
+
+async def aget(path_or_file, default=fulltext.SENTINAL, mime=None,
+               name=None, backend=None, encoding=None, encoding_errors=None,
+               kwargs=None, cache=None, limits=None, executor=None):
+    """Async version of `fulltext.get()`. Args have the same meaning.
+    `executor` is used for backends which don't support asyncio,
+    defaults to `get_executor()`.
+    """
+    try:
+        return await _aget(
+            path_or_file, mime=mime, name=name, backend=backend,
+            encoding=encoding, encoding_errors=encoding_errors,
+            kwargs=kwargs, cache=cache, limits=limits, executor=executor)
+    except Exception as e:
+        if default is not fulltext.SENTINAL:
+            LOGGER.exception(e)
+            return default
+        raise
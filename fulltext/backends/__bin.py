@@ -1,10 +1,28 @@
+"""
+Fallback backend for binary (and unknown) files, emulating the
+`strings` CLI tool: it extracts runs of at least `min_length` printable
+ASCII chars (kwarg, defaults to MIN_LENGTH), both plain and UTF-16LE
+encoded (as found in Windows binaries).
+
+Runs are found in bulk: each chunk is mapped via bytes.translate() to a
+mask of byte classes, which is then scanned with bytes.find(), so Python
+code only runs once per string found rather than once per byte.
+
+Huge files (e.g. disk images) can be sampled rather than read whole: if
+a seekable file is bigger than `sample_size` bytes (kwarg, defaults to
+SAMPLE_SIZE, which is set via FULLTEXT_BIN_SAMPLE_SIZE env var) only
+its head, its tail and `sample_windows` evenly spaced windows in
+between are read, `sample_size` bytes in total. The result being
+partial is logged and reported to stats hooks (`Record.partial`).
+"""
+
 from __future__ import absolute_import
 
+import logging
+import os
 import re
 import string
 
-from six import StringIO
-
 try:
     from string import maketrans
 
@@ -14,17 +32,29 @@ try:
 except ImportError:
     maketrans = bytes.maketrans
 
+from fulltext import stats
+from fulltext.detect import is_seekable
 from fulltext.util import BaseBackend
 
 
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(logging.NullHandler())
 BUFFER_MAX = 1024 * 1024
-
-# Translate printable chars to themselves and anything else to a space.
-TRANSLATE = (
+# Shortest run of printable chars considered a string (`strings -n`).
+MIN_LENGTH = 4
+# Max bytes read from a file before sampling it (None: read it all).
+SAMPLE_SIZE = int(os.environ.get('FULLTEXT_BIN_SAMPLE_SIZE', 0)) or None
+# Windows read between the head and the tail of a sampled file.
+SAMPLE_WINDOWS = 16
+
+# Byte classes: printable (a), NUL (z), anything else (.).
+PRINTABLE = [ord(x) for x in string.printable]
+MASK = maketrans(
     bytes([i for i in range(256)]),
-    bytes([i if chr(i) in string.printable else 32 for i in range(256)])
-)
-TRANSLATE = maketrans(*TRANSLATE)
+    bytes([0x61 if i in PRINTABLE else 0x7a if i == 0 else 0x2e
+           for i in range(256)]))
+ASCII_RUN = re.compile(b'a+')
+UTF16_RUN = re.compile(b'(?:az)+')
 
 # I wish Python re module had a punctuation char class!
 # https://pythex.org/
@@ -34,24 +64,140 @@ STRIP_PUNCTUATION = re.compile(
     r'|}~0-9])[^\w]*\b')
 
 
-class Backend(BaseBackend):
-
-    def handle_fobj(self, f):
-        buffer = StringIO()
-
-        while True:
-            text = f.read(BUFFER_MAX)
-
-            if not text:
-                break
+def iter_runs(mask, needle, run_re):
+    """Yield (start, end) of the runs in `mask` starting with `needle`
+    and matching `run_re`.
+    """
+    pos = 0
+    while True:
+        start = mask.find(needle, pos)
+        if start == -1:
+            return
+        pos = run_re.match(mask, start).end()
+        yield start, pos
+
+
+def find_strings(data, min_length=MIN_LENGTH):
+    """Return the list of strings (as text) found in `data` bytes, in
+    order.
+    """
+    mask = data.translate(MASK)
+    runs = [(s, e, False) for s, e in iter_runs(
+        mask, b'a' * min_length, ASCII_RUN)]
+    if b'az' * min_length in mask:
+        runs.extend((s, e, True) for s, e in iter_runs(
+            mask, b'az' * min_length, UTF16_RUN))
+        runs.sort()
+    strings, last = [], 0
+    for start, end, utf16 in runs:
+        if start < last:
+            # E.g. "abcde\0f\0g\0h\0": UTF-16 starts at "e", which
+            # belongs to the ASCII run.
+            if not utf16:
+                continue
+            start += (last - start + 1) // 2 * 2
+            if (end - start) // 2 < min_length:
+                continue
+        run = data[start:end:2] if utf16 else data[start:end]
+        strings.append(run.decode('ascii'))
+        last = end
+    return strings
+
+
+def sample_windows(size, sample_size, windows=SAMPLE_WINDOWS):
+    """Return the (offset, length) of the windows to read from a file of
+    `size` bytes: the head, `windows` evenly spaced ones and the tail.
+    """
+    if size <= sample_size:
+        return [(0, size)]
+    length = max(sample_size // (windows + 2), 1)
+    return [((size - length) * i // (windows + 1), length)
+            for i in range(windows + 2)]
+
+
+def iter_strings(chunks, min_length=MIN_LENGTH):
+    """Extract strings from an iterable of bytes chunks, yielding
+    them as text (one piece per chunk with strings in it).
+    """
+    carry = b''
+    for chunk in chunks:
+        data = carry + chunk
+        # A string may go on in the next chunk: keep the trailing
+        # printable and NUL bytes for later, but for leading NULs
+        # (which can't start a string).
+        mask = data.translate(MASK)
+        cut = len(mask.rstrip(b'az'))
+        start = len(mask) - len(mask[cut:].lstrip(b'z'))
+        if len(data) - start > BUFFER_MAX:
+            # Too much to carry (a text file?): split it between words
+            # if possible.
+            start = cut = data.rfind(b' ', len(data) - BUFFER_MAX) + 1
+            if not cut:
+                start = cut = len(data) - BUFFER_MAX
+            elif data[cut:cut + 1] == b'\0':
+                start = cut = cut + 1  # UTF-16 space
+        data, carry = data[:cut], data[start:]
+        strings = find_strings(data, min_length)
+        if strings:
+            yield u' '.join(strings)
+    strings = find_strings(carry, min_length)
+    if strings:
+        yield u' '.join(strings)
+
+
+def _file_size(f):
+    """Return the bytes left to read in file object `f`, None if it's
+    not seekable.
+    """
+    if not is_seekable(f):
+        return None
+    try:
+        pos = f.tell()
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(pos)
+    except (EnvironmentError, ValueError):
+        return None
+    return size - pos
+
+
+def _iter_window(f, offset, length):
+    f.seek(offset)
+    while length > 0:
+        chunk = f.read(min(length, BUFFER_MAX))
+        if not chunk:
+            break
+        length -= len(chunk)
+        yield chunk
 
-            # Emulate the `strings` CLI tool.
-            text = text.translate(TRANSLATE)
-            text = text.decode('ascii', 'ignore')
 
-            # Remove any "words" that consist mainly of punctuation.
-            text = STRIP_PUNCTUATION.sub(' ', text)
+class Backend(BaseBackend):
 
-            buffer.write(text)
+    def iter_fobj(self, f):
+        min_length = int(self.kwargs.get('min_length', None) or MIN_LENGTH)
+        sample_size = self.kwargs.get('sample_size', SAMPLE_SIZE)
+        size = _file_size(f) if sample_size else None
+        if size is None or size <= sample_size:
+            windows = [iter(lambda: f.read(BUFFER_MAX), b'')]
+        else:
+            start = f.tell()
+            layout = sample_windows(size, sample_size, int(self.kwargs.get(
+                'sample_windows', SAMPLE_WINDOWS)))
+            LOGGER.info("%s is %s bytes, only sampling %s of them" % (
+                getattr(f, 'name', 'file'), size,
+                sum(x[1] for x in layout)))
+            rec = stats.current()
+            if rec is not None:
+                rec.partial = True
+            windows = [_iter_window(f, start + offset, length)
+                       for offset, length in layout]
+
+        sep = u''
+        for chunks in windows:
+            for text in iter_strings(chunks, min_length):
+                # Remove any "words" that consist mainly of punctuation.
+                yield sep + STRIP_PUNCTUATION.sub(' ', text)
+                sep = u' '
 
-        return buffer.getvalue()
+    def handle_fobj(self, f):
+        return u''.join(self.iter_fobj(f))
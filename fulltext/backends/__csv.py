@@ -1,52 +1,193 @@
+"""
+Backend for CSV, TSV and PSV files. The file is read and parsed
+incrementally, so memory usage doesn't depend on its size.
+
+The delimiter is the `delimiter` kwarg if passed, else the one of an
+explicit 'text/tsv' or 'text/psv' MIME type, else it's sniffed from the
+first SNIFF_SIZE chars of the file among DELIMITERS.
+
+Columns can be left out via kwargs:
+ * include_columns: only extract these columns
+ * exclude_columns: don't extract these columns
+ * skip_numeric: if True leave out cells which are numbers (IDs,
+   amounts, etc.), which are seldom worth indexing
+
+Columns are given as 0-based indexes or as names from the first row
+(the header, which is extracted as any other row).
+"""
+
 from __future__ import absolute_import
 
 import csv
+import io
+import itertools
+import re
 
-from six import StringIO
 from six import PY3
+from six import string_types
 
 from fulltext.util import BaseBackend
 
 
+# Rows are grouped together up to this size (in chars) before being
+# yielded by iter_fobj().
+BUFFER_MAX = 64 * 1024
+# Chars of the file looked at to guess its dialect.
+SNIFF_SIZE = 16 * 1024
+DELIMITERS = ',\t|;'
+MIME_DELIMITERS = {
+    'text/tsv': '\t',
+    'text/psv': '|',
+}
+NUMBER = re.compile(r'\s*[-+$]?[\d.,]*\d[\d.,]*%?\s*\Z')
+
+
+class _Reader(io.RawIOBase):
+    """Expose any binary file object as a raw stream, so that it can be
+    wrapped by io.TextIOWrapper. Only read() is used.
+    """
+
+    def __init__(self, f):
+        self._f = f
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        data = self._f.read(len(b))
+        n = len(data)
+        b[:n] = data
+        return n
+
+
+def sniff_dialect(sample, delimiters=DELIMITERS):
+    """Return the csv dialect of a file starting with `sample` text.
+    If csv.Sniffer can't tell (e.g. rows of different lengths) the
+    most frequent of `delimiters` is picked, defaulting to Excel's
+    dialect.
+    """
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=delimiters)
+    except csv.Error:
+        pass
+    counts = [(sample.count(x), x) for x in delimiters]
+    count, delimiter = max(counts)
+    if not count:
+        return csv.excel
+
+    class dialect(csv.excel):
+        pass
+
+    dialect.delimiter = str(delimiter)
+    return dialect
+
+
+def _column_indexes(header, columns):
+    """Turn a list of column indexes and names into a set of indexes."""
+    indexes = set()
+    for col in columns:
+        if isinstance(col, string_types):
+            if col in header:
+                indexes.add(header.index(col))
+        else:
+            indexes.add(col)
+    return indexes
+
+
+def column_filter(header, include=None, exclude=None):
+    """Return a function telling whether the column at an index is to be
+    extracted. `header` is the first row.
+    """
+    if include is not None:
+        include = _column_indexes(header, include)
+    exclude = _column_indexes(header, exclude or ())
+    return lambda i: (include is None or i in include) and i not in exclude
+
+
 class Backend(BaseBackend):
 
     if PY3:
         def unicode_reader(self, f, **opts):
-            def readlines(f):
-                for line in f.read().splitlines():
-                    yield line.decode(self.encoding, self.encoding_errors)
-
-            return csv.reader(readlines(f), **opts)
+            text = io.TextIOWrapper(
+                io.BufferedReader(_Reader(f), BUFFER_MAX),
+                encoding=self.encoding, errors=self.encoding_errors,
+                newline='')
+            if 'delimiter' not in opts:
+                # The reader gets these lines again.
+                lines, size = [], 0
+                while size < SNIFF_SIZE:
+                    line = text.readline(SNIFF_SIZE - size)
+                    if not line:
+                        break
+                    lines.append(line)
+                    size += len(line)
+                opts['dialect'] = sniff_dialect(u''.join(lines))
+                if lines and not lines[-1].endswith((u'\n', u'\r')):
+                    # Give the reader the whole line.
+                    lines[-1] += text.readline()
+                text = itertools.chain(lines, text)
+            return csv.reader(text, **opts)
     else:
         def unicode_reader(self, f, **opts):
             def readlines(f):
-                for line in f.read().splitlines():
-                    yield line
+                carry = b''
+                for chunk in iter(lambda: f.read(BUFFER_MAX), b''):
+                    lines = (carry + chunk).splitlines(True)
+                    carry = b''
+                    if not lines[-1].endswith((b'\n', b'\r')):
+                        carry = lines.pop()
+                    for line in lines:
+                        yield line.rstrip(b'\r\n')
+                if carry:
+                    yield carry
 
-            reader = csv.reader(readlines(f), **opts)
+            lines = readlines(f)
+            if 'delimiter' not in opts:
+                sample, size = [], 0
+                for line in lines:
+                    sample.append(line)
+                    size += len(line) + 1
+                    if size >= SNIFF_SIZE:
+                        break
+                opts['dialect'] = sniff_dialect(b'\n'.join(sample))
+                lines = itertools.chain(sample, lines)
+            reader = csv.reader(lines, **opts)
             for row in reader:
                 yield [
                     unicode(cell, self.encoding, self.encoding_errors)  # NOQA
                     for cell in row]
 
-    def handle_fobj(self, f):
-        options = {
-            'dialect': 'excel',
-            'delimiter': ',',
-        }
-
-        mimetype = self.kwargs.get('mime', None)
+    def iter_fobj(self, f):
+        options = {}
+        delimiter = self.kwargs.get('delimiter', None) or \
+            MIME_DELIMITERS.get(self.kwargs.get('mime', None))
+        if delimiter is not None:
+            options['delimiter'] = str(delimiter)
 
-        if mimetype == 'text/tsv':
-            options['delimiter'] = '\t'
+        include = self.kwargs.get('include_columns', None)
+        exclude = self.kwargs.get('exclude_columns', None)
+        skip_numeric = self.kwargs.get('skip_numeric', False)
+        filtered = include is not None or exclude or skip_numeric
 
-        elif mimetype == 'text/psv':
-            options['delimiter'] = '|'
-
-        text = StringIO()
+        keep = None
+        buffer, size = [], 0
         reader = self.unicode_reader(f, **options)
         for row in reader:
-            text.write(u' '.join(row))
-            text.write(u'\n')
+            if filtered:
+                if keep is None:
+                    keep = column_filter(row, include, exclude)
+                row = [cell for i, cell in enumerate(row) if keep(i) and
+                       not (skip_numeric and NUMBER.match(cell))]
+            line = u' '.join(row)
+            buffer.append(line)
+            buffer.append(u'\n')
+            size += len(line) + 1
+            if size >= BUFFER_MAX:
+                yield u''.join(buffer)
+                buffer, size = [], 0
+
+        if buffer:
+            yield u''.join(buffer)
 
-        return text.getvalue()
+    def handle_fobj(self, f):
+        return u''.join(self.iter_fobj(f))
@@ -2,7 +2,8 @@ from __future__ import absolute_import
 
 import logging
 
-from fulltext.util import run, ShellError, MissingCommandException
+from fulltext.util import run, run_iter
+from fulltext.util import ShellError, MissingCommandException
 from fulltext.util import assert_cmd_exists
 from fulltext.util import BaseBackend
 from fulltext.util import exiftool_title
@@ -51,5 +52,43 @@ class Backend(BaseBackend):
         return self.decode(
             run('abiword', '--to=txt', '--to-name=fd://1', path))
 
+    def _iter_fallback(self, chunks, fallback):
+        """Yield decoded antiword output `chunks`, or the output of
+        `fallback()` (abiword) if antiword can't handle the file.
+        """
+        started = False
+        try:
+            for text in self.decode_iter(chunks):
+                started = True
+                yield text
+            return
+        except ShellError as e:
+            # antiword fails before writing anything, else there's
+            # no going back.
+            if started or b'not a Word Document' not in e.stderr:
+                raise
+            LOGGER.warning('.doc file unsupported format, trying abiword')
+        except MissingCommandException:
+            LOGGER.warning('CLI tool "antiword" missing, using "abiword"')
+
+        for text in self.decode_iter(fallback()):
+            yield text
+
+    def iter_fobj(self, f):
+        offset = f.tell()
+
+        def abiword():
+            f.seek(offset)
+            return run_iter('abiword', '--to=txt', '--to-name=fd://1',
+                            'fd://0', stdin=f)
+
+        return self._iter_fallback(run_iter('antiword', '-', stdin=f),
+                                   abiword)
+
+    def iter_path(self, path):
+        return self._iter_fallback(
+            run_iter('antiword', path),
+            lambda: run_iter('abiword', '--to=txt', '--to-name=fd://1', path))
+
     def handle_title(self, f):
         return exiftool_title(f, self.encoding, self.encoding_errors)
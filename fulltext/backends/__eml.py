@@ -2,8 +2,16 @@ from email import message_from_file
 
 import codecs
 
+from six import BytesIO
+from six import PY3
 from six import StringIO
 from fulltext.util import BaseBackend
+from fulltext.util import is_file_path
+
+if PY3:
+    from email import message_from_binary_file
+else:
+    message_from_binary_file = message_from_file
 
 
 # This is used by other modules, hence it's here.
@@ -23,3 +31,33 @@ class Backend(BaseBackend):
 
     def handle_fobj(self, f):
         return handle_fobj(f, self.encoding, self.encoding_errors)
+
+    def iter_members(self, path_or_file):
+        """Yield a (name, mime, size, fobj) tuple per MIME part (body
+        and attachments).
+        """
+        if is_file_path(path_or_file):
+            with open(path_or_file, 'rb') as f:
+                m = message_from_binary_file(f)
+        else:
+            m = message_from_binary_file(path_or_file)
+
+        for i, part in enumerate(m.walk()):
+            if part.is_multipart():
+                continue
+            data = part.get_payload(decode=True)
+            if data is None:
+                continue
+            mime = part.get_content_type()
+            charset = part.get_content_charset()
+            if mime.startswith('text/') and charset:
+                # Members are decoded with our encoding, not theirs.
+                try:
+                    data = data.decode(charset, self.encoding_errors).encode(
+                        self.encoding, self.encoding_errors)
+                except (LookupError, UnicodeError):
+                    # Unknown or wrong charset: extracting the member
+                    # will fail (or not) on its own.
+                    pass
+            name = part.get_filename() or 'part-%d' % (i + 1)
+            yield name, mime, len(data), BytesIO(data)
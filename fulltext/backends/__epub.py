@@ -17,8 +17,9 @@ class Backend(BaseBackend):
         if title:
             assert_cmd_exists('exiftool')
 
-    def handle_path(self, path):
-        text, book = StringIO(), epub.read_epub(path)
+    def handle_fobj(self, f):
+        # read_epub() accepts both paths and file objects.
+        text, book = StringIO(), epub.read_epub(f)
 
         for id, _ in book.spine:
             item = book.get_item_with_id(id)
@@ -31,5 +32,7 @@ class Backend(BaseBackend):
 
         return text.getvalue()
 
+    handle_path = handle_fobj
+
     def handle_title(self, f):
         return exiftool_title(f, self.encoding, self.encoding_errors)
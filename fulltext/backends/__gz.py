@@ -2,6 +2,8 @@ import gzip
 import logging
 from os.path import splitext, basename
 
+from fulltext import limits
+from fulltext.normalize import member_kwargs
 from fulltext.util import BaseBackend
 from fulltext.util import is_file_path
 from fulltext.util import fobj_to_tempfile
@@ -24,6 +26,9 @@ def _has_ext(s):
 
 class Backend(BaseBackend):
 
+    # The text is normalized by get().
+    normalized = True
+
     @staticmethod
     def get_fobj_and_path(path_or_file):
         if is_file_path(path_or_file):
@@ -38,6 +43,7 @@ class Backend(BaseBackend):
         # Avoid circlar imports.
         from fulltext import get, backend_from_fname, backend_from_fobj
 
+        offset = None if is_file_path(path_or_file) else path_or_file.tell()
         f, path = self.get_fobj_and_path(path_or_file)
         with f:
             orig_name = orig_fname(path)
@@ -46,8 +52,11 @@ class Backend(BaseBackend):
             else:
                 backend = backend_from_fobj(f)
 
+            kwargs = member_kwargs(self.kwargs)
             try:
-                return get(f, backend=backend)
+                return get(f, backend=backend, kwargs=kwargs)
+            except limits.LimitExceeded:
+                raise
             except Exception:
                 # Some backends are not able to deal with gzip.GzipFile
                 # instances so we copy the file on
@@ -56,10 +65,21 @@ class Backend(BaseBackend):
                     "%r backend could not handle gzip file object directly; "
                     "retrying by extracting the gzip on disk" % backend)
 
+                if offset is not None:
+                    path_or_file.seek(offset)
                 f2, _ = self.get_fobj_and_path(path_or_file)
                 ext = splitext(orig_name)[1]
                 with f2:
-                    with fobj_to_tempfile(f2, suffix=ext) as fname:
-                        return get(fname, backend=backend)
+                    with fobj_to_tempfile(limits.reader(f2), suffix=ext,
+                                          label=__name__) as fname:
+                        return get(fname, backend=backend, kwargs=kwargs)
 
     handle_path = handle_fobj
+
+    def iter_members(self, path_or_file):
+        """Yield a single (name, mime, size, fobj) tuple for the
+        compressed file.
+        """
+        f, path = self.get_fobj_and_path(path_or_file)
+        with f:
+            yield orig_fname(path or ''), None, None, f
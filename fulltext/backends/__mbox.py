@@ -1,21 +1,67 @@
 import contextlib
 import mailbox
+import os
 
-from six import StringIO
+from six import BytesIO
 
 from fulltext.backends.__eml import handle_fobj
 from fulltext.util import BaseBackend
+from fulltext.util import is_file_path
+
+
+# What mailbox.mbox considers an empty line.
+LINESEP = os.linesep.encode('ascii')
+
+
+def iter_messages(f):
+    """Split an mbox file object into messages the same way
+    mailbox.mbox does, without needing a path: every "From " line
+    starts a message, and the empty line before it (if any) is dropped.
+    Yields bytes.
+    """
+    lines, last_was_empty = None, False
+    for line in f:
+        if line.startswith(b'From '):
+            if lines is not None:
+                yield b''.join(lines[:-1] if last_was_empty else lines)
+            lines, last_was_empty = [], False
+            continue
+        if lines is not None:
+            lines.append(line)
+        last_was_empty = line == LINESEP
+    if lines is not None:
+        yield b''.join(lines[:-1] if last_was_empty else lines)
 
 
 class Backend(BaseBackend):
 
-    def handle_path(self, path):
-        text, mb = StringIO(), mailbox.mbox(path, create=False)
+    def iter_fobj(self, f):
+        for msg in iter_messages(f):
+            yield handle_fobj(BytesIO(msg), self.encoding,
+                              self.encoding_errors)
+            yield u'\n\n'
+
+    def iter_path(self, path):
+        mb = mailbox.mbox(path, create=False)
         with contextlib.closing(mb):
             for k in mb.keys():
-                t = handle_fobj(mb.get_file(k), self.encoding,
-                                self.encoding_errors)
-                text.write(t)
-                text.write(u'\n\n')
+                yield handle_fobj(mb.get_file(k), self.encoding,
+                                  self.encoding_errors)
+                yield u'\n\n'
+
+    def iter_members(self, path_or_file):
+        """Yield a (name, mime, size, fobj) tuple per message."""
+        if is_file_path(path_or_file):
+            with open(path_or_file, 'rb') as f:
+                for member in self.iter_members(f):
+                    yield member
+            return
+        for i, msg in enumerate(iter_messages(path_or_file)):
+            yield ('message-%d' % (i + 1), 'message/rfc822', len(msg),
+                   BytesIO(msg))
 
-        return text.getvalue()
+    def handle_fobj(self, f):
+        return u''.join(self.iter_fobj(f))
+
+    def handle_path(self, path):
+        return u''.join(self.iter_path(path))
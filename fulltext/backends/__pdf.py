@@ -1,19 +1,47 @@
+"""
+PDF backend based on the `pdftotext` CLI tool.
+
+Supported kwargs: `layout`, `first_page` and `last_page` (1-based,
+inclusive) and `max_pages`. Pass `engine='pdfminer'` to use the in-process
+`fulltext.backends.__pdfminer` backend instead.
+"""
+
 from __future__ import absolute_import
 import tempfile
 import os
 
-from fulltext.util import run, assert_cmd_exists
+from fulltext.util import run, run_iter, assert_cmd_exists
 from fulltext.util import BaseBackend
 from fulltext.util import is_file_path, which
 from fulltext.compat import POSIX
 
 
+def page_range(kwargs):
+    """Return the (first, last) pages to extract according to kwargs.
+    Pages are 1-based; `last` is inclusive and None means no limit.
+    """
+    first = int(kwargs.get('first_page', None) or 1)
+    last = kwargs.get('last_page', None)
+    last = int(last) if last else None
+    if kwargs.get('max_pages', None):
+        limit = first + int(kwargs['max_pages']) - 1
+        last = min(last, limit) if last else limit
+    return (first, last)
+
+
 def unix_cmd(path, **kwargs):
     cmd = ['pdftotext']
 
     if kwargs.get('layout', None):
         cmd.append('-layout')
 
+    first, last = page_range(kwargs)
+    if first > 1:
+        cmd.extend(['-f', str(first)])
+
+    if last is not None:
+        cmd.extend(['-l', str(last)])
+
     cmd.extend([path, '-'])
 
     return cmd
@@ -21,6 +49,13 @@ def unix_cmd(path, **kwargs):
 
 class Backend(BaseBackend):
 
+    def __new__(cls, encoding, encoding_errors, kwargs):
+        if cls is Backend and kwargs.get('engine', None) == 'pdfminer':
+            # Hand over to the in-process backend.
+            from fulltext.backends.__pdfminer import Backend as klass
+            return klass(encoding, encoding_errors, kwargs)
+        return super(Backend, cls).__new__(cls)
+
     def check(self, title):
         assert_cmd_exists('pdftotext')
         if title and POSIX:
@@ -36,6 +71,13 @@ class Backend(BaseBackend):
             out = run(*unix_cmd(path, **self.kwargs))
             return self.decode(out)
 
+        def iter_fobj(self, f):
+            return self.decode_iter(
+                run_iter(*unix_cmd('-', **self.kwargs), stdin=f))
+
+        def iter_path(self, path):
+            return self.decode_iter(run_iter(*unix_cmd(path, **self.kwargs)))
+
         def handle_title(self, f):
             if is_file_path(f):
                 # Doesn't work with file objs.
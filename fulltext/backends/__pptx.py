@@ -9,8 +9,9 @@ from fulltext.util import exiftool_title
 
 class Backend(BaseBackend):
 
-    def handle_path(self, path):
-        text, p = StringIO(), pptx.Presentation(path)
+    def handle_fobj(self, f):
+        # Presentation() accepts both paths and file objects.
+        text, p = StringIO(), pptx.Presentation(f)
         for slide in p.slides:
             for shape in slide.shapes:
                 if not shape.has_text_frame:
@@ -21,5 +22,7 @@ class Backend(BaseBackend):
                         text.write(u'\n\n')
         return text.getvalue()
 
+    handle_path = handle_fobj
+
     def handle_title(self, f):
         return exiftool_title(f, self.encoding, self.encoding_errors)
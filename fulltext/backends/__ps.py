@@ -3,7 +3,7 @@
 
 from __future__ import absolute_import
 
-from fulltext.util import run, assert_cmd_exists, exiftool_title
+from fulltext.util import run, run_iter, assert_cmd_exists, exiftool_title
 from fulltext.util import BaseBackend
 
 
@@ -22,5 +22,11 @@ class Backend(BaseBackend):
         out = run('pstotext', path)
         return self.decode(out)
 
+    def iter_fobj(self, f):
+        return self.decode_iter(run_iter('pstotext', '-', stdin=f))
+
+    def iter_path(self, path):
+        return self.decode_iter(run_iter('pstotext', path))
+
     def handle_title(self, f):
         return exiftool_title(f, self.encoding, self.encoding_errors)
@@ -3,9 +3,9 @@ import logging
 import tempfile
 
 import rarfile
-from six import StringIO
 from contextlib2 import ExitStack
 
+from fulltext.normalize import member_kwargs
 from fulltext.util import BaseBackend
 from fulltext.util import memoize
 
@@ -21,6 +21,9 @@ RARFILE_DATA = \
 
 class Backend(BaseBackend):
 
+    # Members are normalized by get_iter().
+    normalized = True
+
     @staticmethod
     @memoize
     def check(title):
@@ -37,19 +40,40 @@ class Backend(BaseBackend):
                 rf = stack.enter_context(archive.open(f))
                 rf.read()
 
-    def handle_fobj(self, f):
-        from fulltext import get  # avoid circular import
-        with ExitStack() as stack:
-            text = StringIO()
-            archive = stack.enter_context(rarfile.RarFile(f))
-            for f in archive.infolist():
-                LOGGER.debug("extracting %s" % f.filename)
+    def iter_members(self, path_or_file):
+        """Yield (name, mime, size, fobj) tuples. fobj is closed on the
+        next iteration.
+        """
+        with rarfile.RarFile(path_or_file) as archive:
+            for info in archive.infolist():
+                if info.isdir():
+                    continue
+                LOGGER.debug("extracting %s" % info.filename)
+                with archive.open(info) as rf:
+                    yield info.filename, None, info.file_size, rf
 
-                rf = stack.enter_context(archive.open(f))
-                ret = get(rf, name=f.filename, encoding=self.encoding,
-                          encoding_errors=self.encoding_errors)
-                text.write(ret)
+    def iter_fobj(self, f):
+        # Avoid circular imports.
+        from fulltext import get_iter, extract_members
+
+        # kwargs={'workers': n} extracts members in n threads; 0 means
+        # one per CPU.
+        workers = self.kwargs.get('workers', 1)
+        kw = dict(encoding=self.encoding,
+                  encoding_errors=self.encoding_errors,
+                  kwargs=member_kwargs(self.kwargs))
+        if workers != 1:
+            for member in extract_members(
+                    self.iter_members(f), workers, skip_errors=False, **kw):
+                yield member.text
+            return
+        for name, _, _, rf in self.iter_members(f):
+            for chunk in get_iter(rf, name=name, **kw):
+                yield chunk
 
-            return text.getvalue()
+    iter_path = iter_fobj
+
+    def handle_fobj(self, f):
+        return u''.join(self.iter_fobj(f))
 
     handle_path = handle_fobj
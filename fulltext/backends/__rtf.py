@@ -1,11 +1,16 @@
 from __future__ import absolute_import
+import itertools
 import subprocess
 
 from fulltext.compat import POSIX
-from fulltext.util import run, assert_cmd_exists, exiftool_title
+from fulltext.util import run, run_iter, assert_cmd_exists, exiftool_title
 from fulltext.util import BaseBackend
 
 
+# unrtf --text prints a header before the text.
+SEPARATOR = b'-----------------'
+
+
 class Backend(BaseBackend):
 
     def check(self, title):
@@ -14,13 +19,37 @@ class Backend(BaseBackend):
             assert_cmd_exists('exiftool')
 
     def strip(self, text):
-        return self.decode(text.partition(b'-----------------')[2])
+        return self.decode(text.partition(SEPARATOR)[2])
+
+    def strip_iter(self, chunks):
+        """Streaming version of strip()."""
+        chunks = iter(chunks)
+        buf = b''
+        for chunk in chunks:
+            buf += chunk
+            head, sep, tail = buf.partition(SEPARATOR)
+            if sep:
+                break
+            # Keep what may be the start of a separator.
+            buf = buf[-len(SEPARATOR) + 1:]
+        else:
+            return
+        for text in self.decode_iter(itertools.chain([tail], chunks)):
+            yield text
 
     if POSIX:
         def handle_fobj(self, f):
             return self.strip(
                 run('unrtf', '--text', '--nopict', stdin=f))
 
+        def iter_fobj(self, f):
+            return self.strip_iter(
+                run_iter('unrtf', '--text', '--nopict', stdin=f))
+
+        def iter_path(self, path):
+            return self.strip_iter(
+                run_iter('unrtf', '--text', '--nopict', path))
+
     def handle_path(self, path):
         cmd = ['unrtf', '--text', '--nopict', path]
         if POSIX:
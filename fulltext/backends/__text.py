@@ -3,34 +3,103 @@ This backend is used for text files.
 
 It attempts to read the file (which is opened in binary mode) and decode it
 using the default filesystem encoding. The encoding scheme can be controlled
-via the `encoding` kwarg.
+via the `encoding` kwarg. If no encoding is passed a BOM at the start of the
+file wins over the default encoding, and so does UTF-8 if the file looks
+like UTF-8 (pass `kwargs={'sniff_encoding': False}` to disable this).
 
-Any decoding issues are ignored.
+Text is decoded incrementally, so multibyte chars split across chunks are
+handled, and paths are read via mmap.
 """
 
 from __future__ import absolute_import
 
-from six import StringIO
+import codecs
+import contextlib
+import mmap
+
 from fulltext.util import BaseBackend
 
 
 BUFFER_MAX = 1024 * 1024
+# Bytes looked at to tell whether a file is UTF-8.
+SNIFF_SIZE = 64 * 1024
+# UTF-32 first: its little endian BOM starts with UTF-16's one.
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
 
 
-class Backend(BaseBackend):
+def looks_utf8(head):
+    """True if `head` (the start of a file) is UTF-8 with some non-ASCII
+    chars in it.
+    """
+    try:
+        # Not final: the last char may be truncated.
+        text = codecs.getincrementaldecoder('utf-8')().decode(head)
+    except UnicodeDecodeError:
+        return False
+    # Non-ASCII chars take more than one byte.
+    return len(text) != len(head)
 
-    def handle_fobj(self, f):
-        buffer = StringIO()
 
-        while True:
-            text = f.read(BUFFER_MAX)
+def sniff_encoding(head, default):
+    """Return the encoding of a file starting with `head` bytes:
+    the one of its BOM, else UTF-8 if it looks like it, else `default`.
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    if codecs.lookup(default).name != 'utf-8' and \
+            looks_utf8(head[:SNIFF_SIZE]):
+        return 'utf-8'
+    return default
+
 
-            if not text:
-                break
+class Backend(BaseBackend):
+
+    def decode_chunks(self, chunks):
+        """Decode an iterable of bytes chunks, yielding text."""
+        decoder = None
+        for chunk in chunks:
+            if decoder is None:
+                encoding = self.encoding
+                if self.kwargs.get('sniff_encoding', False):
+                    encoding = sniff_encoding(chunk, encoding)
+                decoder = codecs.getincrementaldecoder(encoding)(
+                    self.encoding_errors)
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        if decoder is not None:
+            # Raises (or not) on a truncated char at the end.
+            text = decoder.decode(b'', True)
+            if text:
+                yield text
 
-            text = self.decode(text)
+    def iter_fobj(self, f):
+        return self.decode_chunks(iter(lambda: f.read(BUFFER_MAX), b''))
 
-            # Emulate the `strings` CLI tool.
-            buffer.write(text)
+    def iter_path(self, path):
+        with open(path, 'rb') as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, EnvironmentError):
+                # Empty file, or a special one (e.g. a FIFO).
+                for text in self.iter_fobj(f):
+                    yield text
+                return
+            with contextlib.closing(mm):
+                chunks = (mm[i:i + BUFFER_MAX]
+                          for i in range(0, len(mm), BUFFER_MAX))
+                for text in self.decode_chunks(chunks):
+                    yield text
+
+    def handle_fobj(self, f):
+        return u''.join(self.iter_fobj(f))
 
-        return buffer.getvalue()
+    def handle_path(self, path):
+        return u''.join(self.iter_path(path))
@@ -13,21 +13,38 @@ class Backend(BaseBackend):
         if title:
             assert_cmd_exists('exiftool')
 
+    def iter_book(self, wb):
+        try:
+            for n in wb.sheet_names():
+                ws = wb.sheet_by_name(n)
+                for x in range(ws.nrows):
+                    text = StringIO()
+                    for y in range(ws.ncols):
+                        v = ws.cell_value(x, y)
+                        if v:
+                            if isinstance(v, (int, float)):
+                                v = str(v)
+                            text.write(v)
+                            text.write(u' ')
+                    text.write(u'\n')
+                    yield text.getvalue()
+                wb.unload_sheet(n)
+        finally:
+            wb.release_resources()
+
+    def iter_fobj(self, f):
+        return self.iter_book(
+            xlrd.open_workbook(file_contents=f.read(), on_demand=True))
+
+    def iter_path(self, path):
+        # on_demand: load sheets only when we get to them.
+        return self.iter_book(xlrd.open_workbook(path, on_demand=True))
+
+    def handle_fobj(self, f):
+        return u''.join(self.iter_fobj(f))
+
     def handle_path(self, path):
-        text = StringIO()
-        wb = xlrd.open_workbook(path)
-        for n in wb.sheet_names():
-            ws = wb.sheet_by_name(n)
-            for x in range(ws.nrows):
-                for y in range(ws.ncols):
-                    v = ws.cell_value(x, y)
-                    if v:
-                        if isinstance(v, (int, float)):
-                            v = str(v)
-                        text.write(v)
-                        text.write(u' ')
-                text.write(u'\n')
-        return text.getvalue()
+        return u''.join(self.iter_path(path))
 
     def handle_title(self, f):
         return exiftool_title(f, self.encoding, self.encoding_errors)
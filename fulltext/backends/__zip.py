@@ -3,9 +3,7 @@ from __future__ import absolute_import
 import logging
 import zipfile
 
-from six import StringIO
-from contextlib2 import ExitStack
-
+from fulltext.normalize import member_kwargs
 from fulltext.util import BaseBackend
 
 
@@ -15,20 +13,47 @@ LOGGER.addHandler(logging.NullHandler())
 
 class Backend(BaseBackend):
 
+    # Members are normalized by get_iter().
+    normalized = True
+
+    def iter_members(self, path_or_file):
+        """Yield (name, mime, size, fobj) tuples, sorted by name. fobj
+        is closed on the next iteration.
+        """
+        with zipfile.ZipFile(path_or_file, 'r') as z:
+            for info in sorted(z.infolist(), key=lambda x: x.filename):
+                if info.filename.endswith('/'):  # a directory
+                    continue
+                LOGGER.debug("extracting %s" % info.filename)
+                with z.open(info, 'r') as zf:
+                    # Kinda hacky, but zipfile's open() does not handle "b"
+                    # in the mode.
+                    # We do this here to satisy an assertion in
+                    # handle_fobj().
+                    zf.mode += 'b'
+                    yield info.filename, None, info.file_size, zf
+
+    def iter_fobj(self, f):
+        # Avoid circular imports.
+        from fulltext import get_iter, extract_members
+
+        # kwargs={'workers': n} extracts members in n threads; 0 means
+        # one per CPU.
+        workers = self.kwargs.get('workers', 1)
+        kwargs = member_kwargs(self.kwargs)
+        if workers != 1:
+            for member in extract_members(
+                    self.iter_members(f), workers, skip_errors=False,
+                    kwargs=kwargs):
+                yield member.text
+            return
+        for name, _, _, zf in self.iter_members(f):
+            for chunk in get_iter(zf, name=name, kwargs=kwargs):
+                yield chunk
+
+    iter_path = iter_fobj
+
     def handle_fobj(self, f):
-        from fulltext import get  # avoid circular import
-        with ExitStack() as stack:
-            text = StringIO()
-            z = stack.enter_context(zipfile.ZipFile(f, 'r'))
-            for name in sorted(z.namelist()):
-                LOGGER.debug("extracting %s" % name)
-                zf = stack.enter_context(z.open(name, 'r'))
-                # Kinda hacky, but zipfile's open() does not handle "b" in
-                # the mode.
-                # We do this here to satisy an assertion in handle_fobj().
-                zf.mode += 'b'
-                text.write(get(zf, name=name))
-
-            return text.getvalue()
+        return u''.join(self.iter_fobj(f))
 
     handle_path = handle_fobj
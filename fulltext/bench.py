@@ -0,0 +1,373 @@
+"""
+Benchmark suite. For every supported kind of document a corpus is
+either generated or loaded from a directory, then `get()` is run over
+it in path mode and file object mode. Results are returned (and printed
+by the CLI) as JSON, so that they can be compared between releases:
+
+    $ python -m fulltext --kinds=txt,pdf --size=1M -o before.json bench
+
+Every (kind, mode) pair is run in a fresh child process so that the
+reported peak RSS only accounts for that backend.
+"""
+
+from __future__ import absolute_import, division
+
+import concurrent.futures
+import gzip
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+import fulltext
+from fulltext.compat import timer
+
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+SAMPLES_DIR = os.path.join(HERE, 'test', 'files')
+KINDS = ('txt', 'csv', 'json', 'html', 'xml', 'zip', 'gz', 'pdf', 'docx',
+         'xlsx', 'eml', 'mbox', 'bin')
+MODES = ('path', 'fobj')
+DEFAULT_SIZE = 256 * 1024
+DEFAULT_COUNT = 20
+WORDS = (
+    u"lorem ipsum dolor sit amet consectetur adipiscing elit nunc augue "
+    u"iaculis quis auctor eu non est nullam id sem diam eget varius dui "
+    u"etiam sollicitudin sapien nec odio elementum luctus magna volutpat "
+    u"ut commodo nulla neque aliquam erat integer et pellentesque").split()
+
+
+# =====================================================================
+# --- corpus generation
+# =====================================================================
+
+
+def _words(rand, size):
+    """Return about `size` chars of random text split in lines."""
+    lines, line, total = [], [], 0
+    while total < size:
+        word = rand.choice(WORDS)
+        line.append(word)
+        total += len(word) + 1
+        if len(line) == 12:
+            lines.append(u' '.join(line))
+            line = []
+    lines.append(u' '.join(line))
+    return u'\n'.join(lines)
+
+
+def _lines(rand, size):
+    return _words(rand, size).splitlines()
+
+
+def gen_txt(rand, size):
+    return _words(rand, size).encode('utf8')
+
+
+def gen_csv(rand, size):
+    rows = []
+    for line in _lines(rand, size):
+        words = line.split()
+        rows.append(u','.join(words[:4] + [str(rand.randint(0, 1000))]))
+    return u'\n'.join(rows).encode('utf8')
+
+
+def gen_json(rand, size):
+    data = [dict(id=i, text=line) for i, line in
+            enumerate(_lines(rand, size))]
+    return json.dumps(data, indent=1).encode('utf8')
+
+
+def gen_html(rand, size):
+    body = u''.join(u'<p>%s</p>\n' % x for x in _lines(rand, size))
+    return (u'<html><head><title>bench</title></head><body>\n%s'
+            u'</body></html>' % body).encode('utf8')
+
+
+def gen_xml(rand, size):
+    body = u''.join(u'<item>%s</item>\n' % x for x in _lines(rand, size))
+    return (u'<?xml version="1.0"?>\n<items>\n%s</items>' % body).encode(
+        'utf8')
+
+
+def gen_eml(rand, size):
+    return (u'From: foo@example.com\nTo: bar@example.com\n'
+            u'Subject: bench\nContent-Type: text/plain; charset=utf-8\n\n'
+            u'%s\n' % _words(rand, size)).encode('utf8')
+
+
+def gen_mbox(rand, size):
+    msgs = []
+    for _ in range(10):
+        msg = gen_eml(rand, size // 10).replace(b'\nFrom ', b'\n>From ')
+        msgs.append(b'From foo@example.com Thu Jan  1 00:00:00 1970\n' +
+                    msg + b'\n')
+    return b''.join(msgs)
+
+
+def gen_zip(rand, size):
+    f = tempfile.SpooledTemporaryFile()
+    with zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for i in range(10):
+            zf.writestr('member%s.txt' % i, gen_txt(rand, size // 10))
+    f.seek(0)
+    return f.read()
+
+
+def gen_gz(rand, size):
+    f = tempfile.SpooledTemporaryFile()
+    with gzip.GzipFile('bench.txt', 'wb', fileobj=f) as gz:
+        gz.write(gen_txt(rand, size))
+    f.seek(0)
+    return f.read()
+
+
+def gen_docx(rand, size):
+    paras = u''.join(
+        u'<w:p><w:r><w:t>%s</w:t></w:r></w:p>' % x
+        for x in _lines(rand, size))
+    f = tempfile.SpooledTemporaryFile()
+    with zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/'
+            'content-types"><Default Extension="rels" ContentType="'
+            'application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" ContentType="'
+            'application/vnd.openxmlformats-officedocument.'
+            'wordprocessingml.document.main+xml"/></Types>'))
+        zf.writestr('_rels/.rels', (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/'
+            'package/2006/relationships"><Relationship Id="rId1" Type="'
+            'http://schemas.openxmlformats.org/officeDocument/2006/'
+            'relationships/officeDocument" Target="word/document.xml"/>'
+            '</Relationships>'))
+        zf.writestr('word/document.xml', (
+            u'<?xml version="1.0" encoding="UTF-8"?>'
+            u'<w:document xmlns:w="http://schemas.openxmlformats.org/'
+            u'wordprocessingml/2006/main"><w:body>%s</w:body>'
+            u'</w:document>' % paras).encode('utf8'))
+    f.seek(0)
+    return f.read()
+
+
+def gen_pdf(rand, size):
+    # A minimal PDF with one page per 50 lines of text.
+    lines = _lines(rand, size)
+    pages = [lines[i:i + 50] for i in range(0, len(lines), 50)]
+    npages = len(pages)
+    # Object numbers: 1 catalog, 2 pages, 3 font, then (page, content)
+    # pairs.
+    objs = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        ('<< /Type /Pages /Count %s /Kids [%s] >>' % (
+            npages, ' '.join('%s 0 R' % (4 + i * 2)
+                             for i in range(npages)))).encode('ascii'),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    for i, page in enumerate(pages):
+        stream = b'BT /F1 10 Tf 40 800 Td 12 TL\n' + b''.join(
+            b'(' + x.encode('ascii') + b') Tj T*\n' for x in page) + b'ET'
+        objs.append((
+            '<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            '/Resources << /Font << /F1 3 0 R >> >> /Contents %s 0 R >>' % (
+                5 + i * 2)).encode('ascii'))
+        objs.append(b'<< /Length ' + str(len(stream)).encode('ascii') +
+                    b' >>\nstream\n' + stream + b'\nendstream')
+
+    out, offsets = [b'%PDF-1.4\n'], []
+    pos = len(out[0])
+    for num, obj in enumerate(objs, 1):
+        offsets.append(pos)
+        chunk = str(num).encode('ascii') + b' 0 obj\n' + obj + b'\nendobj\n'
+        out.append(chunk)
+        pos += len(chunk)
+    xref = [b'xref\n0 ' + str(len(objs) + 1).encode('ascii') + b'\n',
+            b'0000000000 65535 f \n']
+    xref.extend(('%010d 00000 n \n' % x).encode('ascii') for x in offsets)
+    out.extend(xref)
+    out.append(('trailer\n<< /Size %s /Root 1 0 R >>\nstartxref\n%s\n'
+                '%%%%EOF\n' % (len(objs) + 1, pos)).encode('ascii'))
+    return b''.join(out)
+
+
+def gen_bin(rand, size):
+    # Random junk with ASCII and UTF-16LE strings in between, like an
+    # executable.
+    out = []
+    for i, line in enumerate(_lines(rand, size)):
+        out.append(bytearray(rand.randint(0, 255) for _ in range(32)))
+        out.append(line.encode('utf-16-le' if i % 2 else 'ascii') + b'\0')
+    return b''.join(bytes(x) for x in out)
+
+
+# Kinds not listed here (xlsx) would need extra deps to be generated;
+# copies of the sample file in test/files are used instead.
+GENERATORS = dict(
+    txt=gen_txt, csv=gen_csv, json=gen_json, html=gen_html, xml=gen_xml,
+    eml=gen_eml, mbox=gen_mbox, zip=gen_zip, gz=gen_gz, docx=gen_docx,
+    pdf=gen_pdf, bin=gen_bin)
+
+
+def make_corpus(dest, kinds=KINDS, size=DEFAULT_SIZE, count=DEFAULT_COUNT,
+                seed=0):
+    """Write `count` documents of about `size` bytes of text for each
+    kind into `dest` directory. Return a {kind: [paths]} dict.
+    """
+    rand = random.Random(seed)
+    corpus = {}
+    for kind in kinds:
+        paths = corpus[kind] = []
+        for i in range(count):
+            path = os.path.join(dest, 'bench%s.%s' % (i, kind))
+            if kind in GENERATORS:
+                with open(path, 'wb') as f:
+                    f.write(GENERATORS[kind](rand, size))
+            else:
+                shutil.copyfile(
+                    os.path.join(SAMPLES_DIR, 'test.%s' % kind), path)
+            paths.append(path)
+    return corpus
+
+
+def load_corpus(src, kinds=KINDS):
+    """Return a {kind: [paths]} dict of the files found in `src`
+    directory, grouped by extension.
+    """
+    corpus = {}
+    for root, dirs, files in os.walk(src):
+        for name in sorted(files):
+            kind = os.path.splitext(name)[1][1:].lower()
+            if kind in kinds:
+                corpus.setdefault(kind, []).append(os.path.join(root, name))
+    return corpus
+
+
+# =====================================================================
+# --- measurement
+# =====================================================================
+
+
+def peak_rss():
+    """Peak RSS of this process in bytes (None if unknown)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KB elsewhere.
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return None
+    idx = int(math.ceil(pct / 100.0 * len(values))) - 1
+    return values[min(max(idx, 0), len(values) - 1)]
+
+
+def _extract(path, mode):
+    if mode == 'path':
+        return fulltext.get(path)
+    with open(path, 'rb') as f:
+        return fulltext.get(f)
+
+
+def run(paths, mode='path', repeat=1):
+    """Run get() over `paths` and return a dict of stats."""
+    if paths:
+        # Warm up: import backend, start helpers, etc.
+        try:
+            _extract(paths[0], mode)
+        except Exception:
+            pass
+    rss_base = peak_rss()
+    times, nbytes, nchars, errors = [], 0, 0, 0
+    started = timer()
+    for _ in range(repeat):
+        for path in paths:
+            t = timer()
+            try:
+                text = _extract(path, mode)
+            except Exception:
+                errors += 1
+                continue
+            times.append(timer() - t)
+            nbytes += os.path.getsize(path)
+            nchars += len(text)
+    elapsed = timer() - started
+    times.sort()
+    return dict(
+        mode=mode,
+        docs=len(times),
+        errors=errors,
+        bytes=nbytes,
+        chars=nchars,
+        secs=elapsed,
+        docs_per_sec=len(times) / elapsed if elapsed else None,
+        mb_per_sec=nbytes / 1024.0 / 1024.0 / elapsed if elapsed else None,
+        p50=percentile(times, 50),
+        p99=percentile(times, 99),
+        rss_base=rss_base,
+        rss_peak=peak_rss(),
+    )
+
+
+def _run_isolated(paths, mode, repeat):
+    # One process per run so that peak RSS is not polluted by other
+    # backends.
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as ex:
+        return ex.submit(run, paths, mode, repeat).result()
+
+
+def bench(corpus, modes=MODES, repeat=1, isolate=True):
+    """Benchmark a {kind: [paths]} corpus. Return a JSON serializable
+    dict.
+    """
+    results = []
+    for kind in sorted(corpus):
+        for mode in modes:
+            if isolate:
+                res = _run_isolated(corpus[kind], mode, repeat)
+            else:
+                res = run(corpus[kind], mode, repeat)
+            res['kind'] = kind
+            results.append(res)
+    return dict(
+        python=platform.python_version(),
+        platform=platform.platform(),
+        time=time.time(),
+        results=results,
+    )
+
+
+def parse_size(s):
+    """Parse "10", "10K" or "10M" into a number of bytes."""
+    s = s.strip().upper()
+    mult = dict(K=1024, M=1024 * 1024, G=1024 * 1024 * 1024)
+    if s and s[-1] in mult:
+        return int(float(s[:-1]) * mult[s[-1]])
+    return int(s)
+
+
+def main(corpus_dir=None, kinds=KINDS, size=DEFAULT_SIZE,
+         count=DEFAULT_COUNT, repeat=1, modes=MODES, isolate=True):
+    """Generate (or load) a corpus, benchmark it and return results."""
+    if corpus_dir:
+        return bench(load_corpus(corpus_dir, kinds), modes=modes,
+                     repeat=repeat, isolate=isolate)
+    tmpdir = tempfile.mkdtemp(prefix='fulltext-bench-')
+    try:
+        corpus = make_corpus(tmpdir, kinds=kinds, size=size, count=count)
+        return bench(corpus, modes=modes, repeat=repeat, isolate=isolate)
+    finally:
+        shutil.rmtree(tmpdir)
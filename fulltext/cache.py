@@ -0,0 +1,299 @@
+"""
+Content-addressed cache for extracted text.
+
+Cache keys are made of a hash of the input bytes plus everything which
+can affect the output (backend module, encoding, kwargs), so the same
+document is extracted once no matter how many times (or under which
+name) it shows up. Usage:
+
+    >>> import fulltext
+    >>> from fulltext.cache import SQLiteCache
+    >>> fulltext.CACHE = SQLiteCache('/var/cache/fulltext.db')
+    >>> fulltext.get('foo.pdf')  # extracted
+    >>> fulltext.get('foo.pdf')  # cache hit
+    >>> fulltext.CACHE.stats()
+    {'hits': 1, 'misses': 1, 'entries': 1, 'size': 123}
+"""
+
+from __future__ import absolute_import
+
+import collections
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from fulltext.detect import is_seekable
+from fulltext.util import is_file_path
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(logging.NullHandler())
+BUFFER_MAX = 1024 * 1024
+# Cache size (in bytes of UTF-8 encoded text) if not specified.
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+
+
+def default_cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME',
+                          os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'fulltext')
+
+
+def _hash_fobj(h, f):
+    while True:
+        chunk = f.read(BUFFER_MAX)
+        if not chunk:
+            break
+        h.update(chunk)
+
+
+def make_key(path_or_file, backend_name, encoding, encoding_errors, kwargs,
+             title):
+    """Return a key identifying the text extracted from `path_or_file`
+    with the given options. Return None if the file object can't be
+    read twice (not seekable), meaning it can't be cached.
+    """
+    h = hashlib.sha256()
+    if is_file_path(path_or_file):
+        with open(path_or_file, 'rb') as f:
+            _hash_fobj(h, f)
+    else:
+        if not is_seekable(path_or_file):
+            return None
+        try:
+            offset = path_or_file.tell()
+        except (AttributeError, IOError, OSError):
+            return None
+        try:
+            _hash_fobj(h, path_or_file)
+        finally:
+            path_or_file.seek(offset)
+
+    opts = (backend_name, encoding, encoding_errors,
+            sorted((k, repr(v)) for k, v in kwargs.items()), bool(title))
+    h.update(repr(opts).encode('utf8'))
+    return h.hexdigest()
+
+
+class BaseCache(object):
+    """Base class for cache stores. Subclasses are supposed to
+    implement `_get()` and `_set()`.
+    """
+
+    # Whether copies of the cache in other processes (e.g. get_many()
+    # workers) see the same entries.
+    shared = False
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Allow passing instances to other processes (e.g. get_many()),
+        # which is only useful for shared ones.
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, text, title):
+        raise NotImplementedError
+
+    def get(self, key):
+        """Return a (text, title) tuple or None."""
+        ret = self._get(key)
+        if ret is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return ret
+
+    def set(self, key, text, title):
+        self._set(key, text, title)
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses)
+
+
+class MemoryCache(BaseCache):
+    """An in-memory LRU cache holding up to `max_size` bytes of text."""
+
+    def __init__(self, max_size=64 * 1024 * 1024):
+        super(MemoryCache, self).__init__()
+        self.max_size = max_size
+        self.size = 0
+        self._data = collections.OrderedDict()
+
+    def _get(self, key):
+        with self._lock:
+            try:
+                text, title, size = self._data.pop(key)
+            except KeyError:
+                return None
+            self._data[key] = (text, title, size)
+            return (text, title)
+
+    def _set(self, key, text, title):
+        size = _entry_size(text, title)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= old[2]
+            self._data[key] = (text, title, size)
+            self.size += size
+            while self.size > self.max_size and self._data:
+                _, (_, _, size) = self._data.popitem(last=False)
+                self.size -= size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def stats(self):
+        ret = super(MemoryCache, self).stats()
+        ret.update(entries=len(self._data), size=self.size)
+        return ret
+
+
+class SQLiteCache(BaseCache):
+    """An on-disk cache backed by a SQLite database. When the size of
+    the stored text exceeds `max_size` bytes the least recently used
+    entries are evicted. The database can be shared by multiple
+    processes.
+    """
+
+    shared = True
+
+    def __init__(self, path=None, max_size=DEFAULT_MAX_SIZE):
+        super(SQLiteCache, self).__init__()
+        if path is None:
+            path = os.path.join(default_cache_dir(), 'cache.sqlite')
+        self.path = path
+        self.max_size = max_size
+        self._conn = None
+
+    def __getstate__(self):
+        state = super(SQLiteCache, self).__getstate__()
+        state['_conn'] = None
+        return state
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            dirname = os.path.dirname(self.path)
+            if dirname and not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            conn = sqlite3.connect(self.path, timeout=30,
+                                   check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, text TEXT, title TEXT, "
+                "size INTEGER, atime REAL)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_atime ON entries (atime)")
+            # Running total of entries' size, so that it's not computed
+            # on every insert.
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta ("
+                "id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER)")
+            if conn.execute("SELECT 1 FROM meta").fetchone() is None:
+                conn.execute(
+                    "INSERT OR IGNORE INTO meta SELECT 0, "
+                    "COALESCE(SUM(size), 0) FROM entries")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _get(self, key):
+        with self._lock:
+            conn = self.conn
+            row = conn.execute(
+                "SELECT text, title FROM entries WHERE key = ?",
+                (key, )).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE entries SET atime = ? WHERE key = ?",
+                         (time.time(), key))
+            conn.commit()
+            return (row[0], row[1])
+
+    def _set(self, key, text, title):
+        size = _entry_size(text, title)
+        with self._lock:
+            conn = self.conn
+            # Lock the database now: the total must match the entries
+            # also with other processes writing.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT size FROM entries WHERE key = ?",
+                                   (key, )).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                    (key, text, title, size, time.time()))
+                self._add_size(conn, size - (row[0] if row else 0))
+                self._evict(conn)
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    @staticmethod
+    def _add_size(conn, num):
+        conn.execute("UPDATE meta SET size = size + ?", (num, ))
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT size FROM meta").fetchone()[0]
+        if total <= self.max_size:
+            return
+        excess, keys, freed = total - self.max_size, [], 0
+        for key, size in conn.execute(
+                "SELECT key, size FROM entries ORDER BY atime"):
+            keys.append((key, ))
+            freed += size
+            if freed >= excess:
+                break
+        LOGGER.debug("evicting %s cache entries" % len(keys))
+        conn.executemany("DELETE FROM entries WHERE key = ?", keys)
+        self._add_size(conn, -freed)
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM entries")
+            self.conn.execute("UPDATE meta SET size = 0")
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self):
+        ret = super(SQLiteCache, self).stats()
+        with self._lock:
+            entries, size = self.conn.execute(
+                "SELECT (SELECT COUNT(*) FROM entries), size "
+                "FROM meta").fetchone()
+        ret.update(entries=entries, size=size)
+        return ret
+
+
+def _entry_size(text, title):
+    size = len(text.encode('utf8'))
+    if title:
+        size += len(title.encode('utf8'))
+    return size
@@ -17,6 +17,27 @@ WINDOWS = os.name == "nt"
 LINUX = sys.platform.startswith("linux")
 
 
+try:
+    from os import cpu_count
+except ImportError:
+    # Backport from Python 3.4.
+    from multiprocessing import cpu_count  # NOQA
+
+
+try:
+    from os import scandir
+except ImportError:
+    # Backport from Python 3.5.
+    from scandir import scandir  # NOQA
+
+
+try:
+    from time import perf_counter as timer
+except ImportError:
+    # Backport from Python 3.3.
+    from timeit import default_timer as timer  # NOQA
+
+
 try:
     from shutil import which
 except ImportError:
@@ -0,0 +1,222 @@
+"""
+Directory crawler: extract text from all files in a tree, in parallel,
+and produce one JSON serializable record per file:
+
+    >>> from fulltext.crawl import crawl, State
+    >>> state = State('/var/lib/fulltext/state.json')
+    >>> for rec in crawl(['/srv/docs'], state=state, workers=4):
+    ...     index(rec)
+    >>> state.save()
+
+With a `State` files are only extracted if they are new or changed
+since the previous run: size and mtime are checked first and, if they
+differ, the content hash. Records of files which disappeared have
+`deleted=True`. Files which failed are not recorded in the state, so
+they are retried next time.
+
+Also available via CLI as `fulltext crawl`, which writes JSONL.
+"""
+
+from __future__ import absolute_import
+
+import errno
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import tempfile
+
+import fulltext
+from fulltext import stats
+from fulltext.compat import cpu_count
+from fulltext.compat import scandir
+from fulltext.detect import mime_from_path
+from fulltext.util import get_magic
+from fulltext.util import imap_processes
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(logging.NullHandler())
+BUFFER_MAX = 1024 * 1024
+
+
+class State(object):
+    """The {path: (size, mtime, hash)} of files crawled so far, stored
+    as JSON in `path`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.entries = dict(
+                    (k, tuple(v)) for k, v in json.load(f).items())
+        except IOError as err:
+            if err.errno != errno.ENOENT:
+                raise
+            self.entries = {}
+
+    def save(self):
+        # Write a temp file and rename it, so that we never leave a
+        # truncated state behind.
+        dirname = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.entries, f)
+            if os.name == 'nt' and os.path.exists(self.path):
+                os.remove(self.path)
+            os.rename(tmp, self.path)
+        except Exception:
+            os.remove(tmp)
+            raise
+
+
+def walk(root):
+    """Yield (path, size, mtime) for all files in `root` tree (sorted,
+    symlinked dirs are not followed).
+    """
+    try:
+        entries = sorted(scandir(root), key=lambda x: x.name)
+    except OSError as err:
+        LOGGER.warning("can't list %r: %s" % (root, err))
+        return
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                for item in walk(entry.path):
+                    yield item
+            elif entry.is_file():
+                st = entry.stat()
+                yield (entry.path, st.st_size, st.st_mtime)
+        except OSError as err:
+            LOGGER.warning("can't stat %r: %s" % (entry.path, err))
+
+
+def hash_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(BUFFER_MAX)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def guess_mime(path):
+    mime = mimetypes.guess_type(path)[0]
+    if mime is None and get_magic() is not None:
+        mime = mime_from_path(path, fulltext.MAGIC_BUFFER_SIZE)
+    return mime
+
+
+def _new_record(path, size, mtime):
+    return dict(path=path, size=size, mtime=mtime, mime=None, title=None,
+                text=None, error=None, timings=None)
+
+
+def _crawl_job(path, size, mtime, old_hash, title, kwargs):
+    """Extract a file (in a worker process). Return a record dict;
+    `changed` is False if content is the same as `old_hash`.
+    """
+    rec = _new_record(path, size, mtime)
+    try:
+        rec['hash'] = hash_file(path)
+    except (IOError, OSError) as err:
+        rec.update(hash=None, changed=True, error=repr(err))
+        return rec
+    rec['changed'] = rec['hash'] != old_hash
+    if not rec['changed']:
+        return rec
+
+    records = []
+    stats.register_hook(records.append)
+    try:
+        rec['mime'] = guess_mime(path)
+        if title:
+            rec['text'], rec['title'] = fulltext.get_with_title(
+                path, kwargs=kwargs)
+        else:
+            rec['text'] = fulltext.get(path, kwargs=kwargs)
+    except Exception as err:
+        rec['error'] = repr(err)
+    finally:
+        stats.unregister_hook(records.append)
+    if records:
+        # The outermost extraction is the last one to complete.
+        top = records[-1]
+        rec['timings'] = dict(top.stages, elapsed=top.elapsed)
+    return rec
+
+
+def crawl(roots, state=None, workers=None, title=False, kwargs=None):
+    """Extract all files in `roots` dirs using `workers` processes
+    (defaults to the number of CPUs, 1 means no subprocesses) and yield
+    a record dict per file, in completion order. Records have `path`,
+    `size`, `mtime`, `hash`, `mime`, `title` (only if `title` is True),
+    `text`, `error` and `timings` (the stages of `fulltext.stats`)
+    keys. If `state` (a `State` instance) is passed unchanged files are
+    skipped and the state is updated.
+    """
+    entries = state.entries if state is not None else {}
+    seen = set()
+
+    def jobs():
+        for root in roots:
+            for path, size, mtime in walk(root):
+                seen.add(path)
+                old = entries.get(path)
+                if old is not None and tuple(old[:2]) == (size, mtime):
+                    continue
+                yield (path, size, mtime, old[2] if old else None, title,
+                       kwargs)
+
+    def result(rec):
+        """Update state. Return the record to yield, None if the file
+        did not change.
+        """
+        path = rec['path']
+        if not rec.pop('changed'):
+            LOGGER.debug("%r did not change" % path)
+            entries[path] = (rec['size'], rec['mtime'], rec['hash'])
+            return None
+        if rec['error'] is not None:
+            LOGGER.error("error while extracting %r: %s" % (
+                path, rec['error']))
+            # Retry next time.
+            entries.pop(path, None)
+        else:
+            entries[path] = (rec['size'], rec['mtime'], rec['hash'])
+        return rec
+
+    workers = workers or cpu_count() or 1
+    if workers == 1:
+        for args in jobs():
+            rec = result(_crawl_job(*args))
+            if rec is not None:
+                yield rec
+    else:
+        keyed = ((args, args) for args in jobs())
+        for args, ret in imap_processes(_crawl_job, keyed, workers):
+            if isinstance(ret, Exception):
+                # The worker died (e.g. killed by the OOM killer).
+                rec = _new_record(*args[:3])
+                rec.update(hash=None, changed=True, error=repr(ret))
+            else:
+                rec = ret
+            rec = result(rec)
+            if rec is not None:
+                yield rec
+
+    # Only now we know which files are gone.
+    for path in sorted(set(entries) - seen):
+        if any(_is_under(path, root) for root in roots):
+            del entries[path]
+            yield dict(path=path, deleted=True)
+
+
+def _is_under(path, root):
+    root = os.path.join(root, '')
+    return path.startswith(root)
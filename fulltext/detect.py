@@ -0,0 +1,203 @@
+"""
+MIME type detection via libmagic.
+
+Every file is sniffed at most once: a libmagic handle is kept per thread
+(libmagic handles are not thread safe and python-magic serializes access
+to its shared handle), results for paths are memoized by
+(device, inode, size, mtime) and non-seekable file objects are wrapped
+in a `Peekable` so that the header bytes read for detection are handed
+back to the backend instead of being lost.
+"""
+
+from __future__ import absolute_import
+
+import collections
+import io
+import logging
+import os
+import threading
+import types
+
+from fulltext.util import get_magic
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(logging.NullHandler())
+# Max number of memoized paths.
+MAX_ENTRIES = 8192
+
+_local = threading.local()
+_lock = threading.Lock()
+_memo = collections.OrderedDict()
+
+
+class Peekable(object):
+    """Wraps a non-seekable binary file object (e.g. a pipe or a socket)
+    adding a `peek()` method. Peeked bytes are buffered and returned
+    again by the following reads.
+    """
+
+    def __init__(self, f):
+        self._f = f
+        self._buf = b''
+        self._pos = 0
+
+    def __getattr__(self, name):
+        # name, mode, close(), closed, etc.
+        return getattr(self._f, name)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+
+    next = __next__
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self._f.close()
+
+    def peek(self, size=1):
+        """Return the next `size` bytes without consuming them.
+        Less bytes are returned on EOF.
+        """
+        while len(self._buf) < size:
+            chunk = self._f.read(size - len(self._buf))
+            if not chunk:
+                break
+            self._buf += chunk
+        return self._buf[:size]
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data, self._buf = self._buf + self._f.read(), b''
+        elif self._buf:
+            data, self._buf = self._buf[:size], self._buf[size:]
+        else:
+            data = self._f.read(size)
+        self._pos += len(data)
+        return data
+
+    def readline(self, size=-1):
+        if size is None:
+            size = -1
+        idx = self._buf.find(b'\n')
+        if idx >= 0 or (0 <= size <= len(self._buf)):
+            end = idx + 1 if idx >= 0 else size
+            if 0 <= size < end:
+                end = size
+            line, self._buf = self._buf[:end], self._buf[end:]
+        else:
+            left = size - len(self._buf) if size >= 0 else -1
+            line, self._buf = self._buf + self._f.readline(left), b''
+        self._pos += len(line)
+        return line
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def seek(self, *args):
+        raise io.UnsupportedOperation("seek")
+
+    def tell(self):
+        return self._pos
+
+
+def is_seekable(f):
+    seekable = getattr(f, 'seekable', None)
+    if callable(seekable):
+        try:
+            return seekable()
+        except ValueError:  # closed
+            return False
+    try:
+        f.seek(0, os.SEEK_CUR)
+    except (AttributeError, IOError, OSError):
+        return False
+    return True
+
+
+def peekable(f):
+    """Return `f` if it can be sniffed by seeking, else wrap it in a
+    `Peekable`.
+    """
+    if isinstance(f, Peekable) or is_seekable(f):
+        return f
+    return Peekable(f)
+
+
+def _handle():
+    """Return the libmagic handle of the current thread."""
+    try:
+        return _local.handle
+    except AttributeError:
+        magic = get_magic()
+        if isinstance(magic, types.ModuleType):
+            handle = magic.Magic(mime=True)
+        else:
+            # Windows: this is already a Magic instance with the right
+            # magic file.
+            handle = magic
+        _local.handle = handle
+        return handle
+
+
+def mime_from_buffer(chunk):
+    return _handle().from_buffer(chunk)
+
+
+def mime_from_fobj(f, size):
+    """Sniff the first `size` bytes of a file object. File offset is
+    left unaltered.
+    """
+    if isinstance(f, Peekable):
+        return mime_from_buffer(f.peek(size))
+    offset = f.tell()
+    try:
+        f.seek(0)
+        return mime_from_buffer(f.read(size))
+    finally:
+        f.seek(offset)
+
+
+def mime_from_path(path, size):
+    """Sniff the first `size` bytes of a file. The result is memoized
+    as long as file's inode, size and mtime don't change.
+    """
+    st = os.stat(path)
+    if not st.st_ino:
+        # No inode numbers (old Pythons on Windows); don't memoize.
+        with open(path, 'rb') as f:
+            return mime_from_buffer(f.read(size))
+    key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime, size)
+    with _lock:
+        try:
+            mime = _memo.pop(key)
+        except KeyError:
+            pass
+        else:
+            _memo[key] = mime
+            return mime
+
+    with open(path, 'rb') as f:
+        mime = mime_from_buffer(f.read(size))
+    with _lock:
+        _memo[key] = mime
+        while len(_memo) > MAX_ENTRIES:
+            _memo.popitem(last=False)
+    return mime
+
+
+def clear_cache():
+    """Forget the memoized MIME type of paths."""
+    with _lock:
+        _memo.clear()
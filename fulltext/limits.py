@@ -0,0 +1,289 @@
+"""
+Resource limits for a single document, protecting against archive
+bombs and documents which take forever:
+
+    >>> from fulltext.limits import Limits
+    >>> fulltext.get('upload.zip', limits=Limits(
+    ...     max_bytes=512 * 1024 * 1024, max_members=10000, max_depth=3,
+    ...     timeout=60))
+
+Limits apply to the whole tree of extractions a document causes (zip
+members, members of a zip inside the zip, etc.) and raise
+`LimitExceeded` when hit:
+ * max_bytes: total bytes read from archive members (that is,
+   decompressed data)
+ * max_members: total number of members extracted
+ * max_depth: how deep archives can be nested (a member of the document
+   has depth 1)
+ * timeout: seconds the whole extraction may take; checked between
+   members and reads, and used as the timeout of CLI tools
+
+The state is kept per thread: an extraction started while another one
+is running in the same thread (a backend calling `fulltext.get()`) is a
+member of it.
+"""
+
+from __future__ import absolute_import
+
+import contextlib
+import io
+import threading
+
+from fulltext.compat import timer
+
+
+CHUNK_SIZE = 64 * 1024
+
+_local = threading.local()
+
+
+class LimitExceeded(Exception):
+    """Raised when a document exceeds one of its `Limits`."""
+
+    def __init__(self, limit, value, max_value):
+        super(LimitExceeded, self).__init__(limit, value, max_value)
+        self.limit = limit
+        self.value = value
+        self.max_value = max_value
+
+    def __str__(self):
+        return "%s limit exceeded (%s > %s)" % (
+            self.limit, self.value, self.max_value)
+
+
+class Limits(object):
+    """Limits for a document. None means no limit."""
+
+    def __init__(self, max_bytes=None, max_members=None, max_depth=None,
+                 timeout=None):
+        self.max_bytes = max_bytes
+        self.max_members = max_members
+        self.max_depth = max_depth
+        self.timeout = timeout
+
+    def __repr__(self):
+        return "%s(max_bytes=%r, max_members=%r, max_depth=%r, " \
+            "timeout=%r)" % (self.__class__.__name__, self.max_bytes,
+                             self.max_members, self.max_depth, self.timeout)
+
+    def __bool__(self):
+        return any(x is not None for x in (
+            self.max_bytes, self.max_members, self.max_depth, self.timeout))
+
+    __nonzero__ = __bool__
+
+
+class Budget(object):
+    """What's left of the `Limits` of a document being extracted.
+    Shared by all the threads extracting its members.
+    """
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.bytes = 0
+        self.members = 0
+        self.deadline = None
+        if limits.timeout is not None:
+            self.deadline = timer() + limits.timeout
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        """Seconds left before the timeout (None if there's no
+        timeout).
+        """
+        if self.deadline is None:
+            return None
+        return max(self.deadline - timer(), 0)
+
+    def check_time(self):
+        now = timer()
+        if self.deadline is not None and now > self.deadline:
+            timeout = self.limits.timeout
+            raise LimitExceeded('timeout',
+                                '%.1fs' % (now - self.deadline + timeout),
+                                '%ss' % timeout)
+
+    def add_member(self, depth):
+        limits = self.limits
+        if limits.max_depth is not None and depth > limits.max_depth:
+            raise LimitExceeded('depth', depth, limits.max_depth)
+        with self._lock:
+            self.members += 1
+            members = self.members
+        if limits.max_members is not None and members > limits.max_members:
+            raise LimitExceeded('members', members, limits.max_members)
+        self.check_time()
+
+    def add_bytes(self, num, charge=True):
+        """Account `num` more bytes read. If `charge` is False only
+        check they would fit.
+        """
+        with self._lock:
+            total = self.bytes + num
+            if charge:
+                self.bytes = total
+        if self.limits.max_bytes is not None and \
+                total > self.limits.max_bytes:
+            raise LimitExceeded('bytes', total, self.limits.max_bytes)
+        self.check_time()
+
+    def reader(self, f, charge=True):
+        """Wrap file object `f` so that reading from it counts toward
+        max_bytes. With `charge=False` the bytes are not added to the
+        total, they're only checked against it (e.g. when buffering
+        data which will be charged when read back).
+        """
+        if self.limits.max_bytes is None and self.deadline is None:
+            return f
+        return CountingReader(f, self, charge)
+
+
+class CountingReader(object):
+    """A binary file object wrapper charging the bytes read to a
+    `Budget`.
+    """
+
+    def __init__(self, f, budget, charge=True):
+        self._f = f
+        self._budget = budget
+        self._charge = charge
+        self._count = 0
+
+    def __getattr__(self, name):
+        # name, mode, seek(), tell(), close(), closed, etc.
+        return getattr(self._f, name)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+
+    next = __next__
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self._f.close()
+
+    def fileno(self):
+        # Reading the fd directly would bypass counting.
+        raise io.UnsupportedOperation("fileno")
+
+    def _add(self, num):
+        if self._charge:
+            self._budget.add_bytes(num)
+        else:
+            self._count += num
+            self._budget.add_bytes(self._count, charge=False)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            # Read in chunks, so that a bomb is stopped before it's
+            # all in memory.
+            chunks = []
+            while True:
+                chunk = self.read(CHUNK_SIZE)
+                if not chunk:
+                    return b''.join(chunks)
+                chunks.append(chunk)
+        data = self._f.read(size)
+        self._add(len(data))
+        return data
+
+    def readline(self, size=-1):
+        if size is None or size < 0:
+            parts = []
+            while True:
+                part = self.readline(CHUNK_SIZE)
+                parts.append(part)
+                if not part.endswith(b'\n') and len(part) == CHUNK_SIZE:
+                    continue
+                return b''.join(parts)
+        line = self._f.readline(size)
+        self._add(len(line))
+        return line
+
+
+def get_state():
+    """Return the (Budget, depth) of the extraction running in this
+    thread, None if there's none. Budget is None if there are no
+    limits.
+    """
+    return getattr(_local, 'state', None)
+
+
+@contextlib.contextmanager
+def use_state(state):
+    """Run the with block as part of the extraction `state` (as
+    returned by get_state()), e.g. in a worker thread.
+    """
+    prev = get_state()
+    _local.state = state
+    try:
+        yield
+    finally:
+        _local.state = prev
+
+
+def new_state(limits):
+    """Return the state of a new extraction started in this thread:
+    a member of the running extraction, if any, else a new document
+    limited by `limits`. Raise LimitExceeded if it's not allowed.
+    """
+    state = get_state()
+    if state is None:
+        return (Budget(limits) if limits else None, 0)
+    budget, depth = state[0], state[1] + 1
+    if budget is not None:
+        budget.add_member(depth)
+    return (budget, depth)
+
+
+def iter_with_state(state, chunks):
+    """Iterate over `chunks` with `state` set only while they're being
+    produced, so that it does not leak to the consumer of a suspended
+    generator.
+    """
+    chunks = iter(chunks)
+    while True:
+        with use_state(state):
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+        yield chunk
+
+
+def remaining():
+    """Seconds left to the extraction running in this thread, None if
+    it has no timeout.
+    """
+    state = get_state()
+    if state is None or state[0] is None:
+        return None
+    return state[0].remaining()
+
+
+def reader(f):
+    """Wrap `f` so that reading from it is charged to the extraction
+    running in this thread, for backends reading member data by
+    themselves.
+    """
+    state = get_state()
+    if state is None or state[0] is None:
+        return f
+    return state[0].reader(f)
+
+
+def check_time():
+    """Raise LimitExceeded if the extraction running in this thread
+    ran out of time.
+    """
+    state = get_state()
+    if state is not None and state[0] is not None:
+        state[0].check_time()
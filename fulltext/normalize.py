@@ -0,0 +1,222 @@
+"""
+White space normalization of extracted text. This is the last stage of
+`fulltext.get()` and `fulltext.get_iter()`, and it's controlled via
+kwargs:
+
+    >>> fulltext.get('foo.pdf', kwargs={'normalize': 'paragraphs'})
+
+ * normalize: the mode, one of:
+   * 'collapse' (default): runs of white space become a single space,
+     leading and trailing white space (including Unicode one) is
+     removed
+   * 'paragraphs': like 'collapse' but runs of white space containing
+     a blank line or a page break (form feed) become a paragraph break
+     (two newlines)
+   * None: no normalization at all, text is returned as the backend
+     produced it
+ * unicode_white: if True treat all Unicode white space (e.g. no-break
+   space, U+2028 line separator) as white space, not just ASCII one
+ * nfc: if True apply Unicode NFC normalization
+
+Text is normalized in a single pass, chunk by chunk, so it's never
+copied as a whole. Backends whose text is already normalized can set
+`normalized = True` to skip this stage.
+"""
+
+from __future__ import absolute_import
+
+import re
+import unicodedata
+
+
+COLLAPSE = 'collapse'
+PARAGRAPHS = 'paragraphs'
+MODES = (COLLAPSE, PARAGRAPHS)
+# kwargs controlling normalization; containers pass them to members.
+KWARGS = ('normalize', 'unicode_white', 'nfc')
+# Long texts are normalized in slices of this size (in chars).
+BUFFER_MAX = 1024 * 1024
+
+ASCII_WHITE = u' \t\v\f\r\n'
+# Chars which are white space for str.split() but not ASCII_WHITE
+# (U+180E only for old Unicode versions).
+OTHER_WHITE = u'\x1c\x1d\x1e\x1f\x85\xa0\u1680\u180e\u2000\u2001' \
+    u'\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a\u2028' \
+    u'\u2029\u202f\u205f\u3000'
+_WHITE = re.compile(u'[ \\t\\v\\f\\r\\n]+')
+_UNICODE_WHITE = re.compile(u'\\s+', re.UNICODE)
+# A run of white space which is a paragraph break.
+_BREAK = re.compile(
+    u'[ \\t\\v\\f\\r\\n]*(?:\\n[ \\t\\v\\f\\r\\n]*\\n|\\f)[ \\t\\v\\f\\r\\n]*')
+_UNICODE_BREAK = re.compile(
+    u'\\s*(?:\\n\\s*\\n|\\f|\u2029)\\s*', re.UNICODE)
+# The last ASCII char of a text, and what follows. No NFC composition
+# starts before an ASCII char, so text can be split there.
+_LAST_ASCII = re.compile(u'[\\x00-\\x7f][^\\x00-\\x7f]*\\Z')
+
+
+class Normalizer(object):
+    """Incremental text normalizer. feed() it chunks of text and it
+    returns the normalized text it can tell so far; close() returns the
+    rest.
+    """
+
+    def __init__(self, mode=COLLAPSE, unicode_white=False, nfc=False):
+        if mode not in MODES:
+            raise ValueError("invalid normalize mode %r (choose from %s)" % (
+                mode, ", ".join(MODES)))
+        self.mode = mode
+        self.unicode_white = unicode_white
+        self.nfc = nfc
+        # None means all chars str.strip() considers white space.
+        self._chars = None if unicode_white else ASCII_WHITE
+        self._white = _UNICODE_WHITE if unicode_white else _WHITE
+        self._break = _UNICODE_BREAK if unicode_white else _BREAK
+        self._started = False  # whether text was returned already
+        self._pending = u''  # white space waiting for more text
+        self._held = u''  # text held back for NFC
+
+    def __repr__(self):
+        return "%s(mode=%r, unicode_white=%r, nfc=%r)" % (
+            self.__class__.__name__, self.mode, self.unicode_white,
+            self.nfc)
+
+    def _sep(self, white):
+        """Return what a run of white space is replaced with."""
+        if self.mode == PARAGRAPHS and (
+                white.count(u'\n') > 1 or u'\f' in white or
+                (self.unicode_white and u'\u2029' in white)):
+            return u'\n\n'
+        return u' '
+
+    def _other_white(self, white):
+        """True if `white` has white space which is kept within text."""
+        return not self.unicode_white and \
+            any(x in white for x in OTHER_WHITE)
+
+    def _join(self, white):
+        """Return what a run of white space between two chunks of text
+        is replaced with.
+        """
+        if self._other_white(white):
+            # As if the chunks were one.
+            return self._collapse(u'.' + white + u'.')[1:-1]
+        return self._sep(white)
+
+    def _squeeze(self, white):
+        """Shorten a run of white space, keeping what _sep() needs to
+        know about it (it may continue in the next chunk).
+        """
+        if len(white) <= 2:
+            return white
+        if self._other_white(white):
+            # What follows the last non-ASCII white space may still
+            # join the next chunk's.
+            cut = max(white.rfind(x) for x in OTHER_WHITE) + 1
+            return self._join(white[:cut]) + self._squeeze(white[cut:])
+        if self._sep(white) != u' ':
+            return u'\n\n'
+        return u'\n' if u'\n' in white else u' '
+
+    def _collapse(self, text):
+        """Normalize text with no leading or trailing white space."""
+        if self.mode == PARAGRAPHS:
+            return u'\n\n'.join(
+                self._collapse_line(x) for x in self._break.split(text))
+        return self._collapse_line(text)
+
+    def _collapse_line(self, text):
+        if self.unicode_white or not any(x in text for x in OTHER_WHITE):
+            # Much faster than a regex, even with the check above.
+            return u' '.join(text.split())
+        return self._white.sub(u' ', text)
+
+    def _compose(self, text):
+        # Hold back the end of text, which may compose with what comes
+        # next, unless it grew too big.
+        text = self._held + text
+        # Separators are ASCII; look for them first as it's faster.
+        cut = max(text.rfind(u' '), text.rfind(u'\n'))
+        if cut == -1:
+            m = _LAST_ASCII.search(text)
+            cut = m.start() if m is not None else -1
+        if cut != -1:
+            self._held = text[cut:]
+            text = text[:cut]
+        elif len(text) < BUFFER_MAX:
+            self._held = text
+            return u''
+        else:
+            self._held = u''
+        return unicodedata.normalize('NFC', text)
+
+    def feed(self, chunk):
+        # All Unicode white space is stripped at the edges of the
+        # document (the end may be the end of this chunk).
+        body = chunk.lstrip(self._chars if self._started else None)
+        text = body.rstrip()
+        if not text:
+            self._pending = self._squeeze(self._pending + chunk)
+            return u''
+        lead = chunk[:len(chunk) - len(body)]
+        trail = body[len(text):]
+        text = self._collapse(text)
+        if self._started and (self._pending or lead):
+            text = self._join(self._pending + lead) + text
+        self._started = True
+        self._pending = self._squeeze(trail)
+        if self.nfc:
+            text = self._compose(text)
+        return text
+
+    def close(self):
+        # Trailing white space is dropped.
+        text, self._held = self._held, u''
+        if text:
+            text = unicodedata.normalize('NFC', text)
+        return text
+
+    def iter(self, chunks):
+        """Normalize an iterable of text chunks, yielding non-empty
+        chunks.
+        """
+        for chunk in chunks:
+            assert chunk is not None, "backend function returned None"
+            text = self.feed(chunk)
+            if text:
+                yield text
+        text = self.close()
+        if text:
+            yield text
+
+    def normalize(self, text):
+        """Normalize a whole text."""
+        if len(text) <= BUFFER_MAX:
+            return u''.join(self.iter([text]))
+        return u''.join(self.iter(
+            text[i:i + BUFFER_MAX] for i in range(0, len(text), BUFFER_MAX)))
+
+
+def from_kwargs(kwargs):
+    """Return the Normalizer configured by backend kwargs, None if
+    normalization is disabled.
+    """
+    kwargs = kwargs or {}
+    mode = kwargs.get('normalize', COLLAPSE)
+    if not mode:
+        return None
+    return Normalizer(mode, unicode_white=kwargs.get('unicode_white', False),
+                      nfc=kwargs.get('nfc', False))
+
+
+def normalize(text, mode=COLLAPSE, unicode_white=False, nfc=False):
+    """Normalize `text` (see module doc for args)."""
+    return Normalizer(mode, unicode_white, nfc).normalize(text)
+
+
+def member_kwargs(kwargs):
+    """Return the normalization kwargs among `kwargs`, to be passed to
+    the members of a container, None if there are none.
+    """
+    kw = dict((k, v) for k, v in (kwargs or {}).items() if k in KWARGS)
+    return kw or None
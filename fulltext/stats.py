@@ -0,0 +1,196 @@
+"""
+Per-stage timing instrumentation of `fulltext.get()`.
+
+Register a callback and it will be called with a `Record` after every
+extraction, telling how long each stage took, which backend was used
+and how many bytes were read (`partial` tells whether the backend only
+sampled part of the document):
+
+    >>> from fulltext import stats
+    >>> def hook(rec):
+    ...     print(rec.backend, rec.elapsed, rec.stages)
+    >>> stats.register_hook(hook)
+    >>> fulltext.get('foo.pdf')
+    fulltext.backends.__pdf 0.051 {'detect': 0.0001, 'import': 0.0004, ...}
+
+`Aggregator` is a hook which sums up records by backend; the CLI uses
+it to implement `--stats`. Hooks are called in the process doing the
+extraction (with `get_many()` that's a worker process). When no hooks
+are registered the overhead is negligible.
+
+Stages are:
+ * cache: hashing the document and looking it up in the cache
+ * detect: guessing the MIME type
+ * import: importing the backend module
+ * check: running backend's `check()`
+ * extract: extracting the text
+ * title: extracting the title
+ * normalize: normalizing white space (see `fulltext.normalize`)
+Time spent in nested stages is not accounted to the outer one.
+"""
+
+from __future__ import absolute_import, division
+
+import contextlib
+import logging
+import threading
+
+from fulltext.compat import timer
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(logging.NullHandler())
+STAGES = ('cache', 'detect', 'import', 'check', 'extract', 'title',
+          'normalize')
+
+_hooks = []
+_local = threading.local()
+
+
+class Record(object):
+    """Timings of a single extraction."""
+
+    def __init__(self, name):
+        self.name = name
+        self.backend = None
+        self.bytes = None
+        self.cached = False
+        # Set by backends which only read part of the document.
+        self.partial = False
+        self.error = None
+        self.elapsed = 0.0
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        # Stack of [stage, start, time spent in nested stages].
+        self._running = []
+
+    def __repr__(self):
+        return "<%s name=%r backend=%r elapsed=%.4f>" % (
+            self.__class__.__name__, self.name, self.backend, self.elapsed)
+
+    def as_dict(self):
+        return dict(name=self.name, backend=self.backend, bytes=self.bytes,
+                    cached=self.cached, partial=self.partial,
+                    error=self.error,
+                    elapsed=self.elapsed, stages=self.stages.copy())
+
+
+def register_hook(fun):
+    """Call `fun(record)` after every extraction."""
+    if fun not in _hooks:
+        _hooks.append(fun)
+
+
+def unregister_hook(fun):
+    _hooks.remove(fun)
+
+
+def current():
+    """Return the Record of the extraction running in this thread
+    (None if there are no hooks).
+    """
+    return getattr(_local, 'record', None)
+
+
+@contextlib.contextmanager
+def record(name):
+    """Context manager collecting stats about an extraction and
+    passing them to hooks when done. Yields the Record (None if there
+    are no hooks). Nested extractions (e.g. archive members) get their
+    own record.
+    """
+    if not _hooks:
+        yield None
+        return
+    rec, prev = Record(name), current()
+    _local.record = rec
+    started = timer()
+    try:
+        yield rec
+    except Exception as err:
+        rec.error = repr(err)
+        raise
+    finally:
+        rec.elapsed = timer() - started
+        _local.record = prev
+        for fun in list(_hooks):
+            try:
+                fun(rec)
+            except Exception:
+                LOGGER.exception("error in stats hook %r" % fun)
+
+
+@contextlib.contextmanager
+def timed(stage):
+    """Account time spent in the with block to `stage` of the current
+    record, if any.
+    """
+    rec = current()
+    if rec is None:
+        yield
+        return
+    frame = [stage, timer(), 0.0]
+    rec._running.append(frame)
+    try:
+        yield
+    finally:
+        rec._running.pop()
+        elapsed = timer() - frame[1]
+        rec.stages[stage] += elapsed - frame[2]
+        if rec._running:
+            rec._running[-1][2] += elapsed
+
+
+class Aggregator(object):
+    """A hook summing up records by backend.
+
+    >>> agg = Aggregator()
+    >>> stats.register_hook(agg)
+    >>> ...
+    >>> agg.report()
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.backends = {}
+
+    def __call__(self, rec):
+        with self._lock:
+            try:
+                entry = self.backends[rec.backend]
+            except KeyError:
+                entry = self.backends[rec.backend] = dict(
+                    count=0, errors=0, cached=0, partial=0, bytes=0,
+                    elapsed=0.0,
+                    stages=dict.fromkeys(STAGES, 0.0))
+            entry['count'] += 1
+            entry['errors'] += rec.error is not None
+            entry['cached'] += rec.cached
+            entry['partial'] += rec.partial
+            entry['bytes'] += rec.bytes or 0
+            entry['elapsed'] += rec.elapsed
+            for stage, secs in rec.stages.items():
+                entry['stages'][stage] += secs
+
+    def report(self):
+        """Return a {backend: stats} dict."""
+        with self._lock:
+            return dict((k, dict(v, stages=v['stages'].copy()))
+                        for k, v in self.backends.items())
+
+    def format(self):
+        """Return a human readable table, slowest backends first."""
+        cols = ('backend', 'count', 'errors', 'MB', 'total') + STAGES
+        rows = [cols]
+        report = self.report()
+        for name in sorted(report, key=lambda x: -report[x]['elapsed']):
+            entry = report[name]
+            rows.append(
+                (str(name).replace('fulltext.backends.', ''),
+                 str(entry['count']), str(entry['errors']),
+                 '%.1f' % (entry['bytes'] / 1024.0 / 1024.0),
+                 '%.3f' % entry['elapsed']) +
+                tuple('%.3f' % entry['stages'][x] for x in STAGES))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(cols))]
+        return '\n'.join(
+            '  '.join(x.ljust(w) for x, w in zip(row, widths)).rstrip()
+            for row in rows)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import itertools
 import os
 import unittest
 import tempfile
@@ -183,6 +184,60 @@ class FullTextTestCase(BaseTestCase):
                                   'Test punctuation removal! Test spaces '
                                   'removal!', stripped)
 
+    def test_bin_strings(self):
+        data = (b'\x01\x02hello\x00ab\x03w\x00o\x00r\x00l\x00d\x00'
+                b'\x00\x00\xffabcde\x00f\x00g\x00h\x00i\x00\xfe')
+        self.assertEqual(fulltext.get(BytesIO(data), backend='bin'),
+                         u'hello world abcde fghi')
+        self.assertEqual(fulltext.get(BytesIO(data), backend='bin',
+                                      kwargs={'min_length': 5}),
+                         u'hello world abcde')
+
+    def test_bin_chunks(self):
+        # Strings split across chunks are found whole.
+        data = b''.join(b'\xff' * i + b'lorem ipsum\x00' +
+                        u'dolor sit'.encode('utf-16-le')
+                        for i in range(20))
+        with mock.patch('fulltext.backends.__bin.BUFFER_MAX', 32):
+            text = fulltext.get(BytesIO(data), backend='bin')
+        self.assertEqual(text, u' '.join([u'lorem ipsum dolor sit'] * 20))
+
+    def test_bin_carry(self):
+        # What's carried over to the next chunk stays bounded.
+        bin_mod = fulltext.import_mod('fulltext.backends.__bin')
+        for data in (b'\0' * 1000, b'A' * 1000, b'A\0' * 500):
+            with mock.patch('fulltext.backends.__bin.BUFFER_MAX', 64), \
+                    mock.patch('fulltext.backends.__bin.find_strings',
+                               wraps=bin_mod.find_strings) as m:
+                text = fulltext.get(BytesIO(data), backend='bin')
+            self.assertLessEqual(max(len(x[0][0]) for x in m.call_args_list),
+                                 128)
+            self.assertEqual(len(text.replace(u' ', u'')),
+                             len(data.replace(b'\0', b'')))
+
+    def test_bin_sample(self):
+        data = b''.join(b'\xff' * 100 + (u'word%04d' % i).encode('ascii')
+                        for i in range(1000))
+        text = fulltext.get(BytesIO(data), backend='bin', kwargs={
+            'sample_size': 1080, 'sample_windows': 8})
+        self.assertEqual(text.split(), [u'word%04d' % i for i in range(
+            0, 1000, 111)])
+        # Global policy, overridden per call.
+        with mock.patch('fulltext.backends.__bin.SAMPLE_SIZE', 216), \
+                mock.patch('fulltext.backends.__bin.SAMPLE_WINDOWS', 0):
+            text = fulltext.get(BytesIO(data), backend='bin')
+            self.assertEqual(text, u'word0000 word0999')
+            text = fulltext.get(BytesIO(data), backend='bin',
+                                kwargs={'sample_size': None})
+            self.assertEqual(len(text.split()), 1000)
+
+    def test_bin_sample_windows(self):
+        bin_mod = fulltext.import_mod('fulltext.backends.__bin')
+        self.assertEqual(bin_mod.sample_windows(100, 100), [(0, 100)])
+        self.assertEqual(bin_mod.sample_windows(1000, 100, 3),
+                         [(0, 20), (245, 20), (490, 20), (735, 20),
+                          (980, 20)])
+
     def test_register_backend_ext(self):
         fulltext.register_backend(
             'application/ijustmadethisup',
@@ -212,6 +267,16 @@ class TestCLI(BaseTestCase):
                 sys.executable, pathjoin(HERE, "files/test.txt")),
             shell=True)
 
+    def test_extract_stats(self):
+        p = subprocess.Popen(
+            "%s -m fulltext extract -s %s" % (
+                sys.executable, pathjoin(HERE, "files/test.txt")),
+            shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = p.communicate()
+        self.assertEqual(p.returncode, 0, err.decode())
+        self.assertIn(TEXT, out.decode())
+        self.assertIn("__text", err.decode())
+
     def test_check(self):
         p = subprocess.Popen(
             "%s -m fulltext -t check" % sys.executable, shell=True,
@@ -233,6 +298,19 @@ class TestCLI(BaseTestCase):
                      'fulltext.backends.__ocr',
                      'fulltext.backends.__ps'])
 
+    def test_bench(self):
+        out = subprocess.check_output(
+            "%s -m fulltext --kinds=txt,html --size=1K --count=2 bench" % (
+                sys.executable), shell=True)
+        import json
+        res = json.loads(out.decode())["results"]
+        self.assertEqual(sorted((x["kind"], x["mode"]) for x in res),
+                         [("html", "fobj"), ("html", "path"),
+                          ("txt", "fobj"), ("txt", "path")])
+        for x in res:
+            self.assertEqual(x["docs"], 2)
+            self.assertEqual(x["errors"], 0)
+
     @unittest.skipIf(not WINDOWS, "windows only")
     def test_which(self):
         self.assertIsNotNone(which("pdftotext"))
@@ -297,6 +375,45 @@ class TestBackendInterface(BaseTestCase):
 
         self.assertEqual(flags, ['setup', 'teardown'])
 
+    def test_check_cached(self):
+        # check() is run only once per backend, also when it fails.
+        import types
+        from fulltext.util import BaseBackend
+
+        calls = []
+
+        class Backend(BaseBackend):
+
+            def check(self, title):
+                calls.append(title)
+                if self.kwargs.get('fail'):
+                    raise ValueError("missing")
+
+            def handle_path(self, path):
+                return u"text"
+
+        mod = types.ModuleType('fake_backend')
+        mod.Backend = Backend
+        fname = self.touch('testfn.txt')
+        self.addCleanup(fulltext.invalidate_backend_cache)
+        fulltext.invalidate_backend_cache()
+        for x in range(3):
+            self.assertEqual(fulltext.get(fname, backend=mod), u"text")
+        self.assertEqual(calls, [False])
+
+        # check() may depend on kwargs: other ones are checked again.
+        with warnings.catch_warnings(record=True) as ws:
+            warnings.simplefilter("always")
+            for x in range(2):
+                fulltext.get(fname, backend=mod, kwargs=dict(fail=True))
+        self.assertEqual(calls, [False, False])
+        self.assertEqual(len(ws), 2)
+        self.assertIn("missing", str(ws[0].message))
+
+        fulltext.invalidate_backend_cache()
+        fulltext.get(fname, backend=mod)
+        self.assertEqual(calls, [False, False, False])
+
 
 class TestInstalledDeps(BaseTestCase):
     """Make sure certain deps are installed."""
@@ -320,6 +437,50 @@ class TestInstalledDeps(BaseTestCase):
         self.assertIsNotNone(exiftool)
 
 
+@unittest.skipIf(sys.version_info < (3, 7), "needs PEP 562")
+class TestImportTime(BaseTestCase):
+    """`import fulltext` must stay cheap."""
+
+    # Seconds; generous as CI machines are slow, normally ~0.05.
+    BUDGET = 1.0
+
+    def python(self, code):
+        return subprocess.check_output(
+            [sys.executable, "-c", textwrap.dedent(code)],
+            universal_newlines=True).strip()
+
+    def test_lazy_imports(self):
+        out = self.python("""
+            import sys, fulltext
+            print(' '.join(sorted(sys.modules)))
+            """)
+        mods = out.split()
+        for name in ('magic', 'exiftool', 'mimetypes', 'subprocess',
+                     'concurrent.futures', 'fulltext.cache', 'pickle'):
+            self.assertNotIn(name, mods)
+        self.assertFalse([x for x in mods if x.startswith(
+            'fulltext.backends.')])
+
+    @unittest.skipIf(magic is None, "magic lib not installed")
+    def test_magic_on_access(self):
+        out = self.python("""
+            import sys, fulltext
+            assert 'magic' not in sys.modules
+            assert fulltext.magic is not None
+            print('magic' in sys.modules)
+            """)
+        self.assertEqual(out, 'True')
+
+    def test_budget(self):
+        out = self.python("""
+            from timeit import default_timer as timer
+            t = timer()
+            import fulltext
+            print(timer() - t)
+            """)
+        self.assertLess(float(out), self.BUDGET)
+
+
 # ===================================================================
 # --- Mixin tests
 # ===================================================================
@@ -365,6 +526,41 @@ class PathAndFileTests(object):
 class TxtTestCase(BaseTestCase, PathAndFileTests):
     ext = 'txt'
 
+    def get_both(self, content, **kwargs):
+        """Extract `content` both from a path and a file object."""
+        fd, fname = tempfile.mkstemp(suffix='.txt')
+        os.close(fd)
+        self.touch(fname, content)
+        ret = fulltext.get(fname, **kwargs)
+        self.assertEqual(
+            fulltext.get(self.touch_fobj(content), backend='txt', **kwargs),
+            ret)
+        return ret
+
+    def test_split_chars(self):
+        # Multibyte chars split across chunks.
+        with mock.patch("fulltext.backends.__text.BUFFER_MAX", 3):
+            self.assertEqual(self.get_both(u"\u20ac\u20ac \u20ac".encode(
+                'utf8'), encoding='utf8'), u"\u20ac\u20ac \u20ac")
+            with self.assertRaises(UnicodeDecodeError):
+                self.get_both(u"\u20ac".encode('utf8')[:2], encoding='utf8')
+
+    def test_sniff_encoding(self):
+        text = u"ciao bella \u00e0\u00e8\u00ec"
+        for data in (codecs.BOM_UTF8 + text.encode('utf8'),
+                     text.encode('utf16'), text.encode('utf32')):
+            self.assertEqual(self.get_both(data), text)
+        with mock.patch("fulltext.ENCODING", "ascii"):
+            self.assertEqual(self.get_both(text.encode('utf8')), text)
+            with self.assertRaises(UnicodeDecodeError):
+                self.get_both(text.encode('utf8'), encoding='ascii')
+            with self.assertRaises(UnicodeDecodeError):
+                self.get_both(text.encode('utf8'),
+                              kwargs={'sniff_encoding': False})
+
+    def test_empty(self):
+        self.assertEqual(self.get_both(b""), u"")
+
 
 class OdtTestCase(BaseTestCase, PathAndFileTests):
     ext = 'odt'
@@ -402,6 +598,25 @@ class XmlTestCase(BaseTestCase, PathAndFileTests):
 class ZipTestCase(BaseTestCase, PathAndFileTests):
     ext = "zip"
 
+    def test_workers(self):
+        import zipfile
+
+        fname = self.touch('test-workers.zip')
+        with zipfile.ZipFile(fname, 'w') as z:
+            for x in range(20):
+                z.writestr('%02d.txt' % (19 - x), ('member%s ' % x) * 100)
+        serial = fulltext.get(fname)
+        self.assertIn('member19 member19', serial)
+        self.assertLess(serial.index('member19'), serial.index('member0 '))
+        for workers in (0, 4):
+            self.assertEqual(
+                fulltext.get(fname, kwargs=dict(workers=workers)), serial)
+        # Members bigger than their share of the memory budget are
+        # buffered on disk.
+        with mock.patch('fulltext.util.MAX_INFLIGHT_BYTES', 1024):
+            self.assertEqual(
+                fulltext.get(fname, kwargs=dict(workers=4)), serial)
+
 
 class PdfTestCase(BaseTestCase, PathAndFileTests):
     ext = "pdf"
@@ -425,6 +640,34 @@ class CsvTestCase(BaseTestCase, PathAndFileTests):
         fname = self.touch('testfn.csv', content="foo\n\rbar")
         self.assertEqual(fulltext.get(fname), "foo bar")
 
+    def test_sniff_dialect(self):
+        f = BytesIO(b'a;b;c\n1;"x; y";3\n')
+        self.assertEqual(fulltext.get(f, backend='csv'), u"a b c 1 x; y 3")
+        # An explicit MIME type wins.
+        f = BytesIO(b'a;b\tc\n')
+        self.assertEqual(fulltext.get(f, backend='csv', mime='text/tsv'),
+                         u"a;b c")
+
+    def test_columns(self):
+        data = b'id,name,notes\n1,foo,bar baz\n2,qux,-3.5\n'
+
+        def get(**kwargs):
+            return fulltext.get(BytesIO(data), backend='csv', kwargs=kwargs)
+
+        self.assertEqual(get(include_columns=['name', 2]),
+                         u"name notes foo bar baz qux -3.5")
+        self.assertEqual(get(exclude_columns=[0]),
+                         u"name notes foo bar baz qux -3.5")
+        self.assertEqual(get(skip_numeric=True),
+                         u"id name notes foo bar baz qux")
+
+    def test_long_line(self):
+        # Longer than what's looked at to sniff the dialect.
+        line = u",".join([u"abcdefghij"] * 3000)
+        data = (line + u"\n" + line).encode('ascii')
+        text = fulltext.get(BytesIO(data), backend='csv')
+        self.assertEqual(text, u" ".join([u"abcdefghij"] * 6000))
+
 
 class TsvTestCase(BaseTestCase, PathAndFileTests):
     ext = "tsv"
@@ -457,6 +700,16 @@ class EmlTestCase(BaseTestCase, PathAndFileTests):
 class MboxTestCase(BaseTestCase, PathAndFileTests):
     ext = "mbox"
 
+    def test_no_blank_line(self):
+        # As for mailbox.mbox any "From " line starts a message.
+        fname = self.touch('test-split.mbox', (
+            b'From a@b Thu Jan  1 00:00:00 1970\n\nbody one\n'
+            b'From c@d Thu Jan  1 00:00:00 1970\n\nbody two\n'))
+        self.assertEqual(fulltext.get(fname), u'body one body two')
+        with open(fname, 'rb') as f:
+            self.assertEqual(fulltext.get(f), u'body one body two')
+        self.assertEqual(len(list(fulltext.iter_members(fname))), 2)
+
 
 class MsgTestCase(BaseTestCase, PathAndFileTests):
     ext = "msg"
@@ -487,6 +740,65 @@ class GzTestCase(BaseTestCase, PathAndFileTests):
         text = fulltext.get(pathjoin(HERE, "files/gz/test.txt.gz"))
         self.assertMultiLineEqual(self.text, text)
 
+    def test_fobj_limits(self):
+        # The member is wrapped to count bytes read.
+        import gzip
+        from fulltext.limits import Limits
+        buf = BytesIO()
+        with gzip.GzipFile('test.txt', 'wb', fileobj=buf) as g:
+            g.write(b'hello world ' * 50000)
+        data = buf.getvalue()
+        expected = u' '.join([u'hello world'] * 50000)
+        limits = Limits(max_bytes=10 ** 6)
+        text = fulltext.get(BytesIO(data), backend='gz', limits=limits)
+        self.assertEqual(expected, text)
+        # The backend fails on the gzip file object: extracted on disk.
+        with mock.patch('fulltext.backends.__text.Backend.handle_fobj',
+                        side_effect=ValueError):
+            text = fulltext.get(BytesIO(data), backend='gz', limits=limits)
+        self.assertEqual(expected, text)
+
+
+try:
+    import pdfminer  # NOQA
+except ImportError:
+    pdfminer = None
+
+
+@unittest.skipIf(pdfminer is None, "pdfminer.six not installed")
+class PdfMinerTestCase(BaseTestCase):
+    kwargs = {'engine': 'pdfminer'}
+
+    def test_path(self):
+        text = fulltext.get(pathjoin(HERE, 'files/test.pdf'),
+                            kwargs=self.kwargs)
+        self.assertMultiLineEqual(TEXT, text)
+
+    def test_file(self):
+        with open(pathjoin(HERE, 'files/test.pdf'), 'rb') as f:
+            text = fulltext.get(f, kwargs=self.kwargs)
+        self.assertMultiLineEqual(TEXT, text)
+
+    def test_backend(self):
+        fname = pathjoin(HERE, 'files/test.pdf')
+        with mock.patch('fulltext.handle_path', return_value="") as m:
+            fulltext.get(fname, kwargs=self.kwargs)
+            klass = m.call_args[0][0]
+            self.assertEqual(klass.__module__, 'fulltext.backends.__pdfminer')
+
+    def test_title(self):
+        fname = pathjoin(HERE, "files/others/test.pdf")
+        self.assertEqual(
+            fulltext.get_with_title(fname, kwargs=self.kwargs)[1],
+            "This is a test PDF file")
+
+    def test_pages(self):
+        fname = pathjoin(HERE, 'files/test.pdf')
+        kwargs = dict(first_page=2, **self.kwargs)
+        self.assertEqual(fulltext.get(fname, kwargs=kwargs), "")
+        kwargs = dict(first_page=1, last_page=1, **self.kwargs)
+        self.assertMultiLineEqual(fulltext.get(fname, kwargs=kwargs), TEXT)
+
 
 # ---
 
@@ -633,6 +945,473 @@ class TestFileObj(BaseTestCase):
         mod = fulltext.backend_from_fobj(f)
         self.assertEqual(mod.__name__, 'fulltext.backends.__text')
 
+    def test_no_tempfile(self):
+        # These backends can read file objects directly.
+        from fulltext.util import spilled_bytes
+        for ext in ("mbox", "pptx", "epub"):
+            before = spilled_bytes()
+            path = pathjoin(HERE, "files/test.%s" % ext)
+            with open(path, "rb") as f:
+                text = fulltext.get(f, name=path)
+            self.assertEqual(text, fulltext.get(path))
+            self.assertEqual(spilled_bytes(), before)
+
+    def test_tempfile(self):
+        from fulltext import util
+        path = pathjoin(HERE, "files/test.txt")
+        before = util.spilled_bytes().get('foo', 0)
+        with open(path, "rb") as f:
+            # Force a move from SHMDIR to TEMPDIR.
+            with mock.patch("fulltext.util.SHM_MAX_SIZE", 10):
+                with util.fobj_to_tempfile(f, label='foo') as fname:
+                    self.assertTrue(fname.startswith(util.TEMPDIR))
+                    with open(fname, "rb") as f2:
+                        self.assertEqual(f2.read(), open(path, "rb").read())
+        self.assertFalse(os.path.exists(fname))
+        self.assertEqual(util.spilled_bytes()['foo'] - before,
+                         os.path.getsize(path))
+
+
+class TestGetMany(BaseTestCase):
+
+    def test_paths(self):
+        paths = [pathjoin(HERE, "files/test.%s" % ext)
+                 for ext in ("txt", "csv", "json", "html")]
+        ret = dict(fulltext.get_many(paths, workers=2))
+        self.assertEqual(sorted(ret), sorted(paths))
+        self.assertMultiLineEqual(ret[paths[0]], TEXT)
+        self.assertMultiLineEqual(ret[paths[1]], TEXT.replace(',', ''))
+        self.assertMultiLineEqual(ret[paths[2]], TEXT)
+        self.assertMultiLineEqual(ret[paths[3]], TEXT)
+
+    def test_fobjs(self):
+        f1 = self.touch_fobj(content=b"hello world")
+        f2 = self.touch_fobj(content=b"foo bar")
+        ret = dict(fulltext.get_many([f1, f2], workers=2, backend="txt"))
+        self.assertEqual(ret[f1], "hello world")
+        self.assertEqual(ret[f2], "foo bar")
+
+    def test_error(self):
+        ret = list(fulltext.get_many(['non-existent-file.txt'], workers=2))
+        self.assertEqual(len(ret), 1)
+        self.assertIsInstance(ret[0][1], IOError)
+
+    def test_default(self):
+        ret = list(fulltext.get_many(
+            ['non-existent-file.txt'], workers=2, default='sentinal'))
+        self.assertEqual(ret, [('non-existent-file.txt', 'sentinal')])
+
+    def test_serial(self):
+        path = pathjoin(HERE, "files/test.txt")
+        with mock.patch("fulltext.get", return_value="text") as m:
+            ret = list(fulltext.get_many([path], workers=1))
+            self.assertEqual(ret, [(path, "text")])
+            self.assertEqual(m.call_count, 1)
+
+
+class TestMembers(BaseTestCase):
+
+    def make_zip(self):
+        import zipfile
+
+        fname = self.touch('test-members.zip')
+        with zipfile.ZipFile(fname, 'w') as z:
+            z.writestr('b.txt', b'hello')
+            z.writestr('a.json', b'{"foo": "bar"}')
+            z.writestr('dir/', b'')
+            z.writestr('noext', b'%PDF-1.4 not really')
+            z.writestr('c.txt', b'world')
+        return fname
+
+    def test_containers(self):
+        for ext, name, mime in (('zip', 'test.txt', 'text/plain'),
+                                ('gz', 'test', 'text/plain'),
+                                ('eml', 'part-1', 'text/plain'),
+                                ('mbox', 'message-1', 'message/rfc822')):
+            path = pathjoin(HERE, "files/test.%s" % ext)
+            members = list(fulltext.iter_members(path))
+            self.assertEqual(len(members), 1, ext)
+            m = members[0]
+            self.assertEqual((m.name, m.mime, m.error), (name, mime, None))
+            self.assertEqual(m.text, TEXT)
+            self.assertGreater(m.size, 0)
+            self.assertGreaterEqual(m.elapsed, 0)
+            with open(path, 'rb') as f:
+                self.assertEqual(list(fulltext.iter_members(f))[0].text,
+                                 TEXT)
+
+    def test_order(self):
+        members = list(fulltext.iter_members(self.make_zip()))
+        self.assertEqual([x.name for x in members],
+                         ['a.json', 'b.txt', 'c.txt', 'noext'])
+        self.assertEqual([x.text for x in members][:3],
+                         ['foo bar', 'hello', 'world'])
+        self.assertEqual([x.size for x in members][:3], [14, 5, 5])
+
+    def test_skip_errors(self):
+        fname = self.make_zip()
+        with mock.patch('fulltext.backends.__json.Backend.handle_fobj',
+                        side_effect=ValueError("bad member")):
+            members = list(fulltext.iter_members(fname))
+            self.assertEqual(len(members), 4)
+            self.assertIsInstance(members[0].error, ValueError)
+            self.assertIsNone(members[0].text)
+            self.assertEqual(members[1].text, 'hello')
+
+            with self.assertRaises(ValueError):
+                list(fulltext.iter_members(fname, skip_errors=False))
+
+    def test_bad_charset(self):
+        # A part whose charset is wrong doesn't stop the other ones.
+        fname = self.touch('test-charset.eml', (
+            b'Content-Type: multipart/mixed; boundary="XX"\n\n'
+            b'--XX\nContent-Type: text/plain; charset=utf-8\n\n'
+            b'caf\xe9\n'
+            b'--XX\nContent-Type: text/plain; charset=latin-1\n\n'
+            b'caf\xe9\n--XX--\n'))
+        members = list(fulltext.iter_members(fname))
+        self.assertEqual(len(members), 2)
+        self.assertIsInstance(members[0].error, UnicodeDecodeError)
+        self.assertEqual(members[1].text, u'caf\xe9')
+
+    def test_workers(self):
+        fname = self.make_zip()
+        self.assertEqual(list(fulltext.iter_members(fname, workers=3)),
+                         [x._replace(elapsed=mock.ANY) for x in
+                          fulltext.iter_members(fname)])
+
+    def test_not_a_container(self):
+        with self.assertRaises(ValueError):
+            list(fulltext.iter_members(pathjoin(HERE, "files/test.txt")))
+
+
+class TestGetIter(BaseTestCase):
+
+    def test_strip_white_iter(self):
+        chunks = [u"  foo \n", u"\n\t", u"bar", u"baz  ", u" ", u"qux \n"]
+        expected = fulltext.STRIP_WHITE.sub(' ', u''.join(chunks)).strip()
+        self.assertEqual(
+            u''.join(fulltext.strip_white_iter(chunks)), expected)
+
+    def test_same_as_get(self):
+        for ext in ("txt", "csv", "zip", "mbox", "json"):
+            path = pathjoin(HERE, "files/test.%s" % ext)
+            self.assertEqual(
+                u''.join(fulltext.get_iter(path)), fulltext.get(path))
+            with open(path, 'rb') as f:
+                self.assertEqual(
+                    u''.join(fulltext.get_iter(f, name=path)),
+                    fulltext.get(path))
+
+    def test_cli_backends(self):
+        # These stream the output of CLI tools.
+        for ext in ("pdf", "doc", "rtf", "ps"):
+            path = pathjoin(HERE, "files/test.%s" % ext)
+            self.assertEqual(
+                u''.join(fulltext.get_iter(path)), fulltext.get(path))
+            with open(path, 'rb') as f:
+                self.assertEqual(
+                    u''.join(fulltext.get_iter(f, name=path)),
+                    fulltext.get(path))
+
+    def test_chunks(self):
+        f = self.touch_fobj(content=b"foo   bar\n" * 100000)
+        with mock.patch("fulltext.backends.__text.BUFFER_MAX", 1000):
+            chunks = list(fulltext.get_iter(f, backend="txt"))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(u''.join(chunks), " ".join(["foo bar"] * 100000))
+
+    def test_default(self):
+        self.assertEqual(
+            list(fulltext.get_iter('non-existent-file.txt', 'sentinal')),
+            ['sentinal'])
+        with self.assertRaises(IOError):
+            list(fulltext.get_iter('non-existent-file.txt'))
+
+
+class TestNormalize(BaseTestCase):
+
+    def test_modes(self):
+        from fulltext.normalize import normalize
+        text = u" foo \t bar\r\n\r\nbaz\fqux\u00a0quux\u2028 "
+        self.assertEqual(normalize(text),
+                         u"foo bar baz qux\u00a0quux")
+        self.assertEqual(normalize(text, 'paragraphs'),
+                         u"foo bar\n\nbaz\n\nqux\u00a0quux")
+        self.assertEqual(normalize(text, unicode_white=True),
+                         u"foo bar baz qux quux")
+        self.assertEqual(normalize(u"cafe\u0301", nfc=True), u"caf\u00e9")
+        with self.assertRaises(ValueError):
+            normalize(text, 'foo')
+
+    def test_chunks(self):
+        from fulltext.normalize import Normalizer
+        chunks = [u"  foo \n", u"\n", u"\t", u"bar", u"baz cafe",
+                  u"\u0301 ", u"\n"]
+        self.assertEqual(
+            u''.join(Normalizer('paragraphs', nfc=True).iter(chunks)),
+            u"foo\n\nbarbaz caf\u00e9")
+
+    def test_unicode_edges(self):
+        # Unicode white space is stripped at the edges only.
+        from fulltext.normalize import Normalizer
+        self.assertEqual(
+            fulltext.get(self.touch_fobj(u"\xa0foo bar\u3000".encode(
+                'utf8')), backend="txt"), u"foo bar")
+        chunks = [u"\xa0", u" foo\xa0", u"bar \u3000", u" ", u"baz\u2028"]
+        self.assertEqual(u''.join(Normalizer().iter(chunks)),
+                         u"foo\xa0bar \u3000 baz")
+        self.assertEqual(u''.join(Normalizer().iter(chunks)),
+                         Normalizer().normalize(u''.join(chunks)))
+
+    def test_kwargs(self):
+        fname = self.touch(pathjoin(tempfile.gettempdir(), 'fulltext.txt'),
+                           b"  foo\n\nbar  ")
+        self.assertEqual(fulltext.get(fname), u"foo bar")
+        for fun in (fulltext.get, lambda *a, **kw: u''.join(
+                fulltext.get_iter(*a, **kw))):
+            self.assertEqual(fun(fname, kwargs={'normalize': 'paragraphs'}),
+                             u"foo\n\nbar")
+            self.assertEqual(fun(fname, kwargs={'normalize': None}),
+                             u"  foo\n\nbar  ")
+
+    def test_normalized_backend(self):
+        # Backends can tell their text needs no normalization.
+        backend = fulltext.import_mod('fulltext.backends.__text').Backend
+        with mock.patch.object(backend, 'normalized', True):
+            self.assertEqual(
+                fulltext.get(self.touch_fobj(b" foo  bar "), backend="txt"),
+                u" foo  bar ")
+
+
+class TestLimits(BaseTestCase):
+
+    def test_max_chars(self):
+        path = pathjoin(HERE, "files/test.txt")
+        for ext in ("txt", "csv", "zip", "mbox", "html"):
+            path = pathjoin(HERE, "files/test.%s" % ext)
+            full = fulltext.get(path)
+            text = fulltext.get(path, kwargs={'max_chars': 30})
+            self.assertEqual(text, full[:30].rstrip())
+            self.assertEqual(
+                u''.join(fulltext.get_iter(path, kwargs={'max_chars': 30})),
+                text)
+
+    def test_max_chars_stops_reading(self):
+        f = self.touch_fobj(content=b"foo   bar\n" * 100000)
+        with mock.patch("fulltext.backends.__text.BUFFER_MAX", 1000):
+            text = fulltext.get(f, backend="txt", kwargs={'max_chars': 10})
+        self.assertEqual(text, "foo bar fo")
+        # Only the first chunk was read.
+        self.assertEqual(f.tell(), 1000)
+
+    def test_page_range(self):
+        from fulltext.backends.__pdf import page_range, unix_cmd
+        self.assertEqual(page_range({}), (1, None))
+        self.assertEqual(page_range({'max_pages': 3}), (1, 3))
+        self.assertEqual(page_range({'first_page': 2, 'max_pages': 3}),
+                         (2, 4))
+        self.assertEqual(page_range({'last_page': 2, 'max_pages': 3}),
+                         (1, 2))
+        self.assertEqual(unix_cmd('foo.pdf', first_page=2, max_pages=1),
+                         ['pdftotext', '-f', '2', '-l', '2', 'foo.pdf', '-'])
+
+
+class TestResourceLimits(BaseTestCase):
+
+    def make_zip(self, fname, members):
+        import zipfile
+
+        path = self.touch(fname)
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+            for name, data in members:
+                z.writestr(name, data)
+        return path
+
+    def test_bytes(self):
+        from fulltext import Limits, LimitExceeded
+
+        path = self.make_zip('bomb.zip', [('a.txt', b'a ' * 500000)])
+        self.assertLess(os.path.getsize(path), 10000)
+        with self.assertRaises(LimitExceeded) as cm:
+            fulltext.get(path, limits=Limits(max_bytes=100000))
+        self.assertEqual(cm.exception.limit, 'bytes')
+        with self.assertRaises(LimitExceeded):
+            list(fulltext.iter_members(path, limits=Limits(max_bytes=1000),
+                                       workers=2))
+        self.assertEqual(
+            len(fulltext.get(path, limits=Limits(max_bytes=2000000))),
+            999999)
+        # The global default.
+        with mock.patch('fulltext.LIMITS', Limits(max_bytes=1000)):
+            with self.assertRaises(LimitExceeded):
+                fulltext.get(path)
+            self.assertEqual(fulltext.get(path, default=u'x'), u'x')
+
+    def test_members(self):
+        from fulltext import Limits, LimitExceeded
+
+        path = self.make_zip('many.zip', [
+            ('%s.txt' % x, b'foo') for x in range(10)])
+        fulltext.get(path, limits=Limits(max_members=10))
+        for workers in (1, 4):
+            with self.assertRaises(LimitExceeded) as cm:
+                fulltext.get(path, limits=Limits(max_members=9),
+                             kwargs=dict(workers=workers))
+            self.assertEqual(cm.exception.limit, 'members')
+        # Not turned into a member error.
+        with self.assertRaises(LimitExceeded):
+            list(fulltext.iter_members(path, limits=Limits(max_members=3)))
+
+    def test_depth(self):
+        from fulltext import Limits, LimitExceeded
+
+        inner = self.make_zip('inner.zip', [('a.txt', b'hello')])
+        with open(inner, 'rb') as f:
+            outer = self.make_zip('outer.zip', [('inner.zip', f.read())])
+        self.assertEqual(
+            fulltext.get(outer, limits=Limits(max_depth=2)), u'hello')
+        with self.assertRaises(LimitExceeded) as cm:
+            fulltext.get(outer, limits=Limits(max_depth=1))
+        self.assertEqual(cm.exception.limit, 'depth')
+
+    def test_timeout(self):
+        from fulltext import Limits, LimitExceeded
+
+        path = self.make_zip('slow.zip', [
+            ('%s.txt' % x, b'foo') for x in range(10)])
+        with mock.patch('fulltext.limits.timer',
+                        side_effect=itertools.count()):
+            with self.assertRaises(LimitExceeded) as cm:
+                fulltext.get(path, limits=Limits(timeout=3))
+        self.assertEqual(cm.exception.limit, 'timeout')
+
+    def test_no_leak(self):
+        # A suspended get_iter() generator doesn't make other
+        # extractions its members.
+        from fulltext import Limits
+        from fulltext.limits import get_state
+
+        path = self.make_zip('two.zip', [('a.txt', b'foo'), ('b.txt', b'bar')])
+        it = fulltext.get_iter(path, limits=Limits(max_members=2))
+        self.assertEqual(next(it), u'foo')
+        self.assertIsNone(get_state())
+        for x in range(3):
+            fulltext.get(path, limits=Limits(max_members=2))
+        self.assertEqual(u''.join(it), u'bar')
+
+
+class TestCache(BaseTestCase):
+
+    def test_memory(self):
+        from fulltext.cache import MemoryCache
+        cache = MemoryCache()
+        path = pathjoin(HERE, "files/test.txt")
+        self.assertMultiLineEqual(fulltext.get(path, cache=cache), TEXT)
+        with mock.patch('fulltext.handle_path') as m:
+            self.assertMultiLineEqual(fulltext.get(path, cache=cache), TEXT)
+            self.assertFalse(m.called)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+        # Same content, different file object: still a hit.
+        with open(path, 'rb') as f:
+            self.assertMultiLineEqual(
+                fulltext.get(f, backend='txt', cache=cache), TEXT)
+        self.assertEqual(cache.stats()['hits'], 2)
+
+    def test_global(self):
+        from fulltext.cache import MemoryCache
+        path = pathjoin(HERE, "files/test.txt")
+        with mock.patch('fulltext.CACHE', MemoryCache()) as cache:
+            fulltext.get(path)
+            fulltext.get(path)
+            self.assertEqual(cache.hits, 1)
+            fulltext.get(path, cache=False)
+            self.assertEqual(cache.hits, 1)
+
+    def test_key(self):
+        from fulltext.cache import make_key
+        path = pathjoin(HERE, "files/test.txt")
+        key = make_key(path, 'mod', 'utf8', 'strict', {}, False)
+        self.assertEqual(
+            key, make_key(path, 'mod', 'utf8', 'strict', {}, False))
+        self.assertNotEqual(
+            key, make_key(path, 'mod', 'latin1', 'strict', {}, False))
+        self.assertNotEqual(
+            key, make_key(path, 'mod', 'utf8', 'strict', {'x': 1}, False))
+        self.assertNotEqual(
+            key, make_key(path, 'mod2', 'utf8', 'strict', {}, False))
+
+    def test_sqlite(self):
+        from fulltext.cache import SQLiteCache
+        dbpath = tempfile.mktemp(suffix='.sqlite')
+        self.addCleanup(os.remove, dbpath)
+        cache = SQLiteCache(dbpath, max_size=12)
+        self.addCleanup(cache.close)
+        cache.set('a', u'12345', None)
+        cache.set('b', u'6789', u'ti')
+        self.assertEqual(cache.get('a'), (u'12345', None))
+        # Exceeds max size; "b" is the least recently used.
+        cache.set('c', u'abc', None)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), (u'12345', None))
+        self.assertEqual(cache.get('c'), (u'abc', None))
+        stats = cache.stats()
+        self.assertEqual(stats['entries'], 2)
+        self.assertEqual(stats['hits'], 3)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['size'], 8)
+        # Replacing an entry updates the total size.
+        cache.set('c', u'abcd', None)
+        self.assertEqual(cache.stats()['size'], 9)
+        cache.clear()
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_get_many(self):
+        from fulltext.cache import MemoryCache, SQLiteCache
+        paths = [pathjoin(HERE, "files/test.%s" % x) for x in ("txt", "csv")]
+        cache = MemoryCache()
+        with mock.patch('fulltext.LOGGER') as logger:
+            ret = dict(fulltext.get_many(paths, workers=2, cache=cache))
+        self.assertEqual(ret[paths[0]], TEXT)
+        self.assertTrue(logger.warning.called)
+        self.assertEqual(cache.stats()['misses'], 0)
+
+        dbpath = tempfile.mktemp(suffix='.sqlite')
+        self.addCleanup(os.remove, dbpath)
+        cache = SQLiteCache(dbpath)
+        self.addCleanup(cache.close)
+        dict(fulltext.get_many(paths, workers=2, cache=cache))
+        self.assertEqual(cache.stats()['entries'], 2)
+
+    @unittest.skipIf(not PY3, "the futures backport hangs on dead workers")
+    def test_get_many_dead_worker(self):
+        import multiprocessing
+        import time
+        from concurrent.futures.process import BrokenProcessPool
+
+        if multiprocessing.get_start_method() != 'fork':
+            self.skipTest("workers must be forked to inherit the mock")
+
+        def get(path, **kwargs):
+            if path == 'crash':
+                os._exit(1)
+            time.sleep(0.02)
+            return u'text'
+
+        paths = ['crash'] + ['doc%s' % i for i in range(20)]
+        with mock.patch('fulltext.get', side_effect=get):
+            ret = list(fulltext.get_many(paths, workers=2))
+        self.assertEqual(sorted(x[0] for x in ret), sorted(paths))
+        self.assertIsInstance(dict(ret)['crash'], BrokenProcessPool)
+        # Documents in flight with it failed too, the others went
+        # through a new pool.
+        broken = [i for i, (path, text) in enumerate(ret)
+                  if isinstance(text, BrokenProcessPool)]
+        self.assertLess(broken[-1], len(ret) - 1)
+        for path, text in ret[broken[-1] + 1:]:
+            self.assertEqual(text, u'text')
+
 
 class TestGuessingFromFileContent(BaseTestCase):
     """Make sure that when file has no extension its type is guessed
@@ -660,6 +1439,306 @@ class TestGuessingFromFileContent(BaseTestCase):
             klass = m.call_args[0][0]
             self.assertEqual(klass.__module__, 'fulltext.backends.__html')
 
+    @unittest.skipIf(WINDOWS, "not supported on Windows")
+    def test_memoized(self):
+        from fulltext import detect
+        fname = self.touch("file-noext", content=b"<html></html>")
+        detect.clear_cache()
+        with mock.patch('fulltext.detect.mime_from_buffer',
+                        return_value="text/html") as m:
+            for x in range(2):
+                fulltext.backend_from_fname(fname)
+            self.assertEqual(m.call_count, 1)
+            # File changed.
+            with open(fname, "wb") as f:
+                f.write(b"<html>foo</html>")
+            fulltext.backend_from_fname(fname)
+            self.assertEqual(m.call_count, 2)
+
+    @unittest.skipIf(WINDOWS, "not supported on Windows")
+    def test_non_seekable(self):
+        # Header bytes read for guessing the type are not lost.
+        r, w = os.pipe()
+        with os.fdopen(w, "wb") as f:
+            f.write(b"<html><body>hello world</body></html>")
+        with os.fdopen(r, "rb", 0) as f:
+            self.assertEqual(fulltext.get(f), u"hello world")
+
+    @unittest.skipIf(WINDOWS, "not supported on Windows")
+    def test_handle_per_thread(self):
+        import threading
+        from fulltext import detect
+        handles = [detect._handle()]
+        t = threading.Thread(
+            target=lambda: handles.append(detect._handle()))
+        t.start()
+        t.join()
+        self.assertIs(handles[0], detect._handle())
+        self.assertIsNot(handles[0], handles[1])
+
+    def test_peekable(self):
+        from fulltext.detect import Peekable
+        f = Peekable(BytesIO(b"foo\nbar\nbaz"))
+        self.assertEqual(f.peek(5), b"foo\nb")
+        self.assertEqual(f.read(2), b"fo")
+        self.assertEqual(f.readline(), b"o\n")
+        self.assertEqual(list(f), [b"bar\n", b"baz"])
+        self.assertEqual(f.tell(), 11)
+
+
+class TestBench(BaseTestCase):
+
+    def test_corpus(self):
+        from fulltext import bench
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(__import__("shutil").rmtree, tmpdir)
+        kinds = [x for x in bench.GENERATORS if x != "pdf" or which(
+            "pdftotext")]
+        corpus = bench.make_corpus(tmpdir, kinds=kinds, size=2048, count=1)
+        self.assertEqual(corpus, bench.load_corpus(tmpdir))
+        for kind, paths in corpus.items():
+            res = bench.run(paths)
+            self.assertEqual((kind, res["errors"]), (kind, 0))
+            self.assertGreater(res["chars"], 500)
+
+    def test_percentile(self):
+        from fulltext.bench import percentile
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3], 99), 3)
+        self.assertIsNone(percentile([], 50))
+
+
+class TestCrawl(BaseTestCase):
+
+    def setUp(self):
+        import shutil
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        os.mkdir(pathjoin(self.dir, "sub"))
+        for name in ("test.txt", "test.html", "sub/test.csv"):
+            shutil.copy(pathjoin(HERE, "files", os.path.basename(name)),
+                        pathjoin(self.dir, name))
+        statedir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, statedir)
+        self.state_path = pathjoin(statedir, "state.json")
+
+    def crawl(self, workers=1, **kwargs):
+        from fulltext.crawl import crawl, State
+        state = State(self.state_path)
+        ret = sorted(crawl([self.dir], state=state, workers=workers,
+                           **kwargs),
+                     key=lambda x: x["path"])
+        state.save()
+        return ret
+
+    def test_incremental(self):
+        recs = self.crawl()
+        self.assertEqual([os.path.relpath(x["path"], self.dir) for x in recs],
+                         ["sub/test.csv", "test.html", "test.txt"])
+        txt = recs[-1]
+        self.assertEqual(txt["text"], TEXT)
+        self.assertEqual(txt["mime"], "text/plain")
+        self.assertIsNone(txt["error"])
+        self.assertGreater(txt["timings"]["extract"], 0)
+        # Nothing changed.
+        self.assertEqual(self.crawl(), [])
+        # Only mtime changed.
+        os.utime(txt["path"], (0, 0))
+        self.assertEqual(self.crawl(), [])
+        # Content changed, file deleted.
+        with open(txt["path"], "ab") as f:
+            f.write(b" foo")
+        os.remove(recs[0]["path"])
+        recs = self.crawl()
+        self.assertEqual(len(recs), 2)
+        self.assertEqual(recs[0], dict(path=pathjoin(self.dir, "sub",
+                                                     "test.csv"),
+                                       deleted=True))
+        self.assertEqual(recs[1]["text"], TEXT + " foo")
+
+    def test_error(self):
+        with mock.patch("fulltext.get", side_effect=ValueError("foo")):
+            recs = self.crawl()
+        self.assertIn("foo", recs[0]["error"])
+        # Failed files are retried.
+        self.assertEqual(len(self.crawl()), 3)
+
+    @unittest.skipIf(not PY3, "the futures backport hangs on dead workers")
+    def test_dead_worker(self):
+        import multiprocessing
+        if multiprocessing.get_start_method() != 'fork':
+            self.skipTest("workers must be forked to inherit the mock")
+
+        def get(path, **kwargs):
+            if path.endswith('test.txt'):
+                os._exit(1)
+            return u'text'
+
+        with mock.patch("fulltext.get", side_effect=get):
+            recs = self.crawl(workers=2)
+        self.assertEqual(len(recs), 3)
+        self.assertIn("BrokenProcessPool", recs[-1]["error"])
+        # Failed files are retried.
+        recs = self.crawl()
+        self.assertEqual(recs[-1]["text"], TEXT)
+
+    def test_cli(self):
+        out = subprocess.check_output(
+            "%s -m fulltext crawl -j 2 %s" % (sys.executable, self.dir),
+            shell=True)
+        import json
+        recs = [json.loads(x) for x in out.decode().splitlines()]
+        self.assertEqual(len(recs), 3)
+
+
+class TestStats(BaseTestCase):
+
+    def setUp(self):
+        from fulltext import stats
+        self.records = []
+        stats.register_hook(self.records.append)
+        self.addCleanup(stats.unregister_hook, self.records.append)
+
+    def test_record(self):
+        path = pathjoin(HERE, "files/test.html")
+        fulltext.get(path)
+        rec, = self.records
+        self.assertEqual(rec.name, path)
+        self.assertEqual(rec.backend, "fulltext.backends.__html")
+        self.assertEqual(rec.bytes, os.path.getsize(path))
+        self.assertIsNone(rec.error)
+        self.assertGreater(rec.stages["extract"], 0)
+        self.assertLessEqual(sum(rec.stages.values()), rec.elapsed)
+
+    def test_fobj(self):
+        f = self.touch_fobj(content=b"hello world")
+        fulltext.get(f, backend="txt")
+        self.assertEqual(self.records[0].bytes, 11)
+        self.assertFalse(self.records[0].partial)
+
+    def test_partial(self):
+        fulltext.get(BytesIO(b"\xffhello world" * 100), backend="bin",
+                     kwargs={"sample_size": 100})
+        self.assertTrue(self.records[0].partial)
+
+    def test_error(self):
+        fulltext.get("non-existent-file.txt", None)
+        self.assertIn("No such file", self.records[0].error)
+
+    def test_nested(self):
+        from fulltext.stats import record, timed
+        with mock.patch("fulltext.stats.timer",
+                        side_effect=[0, 1, 2, 3, 4, 6, 7, 10]):
+            with record("foo") as rec:
+                with timed("extract"):
+                    with timed("import"):
+                        pass
+                    with timed("import"):
+                        pass
+        self.assertEqual(rec.elapsed, 10)
+        self.assertEqual(rec.stages["import"], 3)
+        self.assertEqual(rec.stages["extract"], 3)
+
+    def test_aggregator(self):
+        from fulltext import stats
+        agg = stats.Aggregator()
+        stats.register_hook(agg)
+        self.addCleanup(stats.unregister_hook, agg)
+        for x in range(2):
+            fulltext.get(pathjoin(HERE, "files/test.txt"))
+        entry = agg.report()["fulltext.backends.__text"]
+        self.assertEqual(entry["count"], 2)
+        self.assertIn("__text", agg.format())
+
+
+@unittest.skipIf(not PY3, "Python 3 only")
+class TestAsync(BaseTestCase):
+
+    def setUp(self):
+        import asyncio
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.addCleanup(asyncio.set_event_loop, None)
+        self.addCleanup(self.loop.close)
+
+    def run_coro(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def future(self, result):
+        fut = self.loop.create_future()
+        fut.set_result(result)
+        return fut
+
+    def test_executor(self):
+        # Pure python backends run in a thread.
+        import asyncio
+        path = pathjoin(HERE, "files/test.html")
+        texts = self.run_coro(asyncio.gather(
+            *[fulltext.aget(path) for x in range(10)]))
+        self.assertEqual(texts, [fulltext.get(path)] * 10)
+
+    def test_default(self):
+        self.assertEqual(self.run_coro(
+            fulltext.aget("non-existent-file.txt", "sentinal")), "sentinal")
+
+    @unittest.skipIf(WINDOWS, "POSIX only")
+    def test_arun(self):
+        from fulltext.aio import arun
+        from fulltext.util import MissingCommandException, ShellError
+        data = b"foo" * 100000
+        out = self.run_coro(arun("cat", stdin=BytesIO(data)))
+        self.assertEqual(out, data)
+        with self.assertRaises(ShellError):
+            self.run_coro(arun("cat", "non-existent-file"))
+        with self.assertRaises(MissingCommandException):
+            self.run_coro(arun("non-existent-cmd"))
+
+    @unittest.skipIf(WINDOWS, "POSIX only")
+    def test_arun_rlimits(self):
+        from fulltext.aio import arun
+        code = "import resource as r; " \
+            "print(r.getrlimit(r.RLIMIT_AS)[0], r.getrlimit(r.RLIMIT_CPU)[0])"
+        out = self.run_coro(arun(sys.executable, '-c', code,
+                                 max_memory=1024 ** 3, max_cpu=30))
+        self.assertEqual(out.split(), [b'1073741824', b'30'])
+        with mock.patch('fulltext.util.MAX_CPU', 20):
+            out = self.run_coro(arun(sys.executable, '-c', code))
+        self.assertEqual(out.split()[1], b'20')
+
+    def test_document_timeout(self):
+        # The time left to the document caps CLI tools.
+        from fulltext import Limits, LimitExceeded
+        from fulltext import aio
+        path = pathjoin(HERE, "files/test.ps")
+        self.addCleanup(fulltext.invalidate_backend_cache)
+        fulltext.invalidate_backend_cache()
+
+        def sleep(*args, **kwargs):
+            return arun(sys.executable, '-c', 'import time; time.sleep(10)')
+
+        arun = aio.arun
+        with mock.patch("fulltext.backends.__ps.Backend.check"):
+            with mock.patch("fulltext.aio.arun", new=sleep):
+                with self.assertRaises(LimitExceeded):
+                    self.run_coro(fulltext.aget(
+                        path, cache=False, limits=Limits(timeout=0.2)))
+
+    def test_cli_backend(self):
+        # CLI backends go through arun(), not through a thread.
+        path = pathjoin(HERE, "files/test.ps")
+        self.addCleanup(fulltext.invalidate_backend_cache)
+        fulltext.invalidate_backend_cache()
+        with mock.patch("fulltext.backends.__ps.Backend.check"):
+            m = mock.Mock(return_value=self.future(b" foo   bar "))
+            with mock.patch("fulltext.aio.arun", m):
+                with mock.patch("fulltext.get") as get:
+                    text = self.run_coro(fulltext.aget(path))
+        self.assertEqual(text, u"foo bar")
+        m.assert_called_once_with("pstotext", path)
+        self.assertFalse(get.called)
+
 
 class TestUtils(BaseTestCase):
 
@@ -671,6 +1750,186 @@ class TestUtils(BaseTestCase):
             assert not is_file_path(f)
 
 
+class TestRun(BaseTestCase):
+
+    def test_run(self):
+        from fulltext.util import run
+        self.assertEqual(
+            run(sys.executable, '-c', 'print("foo")').strip(), b'foo')
+
+    def test_shell_error(self):
+        from fulltext.util import run, ShellError
+        with self.assertRaises(ShellError) as cm:
+            run(sys.executable, '-c', 'import sys; sys.exit(3)')
+        self.assertEqual(cm.exception.exit_code, 3)
+
+    def test_run_iter(self):
+        from fulltext.util import run_iter, ShellError
+        code = "import sys\nfor i in range(3):\n" \
+            "    sys.stdout.write('x' * 10000); sys.stdout.flush()"
+        chunks = list(run_iter(sys.executable, '-c', code, bufsize=4096))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks), b'x' * 30000)
+        with self.assertRaises(ShellError) as cm:
+            list(run_iter(sys.executable, '-c',
+                          'import sys; sys.exit("error")'))
+        self.assertEqual(cm.exception.stderr.strip(), b'error')
+
+    def test_run_iter_close(self):
+        # Stopping early kills the tool.
+        from fulltext.compat import timer
+        from fulltext.util import run_iter
+        code = "import sys, time\nfor i in range(1000):\n" \
+            "    sys.stdout.write('x'); sys.stdout.flush(); time.sleep(.01)"
+        started = timer()
+        it = run_iter(sys.executable, '-c', code)
+        self.assertTrue(next(it))
+        it.close()
+        self.assertLess(timer() - started, 5)
+
+    def test_max_chars_title(self):
+        # The tool truncated by max_chars frees its slot before the
+        # title is extracted via another tool.
+        import threading
+        import types
+        from fulltext import util
+        from fulltext.util import BaseBackend
+        self.addCleanup(util.set_max_children, util.MAX_CHILDREN)
+        util.set_max_children(1)
+        code = "import sys\nfor i in range(100000): print('foo bar')"
+
+        class Backend(BaseBackend):
+
+            def iter_path(self, path):
+                return self.decode_iter(util.run_iter(
+                    sys.executable, '-c', code))
+
+            def handle_title(self, path):
+                return self.decode(util.run(
+                    sys.executable, '-c', 'print("title")')).strip()
+
+        mod = types.ModuleType('fake_backend')
+        mod.Backend = Backend
+        fname = self.touch('testfn.txt')
+        ret = []
+        t = threading.Thread(target=lambda: ret.append(
+            fulltext.get_with_title(fname, backend=mod,
+                                    kwargs={'max_chars': 20})))
+        t.daemon = True
+        t.start()
+        t.join(10)
+        self.assertEqual(ret, [(u'foo bar foo bar foo', u'title')])
+
+    def test_stdin(self):
+        from fulltext.util import run, run_iter
+        cat = (sys.executable, '-c',
+               'import shutil, sys; shutil.copyfileobj('
+               'getattr(sys.stdin, "buffer", sys.stdin), '
+               'getattr(sys.stdout, "buffer", sys.stdout))')
+        data = b'0123456789' * 100000
+        # No fd: fed from a thread.
+        self.assertEqual(run(*cat, stdin=BytesIO(data)), data)
+        self.assertEqual(
+            b''.join(run_iter(*cat, stdin=BytesIO(data))), data)
+        # A real file read ahead by its buffer: the tool starts at
+        # tell() and the file object is left where it was.
+        fname = self.touch(pathjoin(tempfile.gettempdir(), 'fulltext.dat'),
+                           b'HEAD' + data)
+        f = open(fname, 'rb')
+        self.addCleanup(f.close)
+        f.read(4)
+        self.assertEqual(run(*cat, stdin=f), data)
+        self.assertEqual(f.tell(), 4)
+        self.assertEqual(f.read(4), b'0123')
+
+    def test_stdin_error(self):
+        # Errors reading the input are raised instead of the tool's.
+        from fulltext.util import run
+
+        class Corrupted(BytesIO):
+            def read(self, size=-1):
+                raise ValueError("corrupted")
+
+        with self.assertRaises(ValueError):
+            run(sys.executable, '-c', 'import sys; sys.stdin.read()',
+                stdin=Corrupted())
+
+    def test_decode_iter(self):
+        from fulltext.util import BaseBackend
+        inst = BaseBackend('utf8', 'strict', {})
+        data = u'\u20ac uro'.encode('utf8')
+        chunks = [data[i:i + 1] for i in range(len(data))]
+        self.assertEqual(u''.join(inst.decode_iter(chunks)), u'\u20ac uro')
+
+    def test_timeout(self):
+        from fulltext.util import run, ShellError, ShellTimeoutError
+        sleep = (sys.executable, '-c', 'import time; time.sleep(10)')
+        with self.assertRaises(ShellTimeoutError) as cm:
+            run(*sleep, timeout=0.1)
+        self.assertIsInstance(cm.exception, ShellError)
+        self.assertEqual(cm.exception.timeout, 0.1)
+        self.assertIn("timed out", str(cm.exception))
+        with mock.patch('fulltext.util.TIMEOUT', 0.1):
+            with self.assertRaises(ShellTimeoutError):
+                run(*sleep)
+            # The smallest one wins.
+            with self.assertRaises(ShellTimeoutError):
+                run(*sleep, timeout=60)
+
+    def test_document_timeout(self):
+        # The time left to the document caps CLI tools.
+        from fulltext import Limits, LimitExceeded
+        from fulltext.limits import new_state, use_state
+        from fulltext.util import run
+        with use_state(new_state(Limits(timeout=0.2))):
+            with self.assertRaises(LimitExceeded):
+                run(sys.executable, '-c', 'import time; time.sleep(10)')
+
+    @unittest.skipIf(WINDOWS, "POSIX only")
+    def test_rlimits(self):
+        from fulltext.util import run
+        code = "import resource as r; " \
+            "print(r.getrlimit(r.RLIMIT_AS)[0], r.getrlimit(r.RLIMIT_CPU)[0])"
+        out = run(sys.executable, '-c', code, max_memory=1024 ** 3,
+                  max_cpu=30)
+        self.assertEqual(out.split(), [b'1073741824', b'30'])
+
+    def test_max_children(self):
+        from fulltext import util
+        orig = util.MAX_CHILDREN
+        self.addCleanup(util.set_max_children, orig)
+        util.set_max_children(1)
+        self.assertEqual(util.MAX_CHILDREN, 1)
+        # The only slot is taken while the command is running.
+        with mock.patch('fulltext.util._run', side_effect=lambda *a, **kw:
+                        util._children_sem.acquire(False)):
+            self.assertFalse(util.run('foo'))
+        self.assertTrue(util._children_sem.acquire(False))
+        util._children_sem.release()
+
+    def test_server(self):
+        from fulltext.util import Server
+        procs = []
+
+        def start():
+            procs.append(mock.Mock(alive=True))
+            return procs[-1]
+
+        server = Server('test', start, lambda p: p.terminate(),
+                        is_alive=lambda p: p.alive)
+        self.assertEqual(procs, [])  # lazily started
+        with server.use() as p1:
+            pass
+        with server.use() as p2:
+            self.assertIs(p1, p2)
+        p2.alive = False
+        with server.use() as p3:
+            self.assertIsNot(p3, p2)
+        server.stop()
+        p3.terminate.assert_called_once_with()
+        self.assertEqual(len(procs), 2)
+
+
 # ===================================================================
 # --- Encodings
 # ===================================================================
@@ -1,32 +1,68 @@
 from __future__ import print_function
+import codecs
+import collections
 import contextlib
 import atexit
 import errno
+import io
+import itertools
 import logging
 import os
-import subprocess
 import warnings
 import sys
 import functools
 import tempfile
+import threading
 import shutil
 
 from os.path import join as pathjoin
 
 import six
 from six import PY3
-try:
-    import exiftool
-except ImportError:
-    exiftool = None
 
 from fulltext.compat import which
+from fulltext.compat import cpu_count
+from fulltext.compat import LINUX
+from fulltext.compat import POSIX
+from fulltext import limits
 
 
 LOGGER = logging.getLogger(__file__)
 LOGGER.addHandler(logging.NullHandler())
 TEMPDIR = os.environ.get('FULLTEXT_TEMP', tempfile.gettempdir())
+# A memory-backed (tmpfs) dir used for small temporary files, unless
+# a temp dir was explicitly set via FULLTEXT_TEMP.
+SHMDIR = None
+if LINUX and 'FULLTEXT_TEMP' not in os.environ and \
+        os.access('/dev/shm', os.W_OK):
+    SHMDIR = '/dev/shm'
+# File objects bigger than this are spilled to TEMPDIR instead of SHMDIR.
+SHM_MAX_SIZE = 64 * 1024 * 1024
+# Max bytes of archive members held in memory while waiting to be
+# extracted in parallel (see fulltext.extract_members()). Members which
+# don't fit are buffered in a temporary file instead.
+MAX_INFLIGHT_BYTES = 64 * 1024 * 1024
+# Size of the chunks read from CLI tools' stdout by run_iter().
+BUFFER_MAX = 64 * 1024
 HERE = os.path.abspath(os.path.dirname(__file__))
+# Max number of CLI tools which are allowed to run at the same time
+# (per process). Change it with set_max_children().
+MAX_CHILDREN = int(os.environ.get('FULLTEXT_MAX_CHILDREN', 0)) or \
+    cpu_count() or 1
+_children_sem = threading.BoundedSemaphore(MAX_CHILDREN)
+# Max seconds a CLI tool may run before being killed (None = forever).
+# The timeout of the document being extracted, if any, applies as well
+# (see fulltext.limits).
+TIMEOUT = float(os.environ.get('FULLTEXT_TIMEOUT', 0)) or None
+# Max address space (bytes) and CPU time (seconds) of CLI tools
+# (POSIX only).
+MAX_MEMORY = int(os.environ.get('FULLTEXT_MAX_MEMORY', 0)) or None
+MAX_CPU = int(os.environ.get('FULLTEXT_MAX_CPU', 0)) or None
+# File objects which CLI tools can read from directly via their fd.
+# Others (BytesIO, zip members, GzipFile, ...) are fed through a pipe.
+_FD_TYPES = (io.FileIO, io.BufferedReader, io.BufferedRandom)
+if not PY3:
+    _FD_TYPES += (file, )  # NOQA
 
 
 class BackendError(AssertionError):
@@ -46,6 +82,9 @@ class CommandLineError(Exception):
 class MissingCommandException(CommandLineError):
 
     def __init__(self, cmd, msg=""):
+        # Pass args up so that instances survive pickling (e.g. when
+        # raised in a get_many() worker process).
+        super(MissingCommandException, self).__init__(cmd, msg)
         self.cmd = cmd
         self.msg = msg
 
@@ -62,6 +101,7 @@ class ShellError(CommandLineError):
     """
 
     def __init__(self, command, exit_code, stdout, stderr):
+        super(ShellError, self).__init__(command, exit_code, stdout, stderr)
         self.command = command
         self.exit_code = exit_code
         self.stdout = stdout
@@ -81,15 +121,230 @@ class ShellError(CommandLineError):
         return self.failed_message()
 
 
+class ShellTimeoutError(ShellError):
+    """Raised when a CLI tool is killed because it ran longer than its
+    timeout.
+    """
+
+    def __init__(self, command, exit_code, stdout, stderr, timeout=None):
+        super(ShellTimeoutError, self).__init__(
+            command, exit_code, stdout, stderr)
+        self.args += (timeout, )
+        self.timeout = timeout
+
+    def failed_message(self):
+        return "The command `%(command)s` timed out after %(timeout)ss" % (
+            vars(self))
+
+
+def set_max_children(num):
+    """Set the max number of CLI tools which are allowed to run at the
+    same time. Calls to run() exceeding it will wait for a slot.
+    """
+    global MAX_CHILDREN, _children_sem
+    MAX_CHILDREN = num
+    _children_sem = threading.BoundedSemaphore(num)
+
+
 def run(*cmd, **kwargs):
-    stdin = kwargs.get('stdin', None)
+    """Run a CLI tool and return its stdout. Raise ShellError if it
+    fails. Accepted kwargs:
+     * stdin: a binary file object to use as stdin; if it's not a
+       regular file (e.g. an archive member) it's fed to the tool
+       from a thread
+     * timeout: kill the tool after these seconds and raise
+       ShellTimeoutError; defaults to TIMEOUT
+     * max_memory, max_cpu: limit the address space (bytes) and the CPU
+       time (seconds) of the tool; default to MAX_MEMORY and MAX_CPU
+    """
+    with _children_sem:
+        return _run(*cmd, **kwargs)
+
+
+def get_timeout(timeout=None):
+    """Return the timeout of a CLI tool: the smallest one among
+    `timeout`, TIMEOUT and the time left to the document being
+    extracted.
+    """
+    timeouts = [x for x in (timeout, TIMEOUT, limits.remaining())
+                if x is not None]
+    return min(timeouts) if timeouts else None
+
+
+def _popen_kwargs(new_session, max_memory, max_cpu):
+    """Popen() kwargs starting the child in its own process group (so
+    that it can be killed along with its children) and setting its
+    resource limits.
+    """
+    if not POSIX or not (new_session or max_memory or max_cpu):
+        return {}
+    if not (max_memory or max_cpu):
+        if PY3:
+            return dict(start_new_session=True)
+        return dict(preexec_fn=os.setsid)
+
+    import resource
+
+    def preexec():
+        # Runs in the child, between fork() and exec().
+        os.setsid()
+        if max_memory:
+            resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
+        if max_cpu:
+            resource.setrlimit(resource.RLIMIT_CPU, (max_cpu, max_cpu))
+
+    return dict(preexec_fn=preexec)
+
+
+def _kill(proc, group):
+    """Kill a process, and all of its process group if `group`."""
+    try:
+        if group:
+            import signal
+
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except OSError:  # already gone
+        pass
+
+
+def check_output(cmd, returncode, stdout, stderr):
+    """Warn about stderr and raise ShellError on failure, else return
+    stdout.
+    """
+    if stderr:
+        if PY3:
+            warn(stderr.decode(sys.getfilesystemencoding(), "ignore"))
+        else:
+            warn(stderr)
+
+    # if pipe is busted, raise an error (unlike Fabric)
+    if returncode != 0:
+        raise ShellError(' '.join(cmd), returncode, stdout, stderr)
+
+    return stdout
+
+
+class _FdStdin(object):
+    """A regular file passed to a CLI tool as stdin via its fd. Has
+    the same interface as _StdinFeeder.
+    """
+
+    def __init__(self, f):
+        self.fd = f.fileno()
+        # Buffered file objects read ahead: the tool must start where
+        # the file object is, not where the fd is. The fd is shared,
+        # so put it back when done, else the file object's position
+        # would be off.
+        self.offset = f.tell()
+        self.orig_offset = os.lseek(self.fd, 0, os.SEEK_CUR)
+
+    def start(self):
+        os.lseek(self.fd, self.offset, os.SEEK_SET)
+
+    def join(self):
+        os.lseek(self.fd, self.orig_offset, os.SEEK_SET)
+
+    def check(self):
+        pass
+
+
+def _fd_stdin(f):
+    """Return an _FdStdin if a CLI tool can read file object `f` via
+    its fd, None if it must be fed through a pipe.
+    """
+    if not isinstance(f, _FD_TYPES):
+        # Note: some file objects have a fileno() which is not theirs
+        # (GzipFile returns the one of the compressed file).
+        return None
+    try:
+        return _FdStdin(f)
+    except (IOError, OSError, ValueError):
+        # E.g. a pipe, which can't seek.
+        return None
+
+
+class _StdinFeeder(threading.Thread):
+    """Copy a file object into the stdin of a CLI tool while the
+    caller reads its stdout, holding no more than BUFFER_MAX bytes in
+    memory. If reading the file object fails the tool is killed and
+    the error is re-raised by check().
+    """
+
+    def __init__(self, f, pipe, group):
+        super(_StdinFeeder, self).__init__(name="fulltext-stdin")
+        self.daemon = True
+        self.f = f
+        self.pipe = pipe
+        self.group = group
+        self.stdin = pipe.stdin
+        # Take it away from the Popen instance: communicate() would
+        # close it.
+        pipe.stdin = None
+        self.exc_info = None
+
+    def run(self):
+        try:
+            while True:
+                chunk = self.f.read(BUFFER_MAX)
+                if not chunk:
+                    break
+                try:
+                    self.stdin.write(chunk)
+                except (IOError, OSError) as err:
+                    # EINVAL on Windows.
+                    if err.errno not in (errno.EPIPE, errno.EINVAL):
+                        raise
+                    # The tool exited without reading all of its input;
+                    # its exit code tells whether that's an error.
+                    break
+        except BaseException:
+            # E.g. a corrupted archive member or LimitExceeded.
+            self.exc_info = sys.exc_info()
+            _kill(self.pipe, self.group)
+        finally:
+            try:
+                self.stdin.close()
+            except (IOError, OSError):
+                pass
+
+    def check(self):
+        if self.exc_info is not None:
+            six.reraise(*self.exc_info)
+
+
+def _popen(cmd, stdin, kwargs):
+    """Start a CLI tool, return (Popen instance, timeout, whether it
+    runs in its own process group, _StdinFeeder/_FdStdin or None).
+    """
+    import subprocess  # slow to import and not needed by all backends
+
+    timeout = get_timeout(kwargs.get('timeout', None))
+    max_memory = kwargs.get('max_memory', MAX_MEMORY)
+    max_cpu = kwargs.get('max_cpu', MAX_CPU)
+    popen_kw = _popen_kwargs(timeout is not None, max_memory, max_cpu)
+    feeder = None
+    if stdin is not None:
+        feeder = _fd_stdin(stdin)
+        if feeder is not None:
+            feeder.start()
+            stdin = feeder.fd
+        else:
+            src, stdin = stdin, subprocess.PIPE
     # run a subprocess and put the stdout and stderr on the pipe object
     try:
-        pipe = subprocess.Popen(
-            cmd,
-            stdin=stdin,
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-        )
+        try:
+            pipe = subprocess.Popen(
+                cmd,
+                stdin=stdin,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                **popen_kw
+            )
+        except BaseException:
+            if feeder is not None:
+                feeder.join()  # restore the fd offset
+            raise
     except IOError as e:
         if e.errno == errno.ENOENT:
             raise MissingCommandException(cmd[0])
@@ -99,33 +354,130 @@ def run(*cmd, **kwargs):
             # File not found.
             # This is equivalent to getting exitcode 127 from sh
             raise MissingCommandException(cmd[0])
+        raise
+    if stdin is subprocess.PIPE:
+        feeder = _StdinFeeder(src, pipe, bool(popen_kw))
+        feeder.start()
+    return (pipe, timeout, bool(popen_kw), feeder)
 
+
+def _start_timer(pipe, timeout, group):
+    """Kill `pipe` after `timeout` seconds. Return the Timer (None if
+    there's no timeout) and a list which is non-empty if it fired.
+    """
+    # communicate() has no timeout on Python 2; use a timer thread.
+    timed_out = []
+    if timeout is None:
+        return (None, timed_out)
+
+    def on_timeout():
+        timed_out.append(True)
+        _kill(pipe, group)
+
+    timer = threading.Timer(timeout, on_timeout)
+    timer.daemon = True
+    timer.start()
+    return (timer, timed_out)
+
+
+def _close_pipes(pipe):
+    if pipe.stdout:
+        pipe.stdout.close()
+    if pipe.stderr:
+        pipe.stderr.close()
+    try:  # Flushing a BufferedWriter may raise an error
+        if pipe.stdin:
+            pipe.stdin.close()
+    finally:
+        # Wait for the process to terminate, to avoid zombies.
+        pipe.wait()
+
+
+def _run(*cmd, **kwargs):
+    pipe, timeout, group, feeder = _popen(
+        cmd, kwargs.get('stdin', None), kwargs)
+    timer, timed_out = _start_timer(pipe, timeout, group)
     try:
         # pipe.wait() ends up hanging on large files. using
         # pipe.communicate appears to avoid this issue
-        stdout, stderr = pipe.communicate()
-        if stderr:
-            if PY3:
-                warn(stderr.decode(sys.getfilesystemencoding(), "ignore"))
-            else:
-                warn(stderr)
-
-        # if pipe is busted, raise an error (unlike Fabric)
-        if pipe.returncode != 0:
-            raise ShellError(' '.join(cmd), pipe.returncode, stdout, stderr)
-
-        return stdout
-    finally:
-        if pipe.stdout:
-            pipe.stdout.close()
-        if pipe.stderr:
-            pipe.stderr.close()
-        try:  # Flushing a BufferedWriter may raise an error
-            if pipe.stdin:
-                pipe.stdin.close()
+        try:
+            stdout, stderr = pipe.communicate()
+        except BaseException:
+            # E.g. KeyboardInterrupt: don't wait for the tool to finish.
+            _kill(pipe, group)
+            raise
         finally:
-            # Wait for the process to terminate, to avoid zombies.
+            if timer is not None:
+                timer.cancel()
+            if feeder is not None:
+                feeder.join()
+        if feeder is not None:
+            # The input failing is the cause of the tool failing.
+            feeder.check()
+        if timed_out:
+            # If it's the document which ran out of time say so.
+            limits.check_time()
+            raise ShellTimeoutError(' '.join(cmd), pipe.returncode,
+                                    stdout, stderr, timeout=timeout)
+        return check_output(cmd, pipe.returncode, stdout, stderr)
+    finally:
+        _close_pipes(pipe)
+
+
+def run_iter(*cmd, **kwargs):
+    """Like run() but yield stdout in chunks (of at most `bufsize`
+    bytes, default BUFFER_MAX) as soon as the tool writes them, so that
+    its output is never held in memory all at once. ShellError is
+    raised once the tool exits; its `stdout` is empty. Closing the
+    generator early kills the tool.
+    """
+    with _children_sem:
+        for chunk in _run_iter(*cmd, **kwargs):
+            yield chunk
+
+
+def _run_iter(*cmd, **kwargs):
+    bufsize = kwargs.get('bufsize', BUFFER_MAX)
+    pipe, timeout, group, feeder = _popen(
+        cmd, kwargs.get('stdin', None), kwargs)
+    timer, timed_out = _start_timer(pipe, timeout, group)
+    # Drain stderr in a thread, else the tool may block writing to it
+    # while we wait for stdout.
+    stderr = []
+    t = threading.Thread(target=lambda: stderr.append(pipe.stderr.read()))
+    t.daemon = True
+    t.start()
+    try:
+        try:
+            fd = pipe.stdout.fileno()
+            while True:
+                # Unlike file.read(), os.read() returns what's
+                # available without waiting for `bufsize` bytes.
+                chunk = os.read(fd, bufsize)
+                if not chunk:
+                    break
+                yield chunk
             pipe.wait()
+            t.join()
+        except BaseException:
+            # Including GeneratorExit: the consumer had enough.
+            _kill(pipe, group)
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if feeder is not None:
+                feeder.join()
+    finally:
+        _close_pipes(pipe)
+    if feeder is not None:
+        feeder.check()
+    stderr = stderr[0] if stderr else b''
+    if timed_out:
+        limits.check_time()
+        raise ShellTimeoutError(' '.join(cmd), pipe.returncode, b'',
+                                stderr, timeout=timeout)
+    check_output(cmd, pipe.returncode, b'', stderr)
 
 
 def warn(msg):
@@ -167,11 +519,7 @@ def assert_cmd_exists(cmd):
         raise MissingCommandException(cmd)
 
 
-if not is_windows():
-    # On linux things are simpler. Linter disabled for next line since we
-    # import here for export.
-    import magic  # NOQA
-else:
+if is_windows():
     def _set_binpath():
         # Help the magic wrapper locate magic1.dll, we include it in
         # bin/bin{32,64}.
@@ -185,25 +533,29 @@ else:
 
     _set_binpath()
 
-    def _import_magic():
-        # Instantiate our own Magic instance so we can tell it where the
-        # magic file lives.
-        from magic import Magic as _Magic
 
-        class Magic(_Magic):
-            # Overridden because differently from the UNIX version
-            # the Windows version does not provide mime kwarg.
-            def from_file(self, filename, mime=True):
-                return _Magic.from_file(self, filename)
+def _import_magic():
+    if not is_windows():
+        # On linux things are simpler.
+        import magic
+        return magic
+
+    # Instantiate our own Magic instance so we can tell it where the
+    # magic file lives.
+    from magic import Magic as _Magic
 
-            def from_buffer(self, buf, mime=True):
-                return _Magic.from_buffer(self, buf)
+    class Magic(_Magic):
+        # Overridden because differently from the UNIX version
+        # the Windows version does not provide mime kwarg.
+        def from_file(self, filename, mime=True):
+            return _Magic.from_file(self, filename)
 
-        path = pathjoin(get_data_dir(), 'magic')
-        assert os.path.isfile(path), path
-        return Magic(mime=True, magic_file=path)
+        def from_buffer(self, buf, mime=True):
+            return _Magic.from_buffer(self, buf)
 
-    magic = _import_magic()
+    path = pathjoin(get_data_dir(), 'magic')
+    assert os.path.isfile(path), path
+    return Magic(mime=True, magic_file=path)
 
 
 def memoize(fun):
@@ -251,6 +603,48 @@ def term_supports_colors():
         return True
 
 
+# =====================================================================
+# --- lazily imported libs
+# =====================================================================
+
+
+@memoize
+def get_magic():
+    """Return the magic module (a Magic instance on Windows), or None
+    if it's not installed. Importing it loads libmagic, so this is
+    done on first use rather than on `import fulltext`.
+    """
+    try:
+        return _import_magic()
+    except ImportError:
+        return None
+
+
+@memoize
+def get_exiftool():
+    """Return the exiftool module, or None if it's not installed."""
+    try:
+        import exiftool
+    except ImportError:
+        return None
+    return exiftool
+
+
+_LAZY_ATTRS = {'magic': get_magic, 'exiftool': get_exiftool}
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        # PEP 562: resolve `util.magic` and `util.exiftool` on access.
+        try:
+            return _LAZY_ATTRS[name]()
+        except KeyError:
+            raise AttributeError(
+                "module %r has no attribute %r" % (__name__, name))
+else:
+    magic = get_magic()
+    exiftool = get_exiftool()
+
+
 def hilite(s, ok=True, bold=False):
     """Return an highlighted version of 'string'."""
     if not term_supports_colors():
@@ -304,48 +698,263 @@ def memoize(fun):
     return wrapper
 
 
+# Number of bytes written in temp files by fobj_to_tempfile(), by label
+# (usually the backend module name).
+_spilled = collections.Counter()
+
+
+def spilled_bytes():
+    """Return a {label: bytes} dict telling how much data was copied
+    into temporary files because a backend needed a path.
+    """
+    return dict(_spilled)
+
+
 @contextlib.contextmanager
-def fobj_to_tempfile(f, suffix=''):
-    """Context manager which copies a file object to disk and return its
-    name. When done the file is deleted.
+def fobj_to_tempfile(f, suffix='', label=None):
+    """Context manager which copies a file object to a temporary file
+    and return its name. When done the file is deleted.
+    Small files are written to a memory-backed dir (SHMDIR) if
+    available, else to disk.
     """
-    with tempfile.NamedTemporaryFile(
-            dir=TEMPDIR, suffix=suffix, delete=False) as t:
-        shutil.copyfileobj(f, t)
+    size, dirname = 0, SHMDIR or TEMPDIR
+    t = tempfile.NamedTemporaryFile(dir=dirname, suffix=suffix, delete=False)
     try:
+        try:
+            while True:
+                chunk = f.read(1024 * 1024)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if dirname != TEMPDIR and size > SHM_MAX_SIZE:
+                    # Too big for memory; move what we have on disk.
+                    LOGGER.debug("moving %s to %s" % (t.name, TEMPDIR))
+                    dirname, shm = TEMPDIR, t
+                    t = tempfile.NamedTemporaryFile(
+                        dir=dirname, suffix=suffix, delete=False)
+                    try:
+                        shm.seek(0)
+                        shutil.copyfileobj(shm, t)
+                    finally:
+                        shm.close()
+                        os.remove(shm.name)
+                t.write(chunk)
+        finally:
+            t.close()
+        _spilled[label] += size
         yield t.name
     finally:
         os.remove(t.name)
 
 
-if exiftool is not None:
-    _et = exiftool.ExifTool()
-    _et.start()
+# =====================================================================
+# --- parallel extraction
+# =====================================================================
 
-    @atexit.register
-    def _close_et():
-        LOGGER.debug("terminating exiftool subprocess")
-        _et.terminate()
 
-    def exiftool_title(path, encoding, encoding_error):
-        if is_file_path(path):
-            title = (_et.get_tag("title", path) or "").strip()
-            if title:
-                if hasattr(title, "decode"):  # PY2
-                    return title.decode(encoding, encoding_error)
-                else:
-                    return title
+def imap_ordered(fun, items, workers):
+    """Like `map(fun, items)` but call `fun` in a pool of `workers`
+    threads. Results are yielded in the same order as `items`. `items`
+    is consumed lazily: no more than `workers * 2` of them are in flight
+    at any time.
+    """
+    from concurrent.futures import ThreadPoolExecutor
 
-else:
+    items = iter(items)
+    pending = collections.deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            while True:
+                while len(pending) < workers * 2:
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        break
+                    pending.append(executor.submit(fun, item))
+                if not pending:
+                    break
+                yield pending.popleft().result()
+        finally:
+            # On error or if the caller stopped iterating.
+            for fut in pending:
+                fut.cancel()
+
+
+def imap_processes(fun, jobs, workers):
+    """Call `fun(*args)` in a pool of `workers` processes for each
+    `(key, args)` tuple of `jobs` and yield `(key, result)` tuples in
+    completion order. `jobs` is consumed lazily, as in `imap_ordered()`.
+    If a worker dies (e.g. killed by the OOM killer) the pool can't be
+    used anymore: `result` is then the BrokenProcessPool exception for
+    the jobs which were in flight, and a new pool is started for the
+    remaining ones.
+    """
+    from concurrent.futures import Future
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures import FIRST_COMPLETED
+    from concurrent.futures import wait
+    try:
+        from concurrent.futures.process import BrokenProcessPool
+    except ImportError:
+        # Python 2 "futures" backport, whose pools don't notice dead
+        # workers: catch nothing.
+        BrokenProcessPool = ()
+
+    def collect(done):
+        """Return the (key, result) tuples of `done` futures and whether
+        the pool broke.
+        """
+        results, broken = [], False
+        for fut in done:
+            try:
+                result = fut.result()
+            except BrokenProcessPool as err:
+                result = err
+                broken = True
+            results.append((pending.pop(fut), result))
+        return results, broken
+
+    jobs = iter(jobs)
+    pending = {}
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            for key, args in itertools.islice(
+                    jobs, workers * 2 - len(pending)):
+                try:
+                    fut = executor.submit(fun, *args)
+                except BrokenProcessPool as err:
+                    # A worker died since the last wait().
+                    fut = Future()
+                    fut.set_exception(err)
+                pending[fut] = key
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            results, broken = collect(done)
+            if broken:
+                # The other jobs in flight are lost with the pool.
+                results.extend(collect(wait(pending)[0])[0])
+            for ret in results:
+                yield ret
+            if broken:
+                LOGGER.warning("a worker process died; restarting the pool")
+                executor.shutdown()
+                executor = ProcessPoolExecutor(max_workers=workers)
+    finally:
+        # On error or if the caller stopped iterating.
+        for fut in pending:
+            fut.cancel()
+        executor.shutdown()
+
+
+# =====================================================================
+# --- persistent helper processes
+# =====================================================================
+
+
+class Server(object):
+    """A long running helper process (e.g. `exiftool -stay_open`)
+    which is shared across calls in order to pay its startup cost only
+    once. It is started on first use, restarted if it dies and
+    terminated at exit. Access is serialized since these tools talk
+    over a single stdin/stdout pair.
+    """
+
+    def __init__(self, name, start, stop, is_alive=None):
+        self.name = name
+        self._start = start
+        self._stop = stop
+        self._is_alive = is_alive
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "<%s(%r, running=%s)>" % (
+            self.__class__.__name__, self.name, self._proc is not None)
+
+    @contextlib.contextmanager
+    def use(self):
+        """Context manager returning the (running) process object."""
+        with self._lock:
+            if self._proc is not None and self._is_alive is not None:
+                if not self._is_alive(self._proc):
+                    LOGGER.warning("%s server died; restarting" % self.name)
+                    self._proc = None
+            if self._proc is None:
+                LOGGER.debug("starting %s server" % self.name)
+                self._proc = self._start()
+            yield self._proc
+
+    def stop(self):
+        with self._lock:
+            if self._proc is not None:
+                LOGGER.debug("terminating %s server" % self.name)
+                try:
+                    self._stop(self._proc)
+                finally:
+                    self._proc = None
+
+
+_SERVERS = {}
+
+
+def register_server(name, start, stop, is_alive=None):
+    """Register a persistent helper process. `start` is a function
+    returning a process object, `stop` a function terminating it
+    and `is_alive` a function telling whether it's still usable.
+    """
+    _SERVERS[name] = Server(name, start, stop, is_alive)
+    return _SERVERS[name]
+
+
+def get_server(name):
+    return _SERVERS[name]
+
+
+@atexit.register
+def stop_servers():
+    """Terminate all persistent helper processes."""
+    for server in _SERVERS.values():
+        try:
+            server.stop()
+        except Exception:
+            LOGGER.exception("error while stopping %r" % server)
+
+
+def _start_et():
+    et = get_exiftool().ExifTool()
+    et.start()
+    return et
+
+
+register_server(
+    "exiftool", _start_et, lambda et: et.terminate(),
+    is_alive=lambda et: et.running)
+
+
+def exiftool_title(path, encoding, encoding_error):
     # TODO: according to https://www.sno.phy.queensu.ca/~phil/exiftool/
     # exiftool is also available on Windows
-    def exiftool_title(*a, **kw):
+    if get_exiftool() is None or not is_file_path(path):
         return None
+    with get_server("exiftool").use() as et:
+        title = (et.get_tag("title", path) or "").strip()
+    if title:
+        if hasattr(title, "decode"):  # PY2
+            return title.decode(encoding, encoding_error)
+        else:
+            return title
 
 
 class BaseBackend(object):
     """Base class for defining custom backend classes."""
 
+    # Set to True if the text returned by handle_ and iter_ methods is
+    # already normalized (see fulltext.normalize), e.g. because it's
+    # made of the output of fulltext.get().
+    normalized = False
+
     def __init__(self, encoding, encoding_errors, kwargs):
         """These are the same args passed to get() function."""
         self.encoding = encoding
@@ -375,6 +984,21 @@ class BaseBackend(object):
         """Decode string."""
         return s.decode(self.encoding, self.encoding_errors)
 
+    def decode_iter(self, chunks):
+        """Decode an iterable of bytes chunks (e.g. as returned by
+        run_iter()), yielding text. Multibyte chars split across chunks
+        are handled.
+        """
+        decoder = codecs.getincrementaldecoder(self.encoding)(
+            self.encoding_errors)
+        for chunk in chunks:
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        text = decoder.decode(b'', True)
+        if text:
+            yield text
+
     def handle_title(self, path_or_file):
         """May be overridden by sublass in order to retrieve file title."""
         return None